@@ -60,6 +60,16 @@ config :logger, :default_formatter,
 # Use Jason for JSON parsing in Phoenix
 config :phoenix, :json_library, Jason
 
+# X12 parser workers: x12_parser_pool_size Python processes parse uploads in
+# parallel (default: schedulers online, at most 4).
+# On-disk cache the X12 parser workers use for resent (byte-identical) files.
+# Defaults to <tmp>/claim_viewer_x12_cache; set x12_cache_dir to false to disable.
+# The parser imports the x12core package from X12-Translation-Project/ of this
+# repository; set x12core_path to the directory holding x12core/ when priv/ is
+# deployed on its own.
+config :claim_viewer,
+  x12_cache_max_mb: 256
+
 # PDF Generator Configuration
 config :pdf_generator,
   wkhtml_path: "C:/Program Files/wkhtmltopdf/bin/wkhtmltopdf.exe"
@@ -12,6 +12,8 @@ defmodule ClaimViewer.Application do
       ClaimViewer.Repo,
       {DNSCluster, query: Application.get_env(:claim_viewer, :dns_cluster_query) || :ignore},
       {Phoenix.PubSub, name: ClaimViewer.PubSub},
+      # Long-lived Python worker that translates uploaded X12 files
+      ClaimViewer.X12Parser,
       # Start a worker by calling: ClaimViewer.Worker.start_link(arg)
       # {ClaimViewer.Worker, arg},
       # Start to serve requests, typically the last entry
@@ -0,0 +1,289 @@
+defmodule ClaimViewer.X12Parser do
+  @moduledoc """
+  ClaimViewer.X12Parser  –  Pool of Long-lived Python Parser Workers
+  ══════════════════════════════════════════════════════════════════
+
+  Translating an uploaded X12 file used to mean starting a fresh `python3`
+  process, letting it write a temporary JSON file, then reading that file
+  back.  For small claims the interpreter start-up and the temp-file round
+  trip cost far more than the parsing itself.
+
+  Each worker (a GenServer) instead keeps one
+  `priv/python/parser_for_viewer.py --worker` process running behind an
+  Erlang Port and sends it one request per upload:
+
+      request   {"path": "/tmp/plug-.../upload.edi", "id": 42}
+      response  {"ok": true, "sections": [...], "id": 42}
+                | {"ok": false, "error": "...", "id": 42}
+
+  Messages are framed with a 4-byte length prefix (`{:packet, 4}`), so large
+  claim files never have to fit a line buffer.
+
+  How it behaves
+  ──────────────
+  • `ClaimViewer.X12Parser` in the supervision tree starts a pool of
+    `:x12_parser_pool_size` workers (default: schedulers online, at most 4);
+    `parse/1` picks one round-robin, so uploads from different users are
+    parsed in parallel instead of queueing behind one Python process.
+  • A worker never blocks on its Port: the request is written, the caller is
+    remembered under the request id, and `GenServer.reply/2` answers it when
+    the matching response arrives.
+  • Each Python process is started lazily on the worker's first upload, so
+    the app still boots (and tests still run) on machines without Python.
+  • If a Python process dies or a request times out, its pending callers get
+    an error, the process is killed (closing the port alone would leave one
+    stuck in a parse running) and the next upload starts a new one.
+  • Resent files are answered from an on-disk cache keyed by the SHA-256 of
+    the file (see `config :claim_viewer, :x12_cache_dir` / `:x12_cache_max_mb`;
+    set `:x12_cache_dir` to `false` to turn it off).
+  """
+
+  use GenServer
+
+  # How long one parse may take before we give up on the worker
+  @parse_timeout 60_000
+
+  @default_max_pool_size 4
+
+  # ---------------------------------------------------------------------------
+  # Public API
+  # ---------------------------------------------------------------------------
+
+  @doc """
+  Supervisor child spec for the whole pool: one worker per index, each
+  registered under `worker_name/1`.
+  """
+  def child_spec(opts) do
+    %{
+      id: __MODULE__,
+      type: :supervisor,
+      start: {__MODULE__, :start_pool, [opts]}
+    }
+  end
+
+  @doc "Start the pool's supervisor and its workers."
+  def start_pool(opts \\ []) do
+    size = Keyword.get_lazy(opts, :pool_size, &pool_size/0)
+    # Round-robin counter; unsigned, so it wraps around to 0
+    :persistent_term.put({__MODULE__, :pool}, {size, :atomics.new(1, signed: false)})
+
+    workers =
+      for index <- 0..(size - 1)//1 do
+        %{
+          id: {__MODULE__, index},
+          start: {__MODULE__, :start_link, [[name: worker_name(index)]]}
+        }
+      end
+
+    Supervisor.start_link(workers, strategy: :one_for_one, name: Module.concat(__MODULE__, Pool))
+  end
+
+  @doc "Start one worker."
+  def start_link(opts \\ []) do
+    GenServer.start_link(__MODULE__, opts, name: Keyword.get(opts, :name))
+  end
+
+  @doc """
+  Translate the X12 file at `path` on the next worker of the pool (or on
+  `server`, when given).
+
+  Returns `{:ok, decoded_sections}` (the parser's JSON output, decoded) or
+  `{:error, message}`.
+  """
+  def parse(path, server \\ nil) do
+    GenServer.call(server || next_worker(), {:parse, path}, @parse_timeout + 5_000)
+  end
+
+  @doc "Registered name of pool worker `index`."
+  def worker_name(index), do: Module.concat(__MODULE__, "Worker#{index}")
+
+  @doc "Absolute path of the bundled Python parser."
+  def script_path do
+    :claim_viewer
+    |> :code.priv_dir()
+    |> Path.join("python/parser_for_viewer.py")
+  end
+
+  # ---------------------------------------------------------------------------
+  # GenServer callbacks
+  # ---------------------------------------------------------------------------
+
+  @impl true
+  def init(_opts) do
+    # pending: request id -> {caller, timeout timer}
+    {:ok, %{port: nil, next_id: 0, pending: %{}}}
+  end
+
+  @impl true
+  def handle_call({:parse, path}, from, state) do
+    case ensure_port(state) do
+      {:ok, port} ->
+        id = state.next_id
+        Port.command(port, Jason.encode!(%{path: path, id: id}))
+        timer = Process.send_after(self(), {:parse_timeout, id}, @parse_timeout)
+
+        pending = Map.put(state.pending, id, {from, timer})
+        {:noreply, %{state | port: port, next_id: id + 1, pending: pending}}
+
+      {:error, message} ->
+        {:reply, {:error, message}, state}
+    end
+  end
+
+  @impl true
+  def handle_info({port, {:data, data}}, %{port: port} = state) do
+    case Jason.decode(data) do
+      {:ok, %{"id" => id} = response} ->
+        case Map.pop(state.pending, id) do
+          {{from, timer}, pending} ->
+            Process.cancel_timer(timer)
+            GenServer.reply(from, decode_response(response))
+            {:noreply, %{state | pending: pending}}
+
+          # Answer to a request that already timed out
+          {nil, _pending} ->
+            {:noreply, state}
+        end
+
+      # Without an id the answer can't be matched to a caller: start over
+      other ->
+        message =
+          case other do
+            {:ok, response} -> "Unexpected X12 parser response: #{inspect(response)}"
+            {:error, error} -> "Translator produced invalid JSON: #{inspect(error)}"
+          end
+
+        {:noreply, drop_port(state, message)}
+    end
+  end
+
+  # The worker died – fail whatever it was parsing, start a new one on the next upload
+  def handle_info({port, {:exit_status, status}}, %{port: port} = state) do
+    {:noreply, drop_port(state, "X12 parser worker exited (status #{status})", false)}
+  end
+
+  # A parse took too long; the Python process is stuck on it, so replace it
+  def handle_info({:parse_timeout, id}, state) do
+    if Map.has_key?(state.pending, id) do
+      {:noreply, drop_port(state, "X12 parser worker timed out")}
+    else
+      {:noreply, state}
+    end
+  end
+
+  def handle_info(_message, state), do: {:noreply, state}
+
+  # ---------------------------------------------------------------------------
+  # Private helpers
+  # ---------------------------------------------------------------------------
+
+  defp pool_size do
+    Application.get_env(
+      :claim_viewer,
+      :x12_parser_pool_size,
+      min(System.schedulers_online(), @default_max_pool_size)
+    )
+  end
+
+  defp next_worker do
+    {size, counter} = :persistent_term.get({__MODULE__, :pool})
+    worker_name(rem(:atomics.add_get(counter, 1, 1), size))
+  end
+
+  # Reply {:error, message} to every pending caller and forget the port
+  defp drop_port(state, message, close? \\ true) do
+    if close? and is_port(state.port), do: close_port(state.port)
+
+    Enum.each(state.pending, fn {_id, {from, timer}} ->
+      Process.cancel_timer(timer)
+      GenServer.reply(from, {:error, message})
+    end)
+
+    %{state | port: nil, pending: %{}}
+  end
+
+  # Port.close/1 only closes the pipes, and a worker stuck in a parse never
+  # reads the end of its stdin: kill the OS process too so it isn't orphaned
+  defp close_port(port) do
+    os_pid =
+      case Port.info(port, :os_pid) do
+        {:os_pid, os_pid} -> os_pid
+        nil -> nil
+      end
+
+    Port.close(port)
+    if os_pid, do: kill_os_process(os_pid)
+    :ok
+  end
+
+  defp kill_os_process(os_pid) do
+    {command, args} =
+      case :os.type() do
+        {:win32, _} -> {"taskkill", ["/PID", Integer.to_string(os_pid), "/F"]}
+        _ -> {"kill", ["-KILL", Integer.to_string(os_pid)]}
+      end
+
+    # Best effort: the process may already be gone
+    case System.find_executable(command) do
+      nil -> :ok
+      executable -> System.cmd(executable, args, stderr_to_stdout: true)
+    end
+  end
+
+  defp ensure_port(%{port: port}) when is_port(port), do: {:ok, port}
+
+  defp ensure_port(_state) do
+    script = script_path()
+    python = System.find_executable("python3")
+
+    cond do
+      not File.exists?(script) ->
+        {:error,
+         "Python parser not found at #{script}. " <>
+           "Make sure priv/python/parser_for_viewer.py exists."}
+
+      is_nil(python) ->
+        {:error, "python3 was not found on PATH; it is needed to translate X12 files."}
+
+      true ->
+        port =
+          Port.open({:spawn_executable, python}, [
+            :binary,
+            :exit_status,
+            {:packet, 4},
+            args: [script, "--worker" | cache_args()],
+            env: x12core_env()
+          ])
+
+        {:ok, port}
+    end
+  end
+
+  # The script imports the shared x12core package; it finds it in a repository
+  # checkout by itself, x12core_path points it elsewhere (e.g. in a release)
+  defp x12core_env do
+    case Application.get_env(:claim_viewer, :x12core_path) do
+      path when is_binary(path) -> [{~c"X12CORE_PATH", String.to_charlist(path)}]
+      _ -> []
+    end
+  end
+
+  defp cache_args do
+    default_dir = Path.join(System.tmp_dir!(), "claim_viewer_x12_cache")
+
+    case Application.get_env(:claim_viewer, :x12_cache_dir, default_dir) do
+      dir when is_binary(dir) ->
+        max_mb = Application.get_env(:claim_viewer, :x12_cache_max_mb, 256)
+        ["--cache-dir", dir, "--cache-max-mb", Integer.to_string(max_mb)]
+
+      _disabled ->
+        []
+    end
+  end
+
+  defp decode_response(%{"ok" => true, "sections" => sections}), do: {:ok, sections}
+  defp decode_response(%{"ok" => false, "error" => error}), do: {:error, error}
+
+  defp decode_response(other),
+    do: {:error, "Unexpected X12 parser response: #{inspect(other)}"}
+end
@@ -15,11 +15,12 @@ defmodule ClaimViewerWeb.PageController do
 
   HOW X12 TRANSLATION WORKS BEHIND THE SCENES
   ────────────────────────────────────────────
-  When a user uploads an X12 file the controller calls a small Python script
-  (priv/python/parser_for_viewer.py) that is bundled inside this application.
-  The script reads the raw EDI segments and writes a clean JSON file to a
-  temporary directory.  The controller then reads that JSON, extracts the
-  searchable fields, and stores everything in PostgreSQL.
+  When a user uploads an X12 file the controller hands it to a small Python
+  script (priv/python/parser_for_viewer.py) that is bundled inside this
+  application.  The script runs as one long-lived worker process behind
+  ClaimViewer.X12Parser; it reads the raw EDI segments and sends the clean
+  JSON sections straight back.  The controller then extracts the searchable
+  fields and stores everything in PostgreSQL.
 
   The user just clicks "Upload" – they never need to run the Python script
   manually or know anything about X12 segments.
@@ -33,23 +34,6 @@ defmodule ClaimViewerWeb.PageController do
   import Ecto.Query
 
 
-  # ─────────────────────────────────────────────────────────────────────────
-  # Python script path
-  # ─────────────────────────────────────────────────────────────────────────
-  #
-  # We bundle the Python parser inside the Phoenix app at:
-  #   priv/python/parser_for_viewer.py
-  #
-  # Using :code.priv_dir/1 finds that directory at *runtime* regardless of
-  # where the application is deployed – no hardcoded paths needed.
-  #
-  defp parser_script_path do
-    :claim_viewer
-    |> :code.priv_dir()
-    |> Path.join("python/parser_for_viewer.py")
-  end
-
-
   # =========================================================================
   # PRIVATE HELPERS
   # =========================================================================
@@ -107,63 +91,26 @@ defmodule ClaimViewerWeb.PageController do
   # Called whenever an X12 file is uploaded.
   #
   # Steps:
-  #   1. Locate the bundled Python parser script.
-  #   2. Write the parser output to a unique temp file (avoids conflicts when
-  #      multiple users upload simultaneously).
-  #   3. Run:  python3 parser_for_viewer.py <input_x12> <output_json>
-  #   4. Read and decode the JSON output.
-  #   5. Delete the temp file (clean up after ourselves).
+  #   1. Send the upload's path to the long-lived Python parser worker
+  #      (ClaimViewer.X12Parser – no new interpreter, no temp file).
+  #   2. Get the decoded JSON sections back inline.
+  #   3. Unwrap the single-claim wrapper if present.
   #
   defp translate_x12_to_sections(path) do
-    script = parser_script_path()
-
-    if File.exists?(script) do
-      # Unique temp file so concurrent uploads don't overwrite each other
-      tmp_output =
-        Path.join(System.tmp_dir!(), "claim_#{System.unique_integer([:positive])}_viewer.json")
+    case ClaimViewer.X12Parser.parse(path) do
+      {:ok, decoded} ->
+        # Unwrap single-claim wrappers: [[...sections...]] → [...sections...]
+        sections =
+          case decoded do
+            [first | _] when is_list(first) -> first
+            other -> other
+          end
 
-      # Run the Python translator; merge stderr into stdout so we can show
-      # the user a helpful message if something goes wrong.
-      {output, exit_code} =
-        System.cmd("python3", [script, path, tmp_output], stderr_to_stdout: true)
+        {:ok, sections}
 
-      cond do
-        exit_code != 0 ->
-          # Translation failed – pass the error message back to the controller
-          {:error,
-           "Could not translate X12 file (exit #{exit_code}). " <>
-             "Details: #{truncate_output(output)}"}
-
-        true ->
-          # Translation succeeded – read and parse the output JSON
-          case File.read(tmp_output) do
-            {:ok, contents} ->
-              # Always delete the temp file whether decode succeeds or not
-              File.rm(tmp_output)
-
-              case Jason.decode(contents) do
-                {:ok, decoded} ->
-                  # Unwrap single-claim wrappers: [[...sections...]] → [...sections...]
-                  sections =
-                    case decoded do
-                      [first | _] when is_list(first) -> first
-                      other -> other
-                    end
-
-                  {:ok, sections}
-
-                {:error, decode_error} ->
-                  {:error, "Translator produced invalid JSON: #{truncate_output(inspect(decode_error))}"}
-              end
-
-            {:error, reason} ->
-              {:error, "Could not read translator output: #{inspect(reason)}"}
-          end
-      end
-    else
-      {:error,
-       "Python parser not found at #{script}. " <>
-         "Make sure priv/python/parser_for_viewer.py exists."}
+      {:error, message} ->
+        # Translation failed – pass the error message back to the controller
+        {:error, "Could not translate X12 file. Details: #{truncate_output(message)}"}
     end
   end
 
@@ -398,7 +345,7 @@ defmodule ClaimViewerWeb.PageController do
   #   → decode it directly
   #
   # When an X12 EDI file is uploaded:
-  #   → call the bundled Python parser (priv/python/parser_for_viewer.py)
+  #   → send it to the bundled Python parser worker (priv/python/parser_for_viewer.py)
   #   → the parser translates X12 segments into clean JSON sections
   #   → continue with the same JSON flow
   #
@@ -23,570 +23,242 @@ NOTE ON DEPENDENCIES
 --------------------
 This parser reads X12 files directly – it does NOT use the pyx12
 library.  Direct parsing is simpler, faster, and works with any file
-encoding or X12 dialect without external dependencies.
+encoding or X12 dialect without external dependencies.  Everything but the
+web-app plumbing comes from X12-Translation-Project/ (see X12CORE_PATH
+below): the x12core package reads the segments, and the ViewerBuilder of
+its x12_viewer.py turns them into sections, so this script and the batch
+translators always produce the same claim view.
 
 Command-line usage (for testing; the web app calls this automatically):
-    python3 parser_for_viewer.py  <input_file>  [output_file]
+    python3 parser_for_viewer.py  <input_file>  [output_file]  [--pretty]
+
+Worker mode (how the web app runs it – a small pool of long-lived processes):
+    python3 parser_for_viewer.py  --worker  [--lines]
+                                  [--cache-dir DIR]  [--cache-max-mb N]
 """
 
 import json
+import struct
 import sys
 import os
 
 
+# The X12 reading layer (x12core) and the section builder (x12_viewer) are
+# shared with the translators in X12-Translation-Project/.  That directory is
+# found next to this repository's checkout, or wherever X12CORE_PATH points
+# (set it when priv/ is deployed without the rest of the repository, e.g. in
+# a mix release).
+X12CORE_PATH = os.path.abspath(os.environ.get("X12CORE_PATH") or os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "..", "..", "..", "..", "X12-Translation-Project"
+))
+if not os.path.isdir(os.path.join(X12CORE_PATH, "x12core")):
+    sys.exit(
+        f"X12 parser setup error: X12-Translation-Project/ (with x12core/) not found "
+        f"at {X12CORE_PATH}.  Set the X12CORE_PATH environment variable "
+        f"(config :claim_viewer, :x12core_path) to that directory."
+    )
+sys.path.insert(0, X12CORE_PATH)
+
+from x12core import SegmentStream
+# PARSER_VERSION (which cached results are keyed on) comes with the builder
+from x12_viewer import PARSER_VERSION, ViewerBuilder
+from x12_cache import ResultCache, file_digest
+from x12_json import dumps, write_json
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # FILE READING
 # ─────────────────────────────────────────────────────────────────────────────
 
-def read_x12_segments(filepath):
+def iter_x12_segments(filepath):
     """
-    Read an X12 file and return (segments, ele_sep, seg_term).
-
-    X12 files are self-describing: the ISA segment tells us which character
-    is the element separator and which is the segment terminator.  We read
-    those from ISA, then split the whole file on those characters.
+    Open filepath as a lazy SegmentStream of (seg_id, elements) pairs.
 
-    Some X12 exports omit the ISA/GS envelope and start directly with the
-    ST segment.  We detect both cases automatically.
+    The parser walks this directly, so only the segment being parsed is
+    ever held in decoded form - no list of the whole file is built.
 
     This approach:
     - Works with any segment terminator (~ is common but not required)
     - Works with any element separator (* is common but not required)
     - Handles UTF-8, latin-1, Windows-1252, and BOM-prefixed files
     - Handles files with or without an ISA interchange envelope
+    - Never holds a decoded copy of the whole file
     - Has no external library dependencies
     """
-    # ── Step 1: read raw bytes ────────────────────────────────────────────────
-    try:
-        with open(filepath, 'rb') as f:
-            raw_bytes = f.read()
-    except Exception as e:
-        raise RuntimeError(f"Cannot read file '{filepath}': {e}")
-
-    # Strip UTF-8 BOM if present (some editors add this automatically)
-    if raw_bytes.startswith(b'\xef\xbb\xbf'):
-        raw_bytes = raw_bytes[3:]
-
-    # Decode to a string.  We use latin-1 as the final fallback because it
-    # maps every byte value 0-255 to a character – it never raises an error.
-    content = None
-    for encoding in ('utf-8', 'cp1252', 'latin-1'):
-        try:
-            content = raw_bytes.decode(encoding)
-            break
-        except (UnicodeDecodeError, LookupError):
-            continue
-
-    import re
-
-    # ── Step 2: find the start of the X12 data and detect delimiters ─────────
-
-    isa_match = re.search(r'ISA(.)', content, re.IGNORECASE)
-
-    if isa_match:
-        # Standard X12 file: has a full ISA interchange envelope.
-        parse_start = isa_match.start()
-        ele_sep = isa_match.group(1)   # character right after "ISA"
-
-        # Find the segment terminator by counting exactly 16 element separators.
-        # ISA always has 16 data elements; the seg_term is the char right after
-        # ISA16 (the component separator, e.g. ":").
-        #
-        # Using split(ele_sep, 17):
-        #   parts[0]  = "ISA"
-        #   parts[1..15] = ISA01–ISA15
-        #   parts[16] = "<ISA16><seg_term><rest_of_file>"
-        parts = content[parse_start:].split(ele_sep, 17)
-        if len(parts) < 17:
-            raise RuntimeError(
-                "ISA segment does not have 16 element separators.  "
-                "The file may be malformed."
-            )
-        after_isa16 = parts[16]
-        if len(after_isa16) < 2:
-            raise RuntimeError(
-                "Cannot determine segment terminator from ISA16.  "
-                "The file may be truncated."
-            )
-        seg_term = after_isa16[1]   # almost always ~
+    return SegmentStream(filepath)
 
-    else:
-        # No ISA envelope: file starts directly with the ST transaction set.
-        # Detect ele_sep from the character immediately after "ST".
-        # We require that "ST" is not preceded by another alphanumeric character
-        # so we don't accidentally match "FIRST" or "BEST" inside a data value.
-        st_match = re.search(r'(?<![A-Za-z0-9])ST([^A-Za-z0-9\s])', content)
-        if not st_match:
-            raise RuntimeError(
-                "Not a valid X12 file: no ISA or ST segment found.  "
-                "Make sure you are uploading an 837 claim file."
-            )
-        parse_start = st_match.start()
-        ele_sep = st_match.group(1)   # e.g. "*"
-
-        # Find the segment terminator by scanning forward from the ST segment.
-        # Skip alphanumeric characters and ele_sep characters; the first other
-        # character we encounter is the segment terminator (usually "~").
-        seg_term = '~'   # sensible default
-        for ch in content[parse_start:]:
-            if not (ch.isalnum() or ch == ele_sep or ch in (' ', '\t', ':', '-')):
-                seg_term = ch
-                break
-
-    # ── Step 3: split the content into segments ───────────────────────────────
-    segments = []
-    for raw_seg in content[parse_start:].split(seg_term):
-        seg = raw_seg.strip()
-        if not seg:
-            continue
-        elements = seg.split(ele_sep)
-        seg_id = elements[0].strip().upper()
-        if seg_id:
-            segments.append((seg_id, elements))
-
-    return segments, ele_sep, seg_term
 
-
-# ─────────────────────────────────────────────────────────────────────────────
-# VALUE HELPERS
-# ─────────────────────────────────────────────────────────────────────────────
-
-def parse_date(date_str):
+def read_x12_segments(filepath):
     """
-    X12 stores dates as YYYYMMDD (e.g. "20230415").
-    Convert to the familiar ISO format YYYY-MM-DD (e.g. "2023-04-15").
+    Read an X12 file and return (segments, ele_sep, seg_term) with every
+    segment in one list.  Prefer iter_x12_segments() for large files.
     """
-    if not date_str or len(date_str) != 8:
-        return date_str
-    try:
-        return f"{date_str[0:4]}-{date_str[4:6]}-{date_str[6:8]}"
-    except Exception:
-        return date_str
+    with iter_x12_segments(filepath) as stream:
+        return list(stream), stream.ele_sep, stream.seg_term
 
 
-def parse_time(time_str):
-    """
-    X12 stores times as HHMM (e.g. "1430").
-    Convert to HH:MM (e.g. "14:30").
-    """
-    if not time_str or len(time_str) < 4:
-        return time_str
-    try:
-        return f"{time_str[0:2]}:{time_str[2:4]}"
-    except Exception:
-        return time_str
-
+# ─────────────────────────────────────────────────────────────────────────────
+# MAIN PARSING FUNCTION
+# ─────────────────────────────────────────────────────────────────────────────
 
-def clean_value(value):
-    """
-    Remove tilde (~), extra whitespace, and segment terminators that
-    sometimes appear at the end of X12 element values.
+def parse_x12_for_viewer(filepath):
     """
-    if not value:
-        return ""
-    return str(value).replace('~', '').strip()
+    Parse an X12 EDI file and return a list of section dicts ready for the
+    Claim Viewer web application.
 
+    The segments are fed one at a time into the shared ViewerBuilder, which
+    places every party by its HL loop and packages each claim as a list of
+    {"section": ..., "data": ...} objects that the Claim Viewer template
+    knows how to display.
 
-def clean_code(code):
-    """
-    Diagnosis and procedure codes sometimes include a qualifier prefix
-    separated by a colon, e.g. "ABK:K0230".
-    We only want the actual code part: "K0230".
+    Returns a single section list (one claim) or a list of lists (multiple
+    claims found in the same file).
     """
-    if not code:
-        return ""
-    cleaned = clean_value(code)
-    return cleaned.split(":")[-1] if ":" in cleaned else cleaned
-
+    segments = None
 
-def safe_int(value, default=0):
-    """
-    Convert a string to an integer, returning `default` if it fails.
-    """
-    if not value:
-        return default
     try:
-        return int(clean_value(value)) or default
-    except (ValueError, AttributeError):
-        return default
+        segments = iter_x12_segments(filepath)
+        builder = ViewerBuilder()
+        feed = builder.feed
 
+        for seg_id, elements in segments:
+            feed(seg_id, elements)
 
-def safe_float(value, default=0.0):
-    """
-    Convert a string to a float, returning `default` if it fails.
-    Used for dollar amounts and unit quantities.
-    """
-    if not value:
-        return default
-    try:
-        cleaned = clean_value(value)
-        return float(cleaned) if cleaned else default
-    except (ValueError, AttributeError):
-        return default
+        results = builder.finish()
+        if not results:
+            # Say what the file does contain (835, 270, ...) and how it was read
+            raise builder.no_claims_error(segments.ele_sep, segments.seg_term)
+        return results
 
+    except RuntimeError:
+        raise   # pass our descriptive errors through unchanged
+    except Exception as e:
+        raise RuntimeError(f"Unexpected error parsing X12 file: {e}")
+    finally:
+        if segments is not None:
+            segments.close()
 
-def el(elements, index, default=""):
-    """
-    Safe element accessor: returns elements[index] or `default` if the
-    index is out of range.  Keeps the parsing code concise.
-    """
-    return elements[index] if len(elements) > index else default
+
+# RESULT CACHE
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Clearinghouses often resend the exact same file.  The worker can keep the
+# parsed sections on disk in an x12_cache.ResultCache (the batch translators'
+# cache), keyed by the SHA-256 of the file's bytes plus PARSER_VERSION, so a
+# resend is hashed instead of parsed again.  The least recently used entries
+# are deleted first once the cache grows past its size limit.
+
+def cache_key(cache, filepath):
+    """Cache key for the viewer sections of filepath."""
+    return cache.make_key(file_digest(filepath), "viewer", PARSER_VERSION)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# MAIN PARSING FUNCTION
+# WORKER MODE
 # ─────────────────────────────────────────────────────────────────────────────
-
-def parse_x12_for_viewer(filepath):
+#
+# Starting a Python interpreter and round-tripping the result through a temp
+# file costs far more than parsing a small claim.  In worker mode the web app
+# starts this script once per pool worker (each behind an Erlang Port) and
+# sends it one request per upload over stdin; the sections come straight back
+# on stdout, tagged with the request's id.
+#
+# Protocol – one JSON object per message, in both directions:
+#   request:   {"path": "/tmp/plug-1234/upload.edi", "id": <optional>}
+#   response:  {"ok": true,  "sections": [...], "cached": false, "id": ...}
+#              {"ok": false, "error": "No CLM (claim) segments ...", "id": ...}
+#
+# Framing:
+#   default   4-byte big-endian length, then the JSON bytes
+#             (Erlang's {:packet, 4} port option)
+#   --lines   newline-delimited JSON, handy for testing from a shell
+#
+# stdout carries nothing but responses; the worker exits when stdin closes.
+
+def read_request(stream, lines=False):
     """
-    Parse an X12 EDI file and return a list of section dicts ready for the
-    Claim Viewer web application.
-
-    The X12 format is segment-based: each segment starts with a 2-3 letter
-    identifier followed by data elements separated by a delimiter (usually *).
-    Example:  NM1*85*2*HAPPY VALLEY MEDICAL*****XX*1234567890~
+    Read one request frame from a binary stream.
+    Returns the raw JSON bytes, or None at end of input.
+    """
+    if lines:
+        while True:
+            line = stream.readline()
+            if not line:
+                return None
+            if line.strip():
+                return line
+
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (size,) = struct.unpack('>I', header)
+    return stream.read(size)
+
+
+def write_response(stream, response, lines=False):
+    """Write one response frame and flush it straight to the caller."""
+    payload = dumps(response).encode('utf-8')
+    if lines:
+        stream.write(payload + b'\n')
+    else:
+        stream.write(struct.pack('>I', len(payload)) + payload)
+    stream.flush()
 
-    We read the file segment-by-segment, build up dicts for each part of
-    the claim (subscriber, payer, service lines, etc.), and then package
-    everything into a list of {"section": ..., "data": ...} objects that
-    the Claim Viewer template knows how to display.
 
-    Returns a single section list (one claim) or a list of lists (multiple
-    claims found in the same file).
+def handle_request(raw, cache=None):
     """
+    Parse the file named in one request (or answer from the cache).
+    Never raises – every failure becomes an {"ok": false} response so one
+    bad upload can't take the worker down.
+    """
+    try:
+        request = json.loads(raw)
+        path = request["path"]
+    except (ValueError, KeyError, TypeError) as e:
+        return {"ok": False, "error": f"Bad worker request: {e}"}
 
-    # ── Storage buckets for each logical section ──────────────────────────
-    transaction      = {}
-    submitter        = {}
-    receiver         = {}
-    billing_provider = {}
-    pay_to_provider  = {}
-    subscriber       = {}
-    payer            = {}
+    try:
+        key = cache_key(cache, path) if cache else None
+        sections = cache.get(key) if key else None
+        cached = sections is not None
+
+        if not cached:
+            sections = parse_x12_for_viewer(path)
+            if key:
+                try:
+                    cache.put(key, sections)
+                except OSError:
+                    pass   # a full or read-only cache must not fail the upload
+
+        response = {"ok": True, "sections": sections, "cached": cached}
+    except Exception as e:
+        response = {"ok": False, "error": str(e)}
 
-    current_claim  = None   # the claim currently being built
-    claims_data    = []     # all completed claims
+    if "id" in request:
+        response["id"] = request["id"]
+    return response
 
-    # Address data arrives in two segments (N3 = street, N4 = city/state/zip)
-    # so we buffer it here and attach it when N4 is seen.
-    temp_addresses = {}
-    current_entity = None   # tracks which entity the last NM1/N3/N4 belongs to
 
-    try:
-        segments, ele_sep, seg_term = read_x12_segments(filepath)
+def run_worker(lines=False, cache_dir=None, cache_max_bytes=256 * 1024 * 1024):
+    """Serve parse requests from stdin until it is closed."""
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # One cache for the worker's life, so its size is tracked, not rescanned
+    cache = ResultCache(cache_dir, cache_max_bytes) if cache_dir else None
 
-        for seg_id, elements in segments:
+    while True:
+        raw = read_request(stdin, lines)
+        if raw is None:
+            break
+        write_response(stdout, handle_request(raw, cache), lines)
 
-            # ── ISA – Interchange Control Header ────────────────────────────
-            # First segment in every X12 file; identifies sender and receiver.
-            if seg_id == 'ISA':
-                submitter['name'] = clean_value(el(elements, 6))
-                receiver['name']  = clean_value(el(elements, 8))
-                receiver['id']    = clean_value(el(elements, 8))
-
-            # ── ST – Transaction Set Header ──────────────────────────────────
-            # Marks the start of one transaction (e.g. one 837P claim batch).
-            elif seg_id == 'ST':
-                transaction['type']          = clean_value(el(elements, 1))
-                transaction['controlNumber'] = clean_value(el(elements, 2))
-                transaction['version']       = clean_value(el(elements, 3))
-
-            # ── BHT – Beginning of Hierarchical Transaction ───────────────────
-            # Contains submission date, time, and reference ID.
-            elif seg_id == 'BHT':
-                transaction['purpose']     = clean_value(el(elements, 1))
-                transaction['referenceId'] = clean_value(el(elements, 3))
-                transaction['date']        = parse_date(clean_value(el(elements, 4)))
-                transaction['time']        = parse_time(clean_value(el(elements, 5)))
-
-            # ── NM1 – Name / Entity Identifier ───────────────────────────────
-            # Used for every named party in the claim.
-            # Element [1] is an entity qualifier that tells us who this is:
-            #   41 = Submitter,  40 = Receiver,  85 = Billing Provider,
-            #   87 = Pay-To Provider,  IL = Insured/Subscriber (patient),
-            #   PR = Payer,  82 = Rendering Provider,  77 = Service Facility
-            elif seg_id == 'NM1':
-                entity_code  = clean_value(el(elements, 1))
-                entity_name  = clean_value(el(elements, 3))
-                entity_fname = clean_value(el(elements, 4))
-                entity_id    = clean_value(el(elements, 9))
-
-                if entity_code == '41':       # Submitter
-                    current_entity = 'submitter'
-                    submitter['name'] = entity_name
-                    submitter['id']   = entity_id
-
-                elif entity_code == '40':     # Receiver
-                    current_entity = 'receiver'
-                    receiver['name'] = entity_name
-                    receiver['id']   = entity_id
-
-                elif entity_code == '85':     # Billing Provider
-                    current_entity = 'billing_provider'
-                    billing_provider['name']    = entity_name
-                    billing_provider['taxId']   = entity_id
-                    billing_provider['address'] = {}
-
-                elif entity_code == '87':     # Pay-To Provider
-                    current_entity = 'pay_to_provider'
-                    pay_to_provider['name']    = entity_name
-                    pay_to_provider['taxId']   = entity_id
-                    pay_to_provider['address'] = {}
-
-                elif entity_code == 'IL':     # Insured / Subscriber (patient)
-                    current_entity = 'subscriber'
-                    subscriber['firstName'] = entity_fname
-                    subscriber['lastName']  = entity_name
-                    subscriber['id']        = entity_id
-                    subscriber['address']   = {}
-
-                elif entity_code == 'PR':     # Payer (insurance company)
-                    current_entity = 'payer'
-                    payer_entry = {'name': entity_name, 'payerId': entity_id}
-                    if current_claim:
-                        current_claim['payer'] = payer_entry
-                    else:
-                        payer.update(payer_entry)
-
-                elif entity_code == '82':     # Rendering Provider
-                    current_entity = 'rendering_provider'
-                    if current_claim:
-                        current_claim['renderingProvider'] = {
-                            'firstName': entity_fname,
-                            'lastName':  entity_name,
-                            'npi':       entity_id
-                        }
-
-                elif entity_code == '77':     # Service Facility
-                    current_entity = 'service_facility'
-                    if current_claim:
-                        current_claim['serviceFacility'] = {
-                            'name':    entity_name,
-                            'taxId':   entity_id,
-                            'address': {}
-                        }
-
-            # ── N3 – Street Address ──────────────────────────────────────────
-            # Always follows the NM1 it belongs to; buffer it for N4.
-            elif seg_id == 'N3':
-                temp_addresses[current_entity] = {
-                    'street': clean_value(el(elements, 1))
-                }
-
-            # ── N4 – City / State / ZIP ──────────────────────────────────────
-            # Completes the address started by N3; attach to the right entity.
-            elif seg_id == 'N4':
-                if current_entity in temp_addresses:
-                    temp_addresses[current_entity].update({
-                        'city':  clean_value(el(elements, 1)),
-                        'state': clean_value(el(elements, 2)),
-                        'zip':   clean_value(el(elements, 3))
-                    })
-                    addr = temp_addresses[current_entity]
-
-                    if current_entity == 'billing_provider':
-                        billing_provider['address'] = addr
-                    elif current_entity == 'pay_to_provider':
-                        pay_to_provider['address'] = addr
-                    elif current_entity == 'subscriber':
-                        subscriber['address'] = addr
-                    elif current_entity == 'service_facility' and current_claim:
-                        if 'serviceFacility' in current_claim:
-                            current_claim['serviceFacility']['address'] = addr
-
-            # ── PER – Contact Information ────────────────────────────────────
-            # Phone number / contact name for the submitter.
-            elif seg_id == 'PER':
-                if current_entity == 'submitter':
-                    submitter['contact'] = {
-                        'name':      clean_value(el(elements, 2)),
-                        'phone':     clean_value(el(elements, 4)),
-                        'extension': clean_value(el(elements, 6))
-                    }
-
-            # ── SBR – Subscriber Information ─────────────────────────────────
-            # Insurance plan details for the subscriber.
-            elif seg_id == 'SBR':
-                subscriber['relationship'] = clean_value(el(elements, 2)) or 'self'
-                subscriber['groupNumber']  = clean_value(el(elements, 3))
-                subscriber['planType']     = clean_value(el(elements, 5))
-
-            # ── DMG – Demographic Information ────────────────────────────────
-            # Patient date of birth and sex.
-            elif seg_id == 'DMG':
-                if current_entity == 'subscriber':
-                    subscriber['dob'] = parse_date(clean_value(el(elements, 2)))
-                    subscriber['sex'] = clean_value(el(elements, 3))
-
-            # ── CLM – Claim Information ──────────────────────────────────────
-            # Each CLM segment opens a new claim.  Save the previous one first.
-            elif seg_id == 'CLM':
-                if current_claim:
-                    claims_data.append(current_claim)
-
-                current_claim = {
-                    'id':             clean_value(el(elements, 1)),
-                    'totalCharge':    safe_float(el(elements, 2)),
-                    'placeOfService': "",
-                    'serviceType':    "",
-                    'indicators': {
-                        'assigned':          clean_value(el(elements, 7)),
-                        'providerSignature': clean_value(el(elements, 6)),
-                        'releaseInfo':       clean_value(el(elements, 9)),
-                        'patientSignature':  clean_value(el(elements, 8)),
-                        'relatedCause':      ""
-                    },
-                    'onsetDate':                "",
-                    'clearinghouseClaimNumber': "",
-                    'diagnosis':    {'primary': "", 'secondary': []},
-                    'serviceLines': []
-                }
-
-            # ── HI – Diagnosis Codes ─────────────────────────────────────────
-            # ICD-10 codes: element 1 = primary, rest = secondary.
-            elif seg_id == 'HI' and current_claim:
-                for i in range(1, len(elements)):
-                    if elements[i]:
-                        code = clean_code(elements[i])
-                        if code:
-                            if i == 1:
-                                current_claim['diagnosis']['primary'] = code
-                            else:
-                                current_claim['diagnosis']['secondary'].append(code)
-
-            # ── DTP – Date / Time / Period ────────────────────────────────────
-            # Reused for multiple date types; element [1] is the qualifier:
-            #   472 = service date,  431/454 = onset / admission date
-            elif seg_id == 'DTP':
-                qualifier  = clean_value(el(elements, 1))
-                date_value = parse_date(clean_value(el(elements, 3)))
-
-                if qualifier == '472' and current_claim and current_claim['serviceLines']:
-                    current_claim['serviceLines'][-1]['serviceDate'] = date_value
-                elif qualifier in ('431', '454') and current_claim:
-                    current_claim['onsetDate'] = date_value
-
-            # ── REF – Reference Identification ──────────────────────────────
-            # Qualifier D9 = clearinghouse claim number.
-            elif seg_id == 'REF' and current_claim:
-                if clean_value(el(elements, 1)) == 'D9':
-                    current_claim['clearinghouseClaimNumber'] = clean_value(el(elements, 2))
-
-            # ── LX – Service Line Number ─────────────────────────────────────
-            # Opens a new service line; followed by SV1 and DTP.
-            elif seg_id == 'LX' and current_claim:
-                current_claim['serviceLines'].append({
-                    'lineNumber':         safe_int(el(elements, 1)),
-                    'codeQualifier':      "",
-                    'procedureCode':      "",
-                    'charge':             0,
-                    'unitQualifier':      "",
-                    'units':              0,
-                    'diagnosisPointer':   "",
-                    'emergencyIndicator': "",
-                    'serviceDate':        ""
-                })
-
-            # ── SV1 – Professional Service ───────────────────────────────────
-            # Details for one service line: procedure code, charge, units.
-            elif seg_id == 'SV1' and current_claim and current_claim['serviceLines']:
-                svc = current_claim['serviceLines'][-1]
-
-                proc = clean_value(el(elements, 1))
-                if ':' in proc:
-                    parts = proc.split(':')
-                    svc['codeQualifier'] = parts[0]
-                    svc['procedureCode'] = parts[1] if len(parts) > 1 else proc
-                else:
-                    svc['procedureCode'] = proc
-
-                svc['charge']        = safe_float(el(elements, 2))
-                svc['unitQualifier'] = clean_value(el(elements, 3))
-                svc['units']         = safe_float(el(elements, 4))
-
-                pos = clean_value(el(elements, 5))
-                if pos:
-                    svc['placeOfService'] = pos
-                    if not current_claim['placeOfService']:
-                        current_claim['placeOfService'] = pos
-
-                diag = el(elements, 7)
-                if diag:
-                    svc['diagnosisPointer'] = safe_int(diag)
-
-        # ── End of file: save the last open claim ────────────────────────────
-        if current_claim:
-            claims_data.append(current_claim)
-
-        # If no Pay-To Provider was specified, default to the billing provider
-        if not pay_to_provider.get('name'):
-            pay_to_provider = billing_provider.copy()
-
-        if not claims_data:
-            # Build a helpful diagnostic so the user (and developer) can
-            # understand exactly what is in the file.
-            found_ids = sorted(set(sid for sid, _ in segments))
-            trans_type = transaction.get('type', 'unknown')
-
-            # Map common transaction set IDs to human-readable names
-            tx_names = {
-                '835': '835 Remittance Advice (payment file – not a claim)',
-                '270': '270 Eligibility Inquiry',
-                '271': '271 Eligibility Response',
-                '276': '276 Claim Status Request',
-                '277': '277 Claim Status Response',
-                '278': '278 Prior Authorization',
-                '834': '834 Benefit Enrollment',
-            }
-            tx_label = tx_names.get(trans_type, f'transaction type {trans_type}')
-
-            raise RuntimeError(
-                f"No CLM (claim) segments found in this file. "
-                f"Transaction type detected: {tx_label}. "
-                f"Segment types present: {', '.join(found_ids)}. "
-                f"Detected element separator: '{ele_sep}', "
-                f"segment terminator: repr='{repr(seg_term)}'. "
-                "This parser handles 837P/837I/837D claim files only."
-            )
-
-        # ── Build output: one section array per claim ─────────────────────────
-        # The Claim Viewer expects each claim as a list of
-        # {"section": "<name>", "data": {...}} objects.
-        results = []
-
-        for claim_data in claims_data:
-            sections = [
-                {"section": "transaction",      "data": transaction},
-                {"section": "submitter",        "data": submitter},
-                {"section": "receiver",         "data": receiver},
-                {"section": "billing_Provider", "data": billing_provider},
-                {"section": "Pay_To_provider",  "data": pay_to_provider},
-                {"section": "subscriber",       "data": subscriber},
-                {"section": "payer",            "data": claim_data.get('payer', payer)},
-                {"section": "claim",            "data": {
-                    'id':                       claim_data['id'],
-                    'totalCharge':              claim_data['totalCharge'],
-                    'placeOfService':           claim_data['placeOfService'],
-                    'serviceType':              claim_data['serviceType'],
-                    'indicators':               claim_data['indicators'],
-                    'onsetDate':                claim_data['onsetDate'],
-                    'clearinghouseClaimNumber': claim_data['clearinghouseClaimNumber']
-                }},
-                {"section": "diagnosis",         "data": claim_data['diagnosis']},
-                {"section": "renderingProvider", "data": claim_data.get('renderingProvider', {})},
-                {"section": "serviceFacility",   "data": claim_data.get('serviceFacility', billing_provider)},
-                {"section": "service_Lines",     "data": claim_data['serviceLines']}
-            ]
-            results.append(sections)
-
-        # Single claim → return sections directly
-        # Multiple claims → return list of section arrays
-        return results[0] if len(results) == 1 else results
 
-    except RuntimeError:
-        raise   # pass our descriptive errors through unchanged
-    except Exception as e:
-        raise RuntimeError(f"Unexpected error parsing X12 file: {e}")
+def option_value(args, name, default=None):
+    """Value following `name` in args, e.g. --cache-dir /tmp/x12_cache."""
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return default
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -594,19 +266,32 @@ def parse_x12_for_viewer(filepath):
 # ─────────────────────────────────────────────────────────────────────────────
 
 def main():
-    if len(sys.argv) < 2:
+    if '--worker' in sys.argv[1:]:
+        args = sys.argv[1:]
+        run_worker(
+            lines='--lines' in args,
+            cache_dir=option_value(args, '--cache-dir'),
+            cache_max_bytes=int(option_value(args, '--cache-max-mb', 256)) * 1024 * 1024
+        )
+        return
+
+    args = [arg for arg in sys.argv[1:] if arg != '--pretty']
+    pretty = '--pretty' in sys.argv[1:]
+
+    if len(args) < 1:
         print("X12 Parser for Claim Viewer")
-        print("Usage: python3 parser_for_viewer.py <input_file> [output_file]")
+        print("Usage: python3 parser_for_viewer.py <input_file> [output_file] [--pretty]")
+        print("       python3 parser_for_viewer.py --worker [--lines] [--cache-dir DIR] [--cache-max-mb N]")
         sys.exit(1)
 
-    input_file = sys.argv[1]
+    input_file = args[0]
 
     if not os.path.exists(input_file):
         print(f"Error: file not found: {input_file}")
         sys.exit(1)
 
-    if len(sys.argv) >= 3:
-        output_file = sys.argv[2]
+    if len(args) >= 2:
+        output_file = args[1]
     else:
         os.makedirs("output_files_viewer", exist_ok=True)
         base = os.path.splitext(os.path.basename(input_file))[0]
@@ -616,9 +301,7 @@ def main():
 
     try:
         data = parse_x12_for_viewer(input_file)
-
-        with open(output_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        write_json(data, output_file, pretty=pretty)
 
         print(f"Done → {output_file}")
 
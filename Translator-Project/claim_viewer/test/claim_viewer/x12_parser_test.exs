@@ -0,0 +1,46 @@
+defmodule ClaimViewer.X12ParserTest do
+  use ExUnit.Case, async: true
+
+  alias ClaimViewer.X12Parser
+
+  @moduletag :python
+
+  @samples Path.expand("../../../../X12-Translation-Project/samples/input", __DIR__)
+
+  defp sample(name), do: Path.join(@samples, name)
+
+  test "parses concurrent uploads across the pool" do
+    results =
+      1..8
+      |> Task.async_stream(fn _ -> X12Parser.parse(sample("837P_2.txt")) end, timeout: 70_000)
+      |> Enum.map(fn {:ok, result} -> result end)
+
+    # 837P_2 holds three claims: a list of section lists
+    for result <- results do
+      assert {:ok, [[%{"section" => "transaction"} | _] | _] = claims} = result
+      assert length(claims) == 3
+    end
+  end
+
+  test "answers every caller with the result of its own file" do
+    files = List.duplicate(["837P_2.txt", "837p.txt", "Notes_on_EDI.txt"], 3) |> List.flatten()
+
+    results =
+      files
+      |> Task.async_stream(fn name -> {name, X12Parser.parse(sample(name))} end, timeout: 70_000)
+      |> Enum.map(fn {:ok, result} -> result end)
+
+    for {name, result} <- results do
+      case name do
+        "837P_2.txt" -> assert {:ok, [[_ | _] | _]} = result
+        "837p.txt" -> assert {:ok, [%{"section" => "transaction"} | _]} = result
+        "Notes_on_EDI.txt" -> assert {:error, "Not a valid X12 file" <> _} = result
+      end
+    end
+  end
+
+  test "a worker started on its own can be called directly" do
+    {:ok, worker} = X12Parser.start_link()
+    assert {:ok, [%{"section" => "transaction"} | _]} = X12Parser.parse(sample("837p.txt"), worker)
+  end
+end
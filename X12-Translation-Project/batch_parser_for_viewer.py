@@ -7,13 +7,18 @@ Processes multiple X12 files into section-based format
 import os
 import sys
 import glob
-from parser_for_viewer import parse_x12_for_viewer
-import json
+from parser_for_viewer import parse_x12_for_viewer, parse_x12_for_viewer_cached
+from x12_json import write_json
+from x12_cache import ResultCache, DEFAULT_CACHE_DIR
+from x12_claims_parser import pop_option
 
 
-def batch_parse_for_viewer(input_dir="input_files", output_dir="output_files_viewer"):
+def batch_parse_for_viewer(input_dir="input_files", output_dir="output_files_viewer", pretty=False,
+                           cache=None):
     """
     Batch parse all X12 files to viewer format
+    Writes compact JSON unless pretty=True
+    cache (an x12_cache.ResultCache) skips re-parsing byte-identical files
     """
     print("=" * 70)
     print("Batch X12 Parser for Claim Viewer")
@@ -41,6 +46,7 @@ def batch_parse_for_viewer(input_dir="input_files", output_dir="output_files_vie
     
     success_count = 0
     error_count = 0
+    cached_count = 0
     
     for input_file in input_files:
         filename = os.path.basename(input_file)
@@ -50,10 +56,15 @@ def batch_parse_for_viewer(input_dir="input_files", output_dir="output_files_vie
         print(f"🔄 Processing: {filename}")
         
         try:
-            data = parse_x12_for_viewer(input_file)
+            if cache is not None:
+                data, cached = parse_x12_for_viewer_cached(input_file, cache)
+                if cached:
+                    cached_count += 1
+                    print(f"   ♻️  Same content as an earlier file - reused cached result")
+            else:
+                data = parse_x12_for_viewer(input_file)
             
-            with open(output_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            write_json(data, output_file, pretty=pretty)
             
             print(f"   ✅ Parsed → {os.path.basename(output_file)}")
             
@@ -76,25 +87,45 @@ def batch_parse_for_viewer(input_dir="input_files", output_dir="output_files_vie
     print("=" * 70)
     print(f"✅ Successful: {success_count}")
     print(f"❌ Failed: {error_count}")
+    if cache is not None:
+        print(f"♻️  From cache: {cached_count}")
     print(f"\n📁 Output directory: {output_dir}/")
     print("=" * 70)
 
 
 def main():
-    if len(sys.argv) > 1 and sys.argv[1] in ['-h', '--help']:
+    args = sys.argv[1:]
+    
+    try:
+        cache_dir = pop_option(args, '--cache-dir')
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    pretty = '--pretty' in args
+    if '--cache' in args and cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    args = [arg for arg in args if arg not in ('--pretty', '--cache')]
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    
+    if len(args) > 0 and args[0] in ['-h', '--help']:
         print("=" * 70)
         print("Batch X12 Parser for Claim Viewer")
         print("=" * 70)
         print("\nUsage:")
-        print("  python3 batch_parser_for_viewer.py [input_dir] [output_dir]")
+        print("  python3 batch_parser_for_viewer.py [input_dir] [output_dir] [options]")
         print("\nDefault: input_dir='input_files', output_dir='output_files_viewer'")
+        print("\nOptions:")
+        print("  --pretty        Indented JSON (default output is compact)")
+        print(f"  --cache         Reuse results for byte-identical files (cache in {DEFAULT_CACHE_DIR}/)")
+        print("  --cache-dir D   Same, with the cache in directory D")
         print("=" * 70)
         return
     
-    input_dir = sys.argv[1] if len(sys.argv) > 1 else "input_files"
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "output_files_viewer"
+    input_dir = args[0] if len(args) > 0 else "input_files"
+    output_dir = args[1] if len(args) > 1 else "output_files_viewer"
     
-    batch_parse_for_viewer(input_dir, output_dir)
+    batch_parse_for_viewer(input_dir, output_dir, pretty=pretty, cache=cache)
 
 
 if __name__ == "__main__":
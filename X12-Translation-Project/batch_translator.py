@@ -9,13 +9,235 @@ import os
 import sys
 import glob
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-from x12_claims_parser import translate_x12_complete_structured, validate_output
+from x12_claims_parser import (
+    translate_x12_complete_structured, translate_x12_cached, translate_x12_indexed,
+    translate_x12_columnar, add_analytics, validate_output, pop_option, PROFILE_FULL,
+    PROFILE_RAW_ONLY, OUTPUT_PROFILES, OUTPUT_FORMATS, LAYOUT_FLAT, LAYOUT_NESTED, OUTPUT_LAYOUTS,
+    PARSER_VERSION
+)
+from x12_json import write_json
+from x12_cache import ResultCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, file_digest
+from x12_manifest import MANIFEST_NAME, load_manifest, save_manifest, check_input, record_digest
+from x12_metrics import BatchMetrics, serve_metrics
+from x12_claim_index import ClaimIndex
+from x12_columnar import DEFAULT_BATCH_SIZE, output_paths, require_pyarrow
+from x12_analytics import ClaimAnalytics, print_report, require_numpy
+from x12_multi_output import translate_x12_outputs
+from parser_for_viewer import PARSER_VERSION as VIEWER_PARSER_VERSION
 
 
-def batch_translate(input_dir="input_files", output_dir="output_files"):
+ANALYTICS_NAME = "batch_analytics.json"
+
+
+def error_class(error):
+    """
+    Name of the exception class behind a failure
+    The parsers wrap whatever went wrong in a RuntimeError; report the
+    exception it was raised from when there is one
+    """
+    inner = error.__cause__ or error.__context__
+    return type(inner or error).__name__
+
+
+def output_path_for(input_file, output_dir, output_format="json"):
+    """
+    <output_dir>/<input name without extension>_parsed.json, or for
+    parquet/arrow the claims table <...>_claims.<ext> (its service lines
+    go next to it in <...>_service_lines.<ext>)
+    """
+    basename_no_ext = os.path.splitext(os.path.basename(input_file))[0]
+    if output_format != "json":
+        return output_paths(os.path.join(output_dir, basename_no_ext), output_format)[0]
+    return os.path.join(output_dir, f"{basename_no_ext}_parsed.json")
+
+
+def viewer_path_for(input_file, viewer_dir):
+    """<viewer_dir>/<input name without extension>_claim.json, as batch_parser_for_viewer names it"""
+    basename_no_ext = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(viewer_dir, f"{basename_no_ext}_claim.json")
+
+
+def translate_one_file(input_file, output_dir, paranoid=False, pretty=False, profile=PROFILE_FULL,
+                       cache=None, index=False, output_format="json", batch_size=DEFAULT_BATCH_SIZE,
+                       analytics=False, viewer_dir=None, layout=LAYOUT_FLAT, digest=False):
+    """
+    Translate and validate a single file for the batch
+    Returns (result record, progress lines) so worker processes can hand
+    their output back to the parent to be printed in input order
+    paranoid=True re-reads the written JSON instead of trusting the serializer
+    pretty=True writes indented JSON instead of compact
+    profile picks which data copies to build (see x12_claims_parser.OUTPUT_PROFILES)
+    cache (an x12_cache.ResultCache) reuses the result of a byte-identical file
+    The record also carries seconds, bytes_in and bytes_out (and error_type on
+    failure) for x12_metrics
+    index=True writes the output with claim offsets tracked and puts the
+    claim index rows in the record ('index_rows') for the parent to store
+    output_format "parquet" / "arrow" writes claim and service-line tables
+    (batch_size claims per record batch) instead of JSON; the cache and
+    profile do not apply to them
+    analytics=True adds summary["analytics"] to the output and puts the
+    file's x12_analytics.ClaimAnalytics in the record ('analytics') for the
+    batch totals; it needs every claim parsed, so the cache is skipped
+    viewer_dir also writes the claim viewer JSON (<input>_claim.json) there,
+    built from the same tokenizer pass as the main output (x12_multi_output)
+    layout="nested" writes interchanges -> functional groups -> transaction
+    sets instead of the flat layout (JSON output only, no index)
+    digest=True puts the input's SHA-256 in the record ('sha256') for the
+    incremental manifest, hashed here so the parent never reads the file
+    """
+    lines = []
+    log = lines.append
+    
+    filename = os.path.basename(input_file)
+    output_file = output_path_for(input_file, output_dir, output_format)
+    columnar = output_format != "json"
+    started = time.perf_counter()
+    
+    log(f"🔄 Processing: {filename}")
+    
+    try:
+        # Hashed before translating: the manifest must describe the bytes translated
+        input_digest = file_digest(input_file) if digest else None
+        log(f"   📝 Translating to structured format...")
+        cached = False
+        index_rows = None
+        output_files = [output_file]
+        claim_analytics = ClaimAnalytics() if analytics else None
+        viewer_file = viewer_path_for(input_file, viewer_dir) if viewer_dir is not None else None
+        if viewer_file is not None:
+            # One pass feeds the main output and the viewer JSON (both written here)
+            base = os.path.join(output_dir, os.path.splitext(filename)[0])
+            data, output_files, cached = translate_x12_outputs(
+                input_file, detailed_file=None if columnar else output_file, viewer_file=viewer_file,
+                tables_base=base if columnar else None, tables_format=output_format,
+                batch_size=batch_size, profile=profile, pretty=pretty, analytics=claim_analytics,
+                cache=cache, layout=layout
+            )
+        elif columnar:
+            base = os.path.join(output_dir, os.path.splitext(filename)[0])
+            data, output_files = translate_x12_columnar(input_file, base, output_format, batch_size,
+                                                        analytics=claim_analytics)
+        elif index:
+            data, index_rows, cached = translate_x12_indexed(input_file, output_file, cache=cache,
+                                                             profile=profile, analytics=claim_analytics)
+        elif cache is not None and not analytics:
+            data, cached = translate_x12_cached(input_file, cache, profile=profile, layout=layout)
+        else:
+            data = translate_x12_complete_structured(input_file, profile=profile,
+                                                     claim_hook=claim_analytics, layout=layout)
+            add_analytics(data, claim_analytics)
+        if cached:
+            log(f"   ♻️  Same content as an earlier file - reused cached result")
+        
+        if not index and not columnar and viewer_file is None:
+            write_json(data, output_file, pretty=pretty)
+        
+        summary = data.get('summary', {})
+        segments = summary.get('total_segments', 0)
+        claims = summary.get('total_claims', 0)
+        service_lines = summary.get('total_service_lines', 0)
+        
+        file_type = data.get('file_info', {}).get('file_type', 'Unknown')
+        
+        log(f"   ✅ Translated → {os.path.basename(output_file)}")
+        if viewer_file is not None:
+            log(f"   ✅ Viewer → {os.path.basename(viewer_file)}")
+        log(f"      File Type: {file_type}")
+        log(f"      {segments} segments, {claims} claim(s), {service_lines} service line(s)")
+        
+        log(f"   🔍 Validating...")
+        
+        syntax_valid = True
+        if paranoid and not columnar:
+            try:
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    json.load(f)
+            except json.JSONDecodeError as e:
+                syntax_valid = False
+                log(f"      ⚠️  JSON syntax error: {e}")
+        
+        is_valid, msg = validate_output(data)
+        
+        if syntax_valid and is_valid:
+            log(f"   ✅ Validation passed")
+            validation_status = "VALID"
+        else:
+            log(f"   ⚠️  Validation warning: {msg if not is_valid else 'Syntax error'}")
+            validation_status = f"WARNING: {msg if not is_valid else 'Syntax error'}"
+        
+        size = sum(os.path.getsize(path) for path in output_files)
+        size_str = f"{size:,} bytes" if size < 1024 else f"{size/1024:.1f} KB"
+        
+        record = {
+            'input': filename,
+            'output': os.path.basename(output_file),
+            'status': 'SUCCESS',
+            'validation': validation_status,
+            'file_type': file_type,
+            'segments': segments,
+            'claims': claims,
+            'service_lines': service_lines,
+            'size': size_str,
+            'cached': cached,
+            'seconds': time.perf_counter() - started,
+            'bytes_in': os.path.getsize(input_file),
+            'bytes_out': size
+        }
+        if input_digest is not None:
+            record['sha256'] = input_digest
+        if index_rows is not None:
+            record['index_rows'] = index_rows
+        if claim_analytics is not None:
+            record['analytics'] = claim_analytics
+        
+    except Exception as e:
+        record = {
+            'input': filename,
+            'output': '-',
+            'status': 'FAILED',
+            'error': str(e),
+            'error_type': error_class(e),
+            'seconds': time.perf_counter() - started,
+            'bytes_in': os.path.getsize(input_file) if os.path.exists(input_file) else 0
+        }
+        log(f"   ❌ Failed: {str(e)}")
+    
+    log("")
+    
+    return record, lines
+
+
+def batch_translate(input_dir="input_files", output_dir="output_files", workers=1, paranoid=False,
+                    pretty=False, profile=PROFILE_FULL, cache=None, incremental=False,
+                    manifest_path=None, metrics=None, metrics_file=None, index_path=None,
+                    output_format="json", batch_size=DEFAULT_BATCH_SIZE, analytics=False,
+                    viewer_dir=None, layout=LAYOUT_FLAT):
     """
     Batch translate all X12 files to structured JSON with validation
+    workers > 1 spreads the files over a process pool
+    paranoid=True re-reads every output file to check its JSON syntax
+    pretty=True writes indented JSON instead of compact
+    profile picks which data copies to build (full, typed-only, raw-only)
+    cache (an x12_cache.ResultCache) skips re-parsing byte-identical files
+    incremental=True only translates files that are new or changed since the
+    last run, per the manifest (default <output_dir>/.x12_manifest.json)
+    metrics (an x12_metrics.BatchMetrics) is updated as each file finishes;
+    metrics_file writes it as a Prometheus textfile (.prom) at the end
+    index_path records every claim's location in that SQLite claim index
+    (x12_claim_index); outputs are then written claims-first and compact
+    output_format "parquet" / "arrow" writes flat claim and service-line
+    tables per input instead of JSON (see x12_columnar)
+    analytics=True adds per-file analytics (summary["analytics"]) and writes
+    the totals over every file translated in this run to
+    <output_dir>/batch_analytics.json (see x12_analytics)
+    viewer_dir writes each file's claim viewer JSON there as well, from the
+    same tokenizer pass (replaces a separate batch_parser_for_viewer run)
+    layout="nested" writes each file as interchanges -> functional groups ->
+    transaction sets (see x12_claims_parser.translate_x12_complete_structured)
     """
     print("=" * 70)
     print("X12 Batch Translator - Complete Structured Output")
@@ -29,13 +251,15 @@ def batch_translate(input_dir="input_files", output_dir="output_files"):
         return
     
     os.makedirs(output_dir, exist_ok=True)
+    if viewer_dir is not None:
+        os.makedirs(viewer_dir, exist_ok=True)
     
     extensions = ['*.txt', '*.edi', '*.x12', '*.837', '*.TXT', '*.EDI']
     input_files = []
     
     for ext in extensions:
         pattern = os.path.join(input_dir, ext)
-        input_files.extend(glob.glob(pattern))
+        input_files.extend(sorted(glob.glob(pattern)))
     
     if not input_files:
         print(f"⚠️  No X12 files found in {input_dir}/")
@@ -44,87 +268,118 @@ def batch_translate(input_dir="input_files", output_dir="output_files"):
     
     print(f"📊 Found {len(input_files)} file(s) to process\n")
     
-    success_count = 0
-    error_count = 0
-    results = []
+    started = time.perf_counter()
+    if metrics is None and metrics_file is not None:
+        metrics = BatchMetrics()
+    if metrics is not None:
+        metrics.workers = workers
     
-    for input_file in input_files:
-        filename = os.path.basename(input_file)
-        basename_no_ext = os.path.splitext(filename)[0]
-        output_file = os.path.join(output_dir, f"{basename_no_ext}_parsed.json")
+    skipped_count = 0
+    if incremental:
+        # Settle which outputs are still current before any work is handed out;
+        # this only stats the inputs (new and changed files are hashed by the workers)
+        manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+        manifest = load_manifest(manifest_path)
+        options = {"profile": profile, "pretty": pretty}
+        if output_format != "json":
+            options["format"] = output_format
+        if viewer_dir is not None:
+            options["viewer"] = VIEWER_PARSER_VERSION
+        if layout != LAYOUT_FLAT:
+            options["layout"] = layout
         
-        print(f"🔄 Processing: {filename}")
-        
-        try:
-            print(f"   📝 Translating to structured format...")
-            data = translate_x12_complete_structured(input_file)
-            
-            with open(output_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            
-            summary = data.get('summary', {})
-            segments = summary.get('total_segments', 0)
-            claims = summary.get('total_claims', 0)
-            service_lines = summary.get('total_service_lines', 0)
-            
-            file_type = data.get('file_info', {}).get('file_type', 'Unknown')
-            
-            print(f"   ✅ Translated → {os.path.basename(output_file)}")
-            print(f"      File Type: {file_type}")
-            print(f"      {segments} segments, {claims} claim(s), {service_lines} service line(s)")
-            
-            print(f"   🔍 Validating...")
-            
-            try:
-                with open(output_file, 'r') as f:
-                    json.load(f)
-                syntax_valid = True
-            except json.JSONDecodeError as e:
-                syntax_valid = False
-                print(f"      ⚠️  JSON syntax error: {e}")
-            
-            is_valid, msg = validate_output(data)
-            
-            if syntax_valid and is_valid:
-                print(f"   ✅ Validation passed")
-                validation_status = "VALID"
+        pending_entries = {}
+        current_entries = {}
+        for input_file in input_files:
+            name = os.path.basename(input_file)
+            output_files = [output_path_for(input_file, output_dir, output_format)]
+            if viewer_dir is not None:
+                output_files.append(viewer_path_for(input_file, viewer_dir))
+            is_current, entry = check_input(manifest.get(name), input_file, output_files,
+                                            PARSER_VERSION, options)
+            if is_current:
+                current_entries[name] = entry
             else:
-                print(f"   ⚠️  Validation warning: {msg if not is_valid else 'Syntax error'}")
-                validation_status = f"WARNING: {msg if not is_valid else 'Syntax error'}"
-            
-            size = os.path.getsize(output_file)
-            size_str = f"{size:,} bytes" if size < 1024 else f"{size/1024:.1f} KB"
-            
-            success_count += 1
-            results.append({
-                'input': filename,
-                'output': os.path.basename(output_file),
-                'status': 'SUCCESS',
-                'validation': validation_status,
-                'file_type': file_type,
-                'segments': segments,
-                'claims': claims,
-                'service_lines': service_lines,
-                'size': size_str
-            })
-            
-        except Exception as e:
-            error_count += 1
-            results.append({
-                'input': filename,
-                'output': '-',
-                'status': 'FAILED',
-                'error': str(e)
-            })
-            print(f"   ❌ Failed: {str(e)}")
+                pending_entries[name] = entry
         
-        print()
+        skipped_count = len(current_entries)
+        input_files = [f for f in input_files if os.path.basename(f) in pending_entries]
+        print(f"⏭️  {skipped_count} file(s) unchanged since the last run, {len(input_files)} to translate\n")
+        if metrics is not None:
+            metrics.observe_skipped(skipped_count)
+    
+    results = []
+    translate = partial(translate_one_file, output_dir=output_dir, paranoid=paranoid,
+                        pretty=pretty, profile=profile, cache=cache, index=index_path is not None,
+                        output_format=output_format, batch_size=batch_size, analytics=analytics,
+                        viewer_dir=viewer_dir, layout=layout, digest=incremental)
+    index = ClaimIndex(index_path) if index_path is not None else None
+    batch_analytics = ClaimAnalytics() if analytics else None
+    
+    def finished(record):
+        results.append(record)
+        if metrics is not None:
+            metrics.observe(record)
+        # Only the parent writes to the index; workers send their rows back
+        index_rows = record.pop('index_rows', None)
+        if index is not None and index_rows is not None:
+            index.replace_file(os.path.join(output_dir, record['output']), index_rows,
+                               os.path.join(input_dir, record['input']))
+        claim_analytics = record.pop('analytics', None)
+        if batch_analytics is not None and claim_analytics is not None:
+            batch_analytics.merge(claim_analytics)
+    
+    if workers > 1:
+        # Ordered map: results (and progress output) stay in input order
+        chunksize = max(1, len(input_files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for record, lines in pool.map(translate, input_files, chunksize=chunksize):
+                print("\n".join(lines))
+                finished(record)
+        if cache is not None:
+            # Each worker only counted its own writes: trim what they wrote together
+            cache.check_size()
+    else:
+        for input_file in input_files:
+            record, lines = translate(input_file)
+            print("\n".join(lines))
+            finished(record)
+    
+    if index is not None:
+        index.close()
+    
+    analytics_summary = None
+    if batch_analytics is not None:
+        analytics_summary = batch_analytics.summarize()
+        write_json(analytics_summary, os.path.join(output_dir, ANALYTICS_NAME), pretty=True)
+    
+    if metrics is not None:
+        metrics.finish(time.perf_counter() - started)
+        if metrics_file is not None:
+            metrics.write_textfile(metrics_file)
+    
+    success_count = sum(1 for r in results if r['status'] == 'SUCCESS')
+    error_count = len(results) - success_count
+    
+    if incremental:
+        # Failed files stay out of the manifest so the next run retries them;
+        # inputs that disappeared drop out with them
+        for result in results:
+            if result['status'] == 'SUCCESS':
+                current_entries[result['input']] = record_digest(pending_entries[result['input']],
+                                                                 result['sha256'])
+        save_manifest(manifest_path, current_entries)
     
     print("=" * 70)
     print("Batch Processing Complete")
     print("=" * 70)
     print(f"✅ Successful: {success_count}")
     print(f"❌ Failed: {error_count}")
+    if incremental:
+        print(f"⏭️  Unchanged (skipped): {skipped_count}")
+    if cache is not None:
+        cached_count = sum(1 for r in results if r.get('cached'))
+        print(f"♻️  From cache: {cached_count}")
     print()
     
     if success_count > 0:
@@ -173,29 +428,148 @@ def batch_translate(input_dir="input_files", output_dir="output_files"):
                 print(f"   {file_type}: {count} file(s)")
             print()
     
+    if analytics_summary is not None:
+        print_report(analytics_summary)
+        print()
+    
     print(f"📁 Output directory: {output_dir}/")
+    if viewer_dir is not None:
+        print(f"📁 Viewer output directory: {viewer_dir}/")
+    if metrics_file is not None:
+        print(f"📈 Metrics: {metrics_file}")
+    if index_path is not None:
+        print(f"🗂️  Claim index: {index_path}")
+    if analytics_summary is not None:
+        print(f"📈 Analytics: {os.path.join(output_dir, ANALYTICS_NAME)}")
     print("=" * 70)
 
 
 def main():
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ['-h', '--help']:
+    args = sys.argv[1:]
+    
+    try:
+        workers = int(pop_option(args, '--workers', 1))
+        profile = pop_option(args, '--profile', PROFILE_FULL)
+        cache_dir = pop_option(args, '--cache-dir')
+        cache_max_mb = int(pop_option(args, '--cache-max-mb', DEFAULT_MAX_BYTES // (1024 * 1024)))
+        manifest_path = pop_option(args, '--manifest')
+        metrics_file = pop_option(args, '--metrics-file')
+        index_path = pop_option(args, '--index')
+        output_format = pop_option(args, '--format', 'json')
+        batch_size = int(pop_option(args, '--batch-size', DEFAULT_BATCH_SIZE))
+        viewer_dir = pop_option(args, '--viewer-dir')
+        layout = pop_option(args, '--layout', LAYOUT_FLAT)
+        metrics_port = pop_option(args, '--metrics-port')
+        metrics_port = int(metrics_port) if metrics_port is not None else None
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    if profile not in OUTPUT_PROFILES:
+        print(f"❌ Error: unknown profile '{profile}' (choose from {', '.join(OUTPUT_PROFILES)})")
+        sys.exit(1)
+    
+    if output_format not in OUTPUT_FORMATS:
+        print(f"❌ Error: unknown format '{output_format}' (choose from {', '.join(OUTPUT_FORMATS)})")
+        sys.exit(1)
+    
+    if layout not in OUTPUT_LAYOUTS:
+        print(f"❌ Error: unknown layout '{layout}' (choose from {', '.join(OUTPUT_LAYOUTS)})")
+        sys.exit(1)
+    
+    if layout == LAYOUT_NESTED:
+        if profile == PROFILE_RAW_ONLY:
+            print("❌ Error: --layout nested needs typed sections (use --profile full or typed-only)")
+            sys.exit(1)
+        if output_format != 'json' or index_path is not None:
+            print("❌ Error: --layout nested is JSON only and cannot be combined with --index")
+            sys.exit(1)
+    
+    if output_format != 'json' and index_path is not None:
+        print("❌ Error: --index needs JSON output (it records byte offsets into the JSON)")
+        sys.exit(1)
+    
+    if viewer_dir is not None and index_path is not None:
+        print("❌ Error: --viewer-dir cannot be combined with --index")
+        sys.exit(1)
+    
+    if output_format != 'json':
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+    
+    paranoid = '--paranoid' in args
+    pretty = '--pretty' in args
+    analytics = '--analytics' in args
+    incremental = '--incremental' in args or manifest_path is not None
+    if '--cache' in args and cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    args = [arg for arg in args
+            if arg not in ('--paranoid', '--pretty', '--cache', '--incremental', '--analytics')]
+    
+    if analytics:
+        try:
+            require_numpy()
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+    
+    cache = None
+    if cache_dir is not None:
+        cache = ResultCache(cache_dir, max_bytes=cache_max_mb * 1024 * 1024)
+    
+    if len(args) > 0:
+        if args[0] in ['-h', '--help']:
             print("=" * 70)
             print("X12 Batch Translator - Complete Structured Output")
             print("=" * 70)
             print("\nUsage:")
-            print("  python3 batch_translator.py [input_dir] [output_dir]")
+            print("  python3 batch_translator.py [input_dir] [output_dir] [options]")
             print("\nDefault:")
-            print("  input_dir='input_files', output_dir='output_files'")
+            print("  input_dir='input_files', output_dir='output_files', workers=1")
+            print("\nOptions:")
+            print("  --workers N   Translate files in N parallel processes")
+            print("  --paranoid    Re-read each written JSON file to double-check its syntax")
+            print("  --pretty      Indented JSON (default output is compact)")
+            print("  --profile P   full (default), typed-only or raw-only")
+            print(f"  --cache       Reuse results for byte-identical files (cache in {DEFAULT_CACHE_DIR}/)")
+            print("  --cache-dir D Same, with the cache in directory D")
+            print("  --cache-max-mb N  Cache size limit; least recently used entries go first")
+            print("  --incremental Only translate files that are new or changed since the last")
+            print(f"                run (tracked in <output_dir>/{MANIFEST_NAME})")
+            print("  --manifest F  Same, with the manifest kept in file F")
+            print("  --metrics-file F  Write Prometheus metrics to F (.prom, for the")
+            print("                node_exporter textfile collector) when the batch ends")
+            print("  --metrics-port P  Serve live metrics on http://127.0.0.1:P/metrics")
+            print("                while the batch runs")
+            print("  --index DB    Record every claim's location in the SQLite claim index DB")
+            print("                (look claims up with x12_claim_index.py)")
+            print("  --format F    json (default), or parquet / arrow: flat claim and")
+            print("                service-line tables per input (needs pyarrow)")
+            print("  --batch-size N  Claims per Parquet/Arrow record batch (default 10000)")
+            print("  --analytics   Charge totals per payer/provider, CLM02 vs service-line")
+            print("                reconciliation and percentiles, per file and for the")
+            print(f"                batch (<output_dir>/{ANALYTICS_NAME}; needs numpy)")
+            print("  --viewer-dir D  Also write claim viewer JSON (<input>_claim.json) to D,")
+            print("                from the same single read of each file")
+            print("  --layout L    flat (default) or nested: interchanges -> functional groups")
+            print("                -> transaction sets, for files with many ST/SE sets")
             print("\nExamples:")
             print("  python3 batch_translator.py")
             print("  python3 batch_translator.py my_input my_output")
+            print("  python3 batch_translator.py my_input my_output --workers 8")
+            print("  python3 batch_translator.py my_input my_output --incremental")
+            print("  python3 batch_translator.py my_input my_output --viewer-dir my_viewer_output")
+            print("  python3 batch_translator.py my_input my_output --metrics-file /var/lib/node_exporter/x12.prom")
             print("\nOutput Format:")
             print("  - Structured JSON with business headers")
             print("  - ALL information included (no filtering)")
             print("  - Automatic file type detection")
             print("  - Automatic validation")
             print("  - Files named: <input>_parsed.json")
+            print("  - Parquet/Arrow: <input>_claims.<ext> + <input>_service_lines.<ext>")
             print("\nSupported Transaction Types:")
             print("  - 837P (Professional Healthcare Claim)")
             print("  - 837I (Institutional Healthcare Claim)")
@@ -207,13 +581,29 @@ def main():
             print("=" * 70)
             return
         
-        input_dir = sys.argv[1]
-        output_dir = sys.argv[2] if len(sys.argv) > 2 else "output_files"
+        input_dir = args[0]
+        output_dir = args[1] if len(args) > 1 else "output_files"
     else:
         input_dir = "input_files"
         output_dir = "output_files"
     
-    batch_translate(input_dir, output_dir)
+    metrics = None
+    server = None
+    if metrics_file is not None or metrics_port is not None:
+        metrics = BatchMetrics()
+    if metrics_port is not None:
+        server = serve_metrics(metrics, metrics_port)
+        print(f"📈 Serving metrics on http://127.0.0.1:{metrics_port}/metrics")
+    
+    try:
+        batch_translate(input_dir, output_dir, workers=workers, paranoid=paranoid,
+                        pretty=pretty, profile=profile, cache=cache, incremental=incremental,
+                        manifest_path=manifest_path, metrics=metrics, metrics_file=metrics_file,
+                        index_path=index_path, output_format=output_format, batch_size=batch_size,
+                        analytics=analytics, viewer_dir=viewer_dir, layout=layout)
+    finally:
+        if server is not None:
+            server.shutdown()
 
 
 if __name__ == "__main__":
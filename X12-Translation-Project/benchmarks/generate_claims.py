@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Synthetic 837 Generator for Benchmarks
+Scales a sample claim file (837P, 837I or 837D) up to any number of claims
+Every subscriber loop of the template is repeated with fresh HL numbers and
+claim IDs, split over ST/SE transaction sets with correct SE01 segment
+counts and matching ISA/IEA, GS/GE and ST/SE control numbers
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from x12core import tokenize_file
+from x12_claims_parser import pop_option
+
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "samples", "input")
+
+# Template sample per 837 subtype
+TEMPLATES = {
+    "837P": "837p.txt",
+    "837I": "837i.txt",
+    "837D": "837d.txt",
+}
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_CLAIMS_PER_TRANSACTION = 5000
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500"""
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    if scale != 1:
+        text = text[:-1]
+    return int(float(text) * scale)
+
+
+def size_label(claims):
+    """10000 -> '10k', 1000000 -> '1m'"""
+    if claims % 1_000_000 == 0:
+        return f"{claims // 1_000_000}m"
+    if claims % 1_000 == 0:
+        return f"{claims // 1_000}k"
+    return str(claims)
+
+
+def load_template(template_file):
+    """
+    Split a single-transaction 837 into the parts that get repeated
+    Returns (isa, gs, header, body): header runs from ST up to the first
+    subscriber HL (HL03 = 22), body from there up to SE
+    """
+    segments = [elements for _, elements in tokenize_file(template_file)]
+    ids = [elements[0] for elements in segments]
+
+    for required in ('ISA', 'GS', 'ST', 'SE'):
+        if required not in ids:
+            raise RuntimeError(f"Template {template_file} has no {required} segment")
+
+    st = ids.index('ST')
+    se = ids.index('SE')
+    first_subscriber = next((i for i in range(st, se)
+                             if ids[i] == 'HL' and len(segments[i]) > 3 and segments[i][3] == '22'),
+                            None)
+    if first_subscriber is None:
+        raise RuntimeError(f"Template {template_file} has no subscriber HL (HL03 = 22)")
+
+    body = segments[first_subscriber:se]
+    if not any(elements[0] == 'CLM' for elements in body):
+        raise RuntimeError(f"Template {template_file} has no CLM segment")
+
+    return (segments[ids.index('ISA')], segments[ids.index('GS')],
+            segments[st:first_subscriber], body)
+
+
+def generate_837(template_file, output_file, claims,
+                 claims_per_transaction=DEFAULT_CLAIMS_PER_TRANSACTION):
+    """
+    Write a synthetic 837 with at least `claims` claims to output_file
+    Returns {"claims", "transactions", "segments", "bytes"}
+    """
+    isa, gs, header, body = load_template(template_file)
+
+    body_claims = sum(1 for elements in body if elements[0] == 'CLM')
+    body_hls = [elements for elements in body if elements[0] == 'HL']
+    first_body_hl = int(body_hls[0][1])
+    copies_per_transaction = max(1, claims_per_transaction // body_claims)
+    total_copies = -(-claims // body_claims)
+
+    ele_sep = '*'
+    seg_term = '~\n'
+    gs_control = gs[6] if len(gs) > 6 else '1'
+    isa_control = isa[13]
+
+    def line(elements):
+        return ele_sep.join(elements) + seg_term
+
+    copy_number = 0
+    transactions = 0
+    segment_total = 0
+
+    with open(output_file, 'w', encoding='utf-8', newline='') as out:
+        out.write(line(isa))
+        out.write(line(gs))
+        segment_total += 2
+
+        while copy_number < total_copies:
+            transactions += 1
+            control = f"{transactions:04d}"
+            transaction_segments = 0
+
+            for elements in header:
+                elements = list(elements)
+                if elements[0] == 'ST':
+                    elements[2] = control
+                out.write(line(elements))
+                transaction_segments += 1
+
+            hl_offset = 0
+            for _ in range(min(copies_per_transaction, total_copies - copy_number)):
+                copy_number += 1
+                for elements in body:
+                    seg_id = elements[0]
+                    if seg_id == 'HL':
+                        elements = list(elements)
+                        hl_id = int(elements[1])
+                        elements[1] = str(hl_id + hl_offset)
+                        # Parents inside the repeated body move with it;
+                        # the billing provider HL in the header does not
+                        if elements[2] and int(elements[2]) >= first_body_hl:
+                            elements[2] = str(int(elements[2]) + hl_offset)
+                    elif seg_id == 'CLM':
+                        elements = list(elements)
+                        elements[1] = f"{elements[1]}-{copy_number}"
+                    out.write(line(elements))
+                    transaction_segments += 1
+                hl_offset += len(body_hls)
+
+            transaction_segments += 1
+            out.write(line(['SE', str(transaction_segments), control]))
+            segment_total += transaction_segments
+
+        out.write(line(['GE', str(transactions), gs_control]))
+        out.write(line(['IEA', '1', isa_control]))
+        segment_total += 2
+
+    return {
+        "claims": total_copies * body_claims,
+        "transactions": transactions,
+        "segments": segment_total,
+        "bytes": os.path.getsize(output_file)
+    }
+
+
+def generate_suite(output_dir, sizes=DEFAULT_SIZES, subtypes=tuple(TEMPLATES),
+                   claims_per_transaction=DEFAULT_CLAIMS_PER_TRANSACTION, samples_dir=SAMPLES_DIR):
+    """
+    Generate synthetic_<subtype>_<size>.txt for every subtype and size,
+    skipping files that already exist
+    Returns {output_file: info}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    generated = {}
+
+    for subtype in subtypes:
+        template_file = os.path.join(samples_dir, TEMPLATES[subtype])
+        for claims in sizes:
+            output_file = os.path.join(output_dir, f"synthetic_{subtype.lower()}_{size_label(claims)}.txt")
+            if os.path.exists(output_file):
+                print(f"⏭️  {os.path.basename(output_file)} already exists")
+                generated[output_file] = None
+                continue
+
+            print(f"🔄 Generating {os.path.basename(output_file)} ({claims:,} claims)...")
+            info = generate_837(template_file, output_file, claims, claims_per_transaction)
+            print(f"   ✅ {info['segments']:,} segments, {info['transactions']} transaction set(s), "
+                  f"{info['bytes'] / (1024 * 1024):.1f} MB")
+            generated[output_file] = info
+
+    return generated
+
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] in ['-h', '--help']:
+        print("Usage:")
+        print("  python3 benchmarks/generate_claims.py [output_dir] [options]")
+        print("\nOptions:")
+        print("  --sizes LIST     Claim counts, e.g. 10k,100k,1m (default)")
+        print("  --types LIST     837P,837I,837D (default: all three)")
+        print(f"  --per-st N       Claims per ST/SE transaction set (default {DEFAULT_CLAIMS_PER_TRANSACTION})")
+        print("\nDefault output_dir: benchmarks/data")
+        return
+
+    try:
+        sizes = [parse_size(size) for size in pop_option(args, '--sizes', '10k,100k,1m').split(',')]
+        subtypes = [subtype.strip().upper() for subtype in pop_option(args, '--types', ','.join(TEMPLATES)).split(',')]
+        per_st = int(pop_option(args, '--per-st', DEFAULT_CLAIMS_PER_TRANSACTION))
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    unknown = [subtype for subtype in subtypes if subtype not in TEMPLATES]
+    if unknown:
+        print(f"❌ Error: unknown type(s) {', '.join(unknown)} (choose from {', '.join(TEMPLATES)})")
+        sys.exit(1)
+
+    output_dir = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    generate_suite(output_dir, sizes, subtypes, per_st)
+
+
+if __name__ == "__main__":
+    main()
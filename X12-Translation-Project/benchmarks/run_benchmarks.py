@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+X12 Translator Benchmark Suite
+Times translate_x12_complete_structured, parse_x12_for_viewer and both batch
+drivers on every sample file (plus optional synthetic 837P/I/D files) and
+writes throughput, peak RSS and per-phase timings as JSON
+Each measurement runs in a fresh Python process so peak RSS belongs to that
+file alone
+"""
+
+import contextlib
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from x12core import iter_segments
+from x12_json import dumps
+from x12_claims_parser import translate_x12_complete_structured, pop_option, PARSER_VERSION
+from parser_for_viewer import parse_x12_for_viewer, PARSER_VERSION as VIEWER_PARSER_VERSION
+from generate_claims import SAMPLES_DIR, generate_suite, parse_size
+
+
+RESULTS_FORMAT = 1
+FILE_TARGETS = ("detailed", "viewer")
+BATCH_TARGETS = ("batch-detailed", "batch-viewer")
+TARGETS = FILE_TARGETS + BATCH_TARGETS
+EXTENSIONS = ('*.txt', '*.edi', '*.x12', '*.837', '*.TXT', '*.EDI')
+
+DEFAULT_REPEAT = 5
+# Files at least this big are timed once, whatever --repeat says
+LARGE_FILE_BYTES = 10 * 1024 * 1024
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None without the resource module)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def input_files_in(input_dir):
+    files = []
+    for ext in EXTENSIONS:
+        files.extend(glob.glob(os.path.join(input_dir, ext)))
+    return sorted(set(files))
+
+
+def best_of(repeat, func):
+    """(best seconds, mean seconds, last return value) over repeat calls"""
+    times = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times), value
+
+
+def read_phase(filepath):
+    with open(filepath, 'rb') as f:
+        return len(f.read())
+
+
+def tokenize_phase(filepath):
+    count = 0
+    with open(filepath, 'rb') as f:
+        for _ in iter_segments(f):
+            count += 1
+    return count
+
+
+def measure_file(target, filepath, repeat):
+    """
+    Phase timings for one file (best of repeat runs, in seconds)
+    read      - raw file read
+    tokenize  - the shared streaming tokenizer on its own
+    parse     - the full parser call (tokenizing included)
+    build     - parse minus tokenize: handler / record building cost
+    serialize - x12_json.dumps of the parser output
+    """
+    parse = translate_x12_complete_structured if target == "detailed" else parse_x12_for_viewer
+
+    read_best, _, size = best_of(repeat, lambda: read_phase(filepath))
+    tokenize_best, _, segments = best_of(repeat, lambda: tokenize_phase(filepath))
+    parse_best, parse_mean, data = best_of(repeat, lambda: parse(filepath))
+    serialize_best, _, text = best_of(repeat, lambda: dumps(data))
+
+    claims = None
+    if target == "detailed":
+        claims = data["summary"]["total_claims"]
+    elif data:
+        claims = len(data) if isinstance(data[0], list) else 1
+
+    total = parse_best + serialize_best
+    return {
+        "bytes": size,
+        "segments": segments,
+        "claims": claims,
+        "output_bytes": len(text.encode('utf-8')),
+        "seconds": round(total, 6),
+        "parse_seconds_mean": round(parse_mean, 6),
+        "segments_per_s": round(segments / total) if total else None,
+        "mb_per_s": round(size / (1024 * 1024) / total, 2) if total else None,
+        "phases": {
+            "read": round(read_best, 6),
+            "tokenize": round(tokenize_best, 6),
+            "parse": round(parse_best, 6),
+            "build": round(max(parse_best - tokenize_best, 0.0), 6),
+            "serialize": round(serialize_best, 6)
+        }
+    }
+
+
+def measure_batch(target, input_dir, repeat, workers):
+    """Wall time of one batch driver over a whole directory (output to a temp dir)"""
+    from batch_translator import batch_translate
+    from batch_parser_for_viewer import batch_parse_for_viewer
+
+    files = input_files_in(input_dir)
+    size = sum(os.path.getsize(path) for path in files)
+    segments = 0
+    for path in files:
+        try:
+            segments += tokenize_phase(path)
+        except RuntimeError:
+            pass   # not X12: the batch driver reports it as failed
+
+    def run():
+        with tempfile.TemporaryDirectory() as output_dir:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                if target == "batch-detailed":
+                    batch_translate(input_dir, output_dir, workers=workers)
+                else:
+                    batch_parse_for_viewer(input_dir, output_dir)
+
+    best, mean, _ = best_of(repeat, run)
+    return {
+        "files": len(files),
+        "bytes": size,
+        "segments": segments,
+        "workers": workers if target == "batch-detailed" else 1,
+        "seconds": round(best, 6),
+        "seconds_mean": round(mean, 6),
+        "files_per_s": round(len(files) / best, 2) if best else None,
+        "segments_per_s": round(segments / best) if best else None,
+        "mb_per_s": round(size / (1024 * 1024) / best, 2) if best else None
+    }
+
+
+def measure(target, path, repeat, workers):
+    """One measurement in this process; adds baseline and peak RSS"""
+    baseline = peak_rss_mb()
+    if target in FILE_TARGETS:
+        result = measure_file(target, path, repeat)
+    else:
+        result = measure_batch(target, path, repeat, workers)
+    result.update({
+        "target": target,
+        "input": os.path.relpath(path, PROJECT_DIR),
+        "repeat": repeat,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb()
+    })
+    return result
+
+
+def measure_isolated(target, path, repeat, workers):
+    """Run measure() in a fresh interpreter; returns its result or an error record"""
+    command = [sys.executable, os.path.abspath(__file__), '--measure', target, path,
+               '--repeat', str(repeat), '--workers', str(workers)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        error = (completed.stderr.strip().splitlines() or ["failed"])[-1]
+        return {"target": target, "input": os.path.relpath(path, PROJECT_DIR), "error": error}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                                   capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def run_suite(input_dirs, targets=TARGETS, repeat=DEFAULT_REPEAT, workers=1):
+    """Measure every target on every file / directory; returns the results document"""
+    results = []
+
+    for input_dir in input_dirs:
+        for filepath in input_files_in(input_dir):
+            runs = repeat if os.path.getsize(filepath) < LARGE_FILE_BYTES else 1
+            for target in targets:
+                if target in FILE_TARGETS:
+                    print(f"⏱️  {target:<15} {os.path.basename(filepath)}")
+                    results.append(measure_isolated(target, filepath, runs, workers))
+
+        for target in targets:
+            if target in BATCH_TARGETS:
+                files = input_files_in(input_dir)
+                runs = repeat if all(os.path.getsize(f) < LARGE_FILE_BYTES for f in files) else 1
+                print(f"⏱️  {target:<15} {input_dir}/")
+                results.append(measure_isolated(target, input_dir, runs, workers))
+
+    return {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "git_revision": git_revision(),
+            "parser_version": PARSER_VERSION,
+            "viewer_parser_version": VIEWER_PARSER_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+
+def print_report(document, baseline=None):
+    """Summary table; with a baseline document, also the speed ratio per entry"""
+    previous = {}
+    if baseline:
+        previous = {(r["target"], r["input"]): r for r in baseline.get("results", []) if "error" not in r}
+
+    print()
+    print(f"{'target':<15} {'input':<45} {'seconds':>10} {'seg/s':>10} {'MB/s':>8} {'RSS MB':>8}"
+          + ("   vs base" if baseline else ""))
+    for r in document["results"]:
+        name = os.path.basename(r["input"].rstrip('/')) or r["input"]
+        if "error" in r:
+            print(f"{r['target']:<15} {name[:45]:<45} ❌ {r['error']}")
+            continue
+        line = (f"{r['target']:<15} {name[:45]:<45} {r['seconds']:>10.4f} "
+                f"{r['segments_per_s'] or 0:>10,} {r['mb_per_s'] or 0:>8.2f} {r['peak_rss_mb'] or 0:>8.1f}")
+        old = previous.get((r["target"], r["input"]))
+        if old and r["seconds"]:
+            line += f"   {old['seconds'] / r['seconds']:>6.2f}x"
+        print(line)
+
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] in ['-h', '--help']:
+        print("Usage:")
+        print("  python3 benchmarks/run_benchmarks.py [options]")
+        print("\nOptions:")
+        print("  --synthetic LIST  Also generate and time synthetic 837P/I/D files with")
+        print("                    these claim counts, e.g. 10k,100k,1m")
+        print("  --data-dir D      Where synthetic files go (default benchmarks/data)")
+        print("  --targets LIST    Any of detailed,viewer,batch-detailed,batch-viewer (default: all)")
+        print(f"  --repeat N        Runs per measurement, best one kept (default {DEFAULT_REPEAT};")
+        print(f"                    files over {LARGE_FILE_BYTES // (1024 * 1024)} MB run once)")
+        print("  --workers N       Worker processes for the detailed batch driver (default 1)")
+        print("  --output F        Results file (default benchmarks/results/bench_<timestamp>.json)")
+        print("  --compare F       Show speed-up against an earlier results file")
+        print("\nExamples:")
+        print("  python3 benchmarks/run_benchmarks.py")
+        print("  python3 benchmarks/run_benchmarks.py --synthetic 10k,100k --targets detailed,viewer")
+        print("  python3 benchmarks/run_benchmarks.py --compare benchmarks/results/bench_old.json")
+        return
+
+    try:
+        measure_target = pop_option(args, '--measure')
+        repeat = int(pop_option(args, '--repeat', DEFAULT_REPEAT))
+        workers = int(pop_option(args, '--workers', 1))
+        synthetic = pop_option(args, '--synthetic')
+        data_dir = pop_option(args, '--data-dir', os.path.join(BENCH_DIR, "data"))
+        targets = pop_option(args, '--targets', ','.join(TARGETS)).split(',')
+        output_file = pop_option(args, '--output')
+        compare_file = pop_option(args, '--compare')
+        sizes = [parse_size(size) for size in synthetic.split(',')] if synthetic else []
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    # Child process mode: one measurement, JSON on the last stdout line
+    if measure_target is not None:
+        print(json.dumps(measure(measure_target, args[0], repeat, workers)))
+        return
+
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        print(f"❌ Error: unknown target(s) {', '.join(unknown)} (choose from {', '.join(TARGETS)})")
+        sys.exit(1)
+
+    input_dirs = [SAMPLES_DIR]
+    if sizes:
+        generate_suite(data_dir, sizes)
+        input_dirs.append(data_dir)
+
+    print("=" * 70)
+    print("X12 Translator Benchmarks")
+    print("=" * 70)
+    document = run_suite(input_dirs, targets, repeat, workers)
+
+    baseline = None
+    if compare_file:
+        with open(compare_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(document, baseline)
+
+    if output_file is None:
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        output_file = os.path.join(BENCH_DIR, "results", f"bench_{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"\n💾 Results: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
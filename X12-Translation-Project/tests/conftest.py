@@ -0,0 +1,32 @@
+"""
+Shared pytest setup
+The translator modules import each other as top-level modules, so the
+project directory goes on sys.path, as when the scripts are run from it
+"""
+
+import os
+import sys
+
+import pytest
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+SAMPLES_DIR = os.path.join(PROJECT_DIR, "samples", "input")
+
+
+def isa(component_sep=":", terminator="~"):
+    """Standard fixed-width ISA segment (106 bytes with its terminator)"""
+    return ("ISA*00*          *00*          *ZZ*SUBMITTER      *ZZ*RECEIVER       "
+            f"*200101*1200*^*00501*000000001*0*P*{component_sep}{terminator}")
+
+
+@pytest.fixture
+def write_x12(tmp_path):
+    """write_x12(text_or_bytes, name="claim.edi") -> path of the file written"""
+    def write(data, name="claim.edi"):
+        path = tmp_path / name
+        path.write_bytes(data.encode("utf-8") if isinstance(data, str) else data)
+        return str(path)
+    return write
@@ -0,0 +1,18 @@
+"""ResultCache size limit with several processes writing to one directory"""
+
+from x12_cache import ResultCache
+
+
+def test_size_limit_counts_every_writer(tmp_path):
+    # Two instances stand in for two batch workers sharing the cache
+    writers = [ResultCache(str(tmp_path), max_bytes=20_000) for _ in range(2)]
+    for i in range(60):
+        writers[i % 2].put(f"{i:064x}", {"claim": "x" * 990})
+    
+    # Each writer alone stays under the limit; together they would not
+    total = sum(f.stat().st_size for f in tmp_path.glob("*/*.json"))
+    assert total <= 20_000 * 1.25
+    
+    writers[0].check_size()
+    total = sum(f.stat().st_size for f in tmp_path.glob("*/*.json"))
+    assert total <= 20_000
@@ -0,0 +1,207 @@
+"""HL loop placement: 2000A / 2000B / 2000C -> 2300 claim -> 2400 service line"""
+
+import os
+
+import pytest
+
+from conftest import SAMPLES_DIR, isa
+from parser_for_viewer import parse_x12_for_viewer
+from x12_claims_parser import LAYOUT_NESTED, PROFILE_TYPED_ONLY, translate_x12_complete_structured
+from x12core import LoopStack
+
+
+# Two billing providers; subscriber 2 has two patients, the second (HL 6)
+# only arriving after the second billing provider's loops; claim C3 has a
+# 2320/2330 other subscriber and payer
+TRANSACTION = (
+    "ST*837*0001*005010X222A1~"
+    "BHT*0019*00*1*20200101*1200*CH~"
+    "NM1*41*2*SUBMITTER*****46*S1~"
+    "NM1*40*2*RECEIVER*****46*R1~"
+    "HL*1**20*1~"
+    "NM1*85*2*FIRST CLINIC*****XX*1111111111~"
+    "N3*1 FIRST ST~"
+    "N4*FIRSTVILLE*CA*90001~"
+    "HL*2*1*22*1~"
+    "SBR*P**G1******CI~"
+    "NM1*IL*1*DOE*JOHN****MI*S100~"
+    "N3*10 DOE ST~"
+    "N4*DOEVILLE*CA*90002~"
+    "DMG*D8*19700101*M~"
+    "NM1*PR*2*PAYER ONE*****PI*P1~"
+    "CLM*C1*100***11:B:1*Y*A*Y*Y~"
+    "HI*ABK:J449~"
+    "LX*1~"
+    "SV1*HC:99213*100*UN*1***1~"
+    "DTP*472*D8*20200101~"
+    "NM1*82*1*RENDER*RITA****XX*9999999999~"
+    "HL*3*2*23*0~"
+    "PAT*19~"
+    "NM1*QC*1*DOE*JIMMY~"
+    "N3*12 DOE ST~"
+    "DMG*D8*20100101*M~"
+    "CLM*C2*50***11:B:1*Y*A*Y*Y~"
+    "LX*1~"
+    "SV1*HC:99214*50*UN*1***1~"
+    "HL*4**20*1~"
+    "NM1*85*2*SECOND CLINIC*****XX*2222222222~"
+    "HL*5*4*22*0~"
+    "SBR*P*18*G2******CI~"
+    "NM1*IL*1*ROE*RICHARD****MI*S200~"
+    "NM1*PR*2*PAYER TWO*****PI*P2~"
+    "CLM*C3*75***11:B:1*Y*A*Y*Y~"
+    "NM1*82*1*PROVIDER*PAT****XX*8888888888~"
+    "SBR*S*01*G9******CI~"
+    "NM1*IL*1*OTHER*OLIVIA****MI*X1~"
+    "NM1*PR*2*OTHER PAYER*****PI*P9~"
+    "LX*1~"
+    "SV1*HC:99215*75*UN*1***1~"
+    "HL*6*2*23*0~"
+    "PAT*19~"
+    "NM1*QC*1*DOE*JANE~"
+    "CLM*C4*25***11:B:1*Y*A*Y*Y~"
+    "LX*1~"
+    "SV1*HC:99212*25*UN*1***1~"
+    "SE*48*0001~"
+)
+
+
+@pytest.fixture
+def hl_file(write_x12):
+    return write_x12(isa() + "GS*HC*S*R*20200101*1200*1*X*005010X222A1~" + "".join(TRANSACTION)
+                     + "GE*1*1~IEA*1*000000001~")
+
+
+@pytest.fixture
+def result(hl_file):
+    return translate_x12_complete_structured(hl_file, profile=PROFILE_TYPED_ONLY)
+
+
+def name(entity):
+    return entity["name_last_or_organization"]
+
+
+def test_hierarchy_tree(result):
+    first, second = result["hierarchy"]
+    assert [first["loop"], second["loop"]] == ["2000A", "2000A"]
+    assert name(first["billing_provider"]) == "FIRST CLINIC"
+    assert name(second["billing_provider"]) == "SECOND CLINIC"
+    
+    (subscriber,) = first["children"]
+    assert subscriber["loop"] == "2000B"
+    assert name(subscriber["subscriber"]) == "DOE"
+    assert name(subscriber["payer"]) == "PAYER ONE"
+    # HL 6 names HL 2 as its parent, however many loops came in between
+    assert [child["hierarchical_level"]["hierarchical_id"] for child in subscriber["children"]] == ["3", "6"]
+    assert [child["patient"]["name_first"] for child in subscriber["children"]] == ["JIMMY", "JANE"]
+    
+    (other_subscriber,) = second["children"]
+    assert name(other_subscriber["subscriber"]) == "ROE"
+    assert "children" not in other_subscriber
+
+
+def test_entity_segments_follow_their_nm1(result):
+    subscriber_node = result["hierarchy"][0]["children"][0]
+    subscriber = subscriber_node["subscriber"]
+    assert subscriber["address"]["address_line_1"] == "10 DOE ST"
+    assert subscriber["geographic_location"]["city"] == "DOEVILLE"
+    assert subscriber["demographics"]["date_of_birth"] == "19700101"
+    assert subscriber_node["insurance_info"]["group_number"] == "G1"
+    
+    jimmy = subscriber_node["children"][0]["patient"]
+    assert jimmy["address"]["address_line_1"] == "12 DOE ST"
+    assert jimmy["demographics"]["date_of_birth"] == "20100101"
+    
+    billing_provider = result["hierarchy"][0]["billing_provider"]
+    assert billing_provider["geographic_location"]["city"] == "FIRSTVILLE"
+
+
+def test_claims_take_their_own_hl_ancestors(result):
+    claims = {claim["claim_id"]: claim for claim in result["claims"]}
+    assert {claim_id: claim["hierarchical_id"] for claim_id, claim in claims.items()} == {
+        "C1": "2", "C2": "3", "C3": "5", "C4": "6"
+    }
+    assert {claim_id: name(claim["payer"]) for claim_id, claim in claims.items()} == {
+        "C1": "PAYER ONE", "C2": "PAYER ONE", "C3": "PAYER TWO", "C4": "PAYER ONE"
+    }
+    assert claims["C2"]["patient"]["name_first"] == "JIMMY"
+    assert claims["C4"]["patient"]["name_first"] == "JANE"
+    assert "patient" not in claims["C1"]
+
+
+def test_claim_and_service_line_loops(result):
+    claims = {claim["claim_id"]: claim for claim in result["claims"]}
+    
+    # 2420A rendering provider and 2400 date stay on the service line
+    (line,) = claims["C1"]["service_lines"]
+    assert name(line["rendering_provider"]) == "RENDER"
+    assert line["dates"][0]["date_value"] == "20200101"
+    assert "rendering_provider" not in claims["C1"]
+    
+    # 2310B on the claim; 2330A/B names after the 2320 SBR are the other coverage's
+    c3 = claims["C3"]
+    assert name(c3["rendering_provider"]) == "PROVIDER"
+    assert c3["other_subscribers"][0]["payer_responsibility"] == "S"
+    assert [name(entity) for entity in c3["other_entities"]] == ["OTHER", "OTHER PAYER"]
+    assert name(c3["payer"]) == "PAYER TWO"
+    assert name(result["hierarchy"][1]["children"][0]["subscriber"]) == "ROE"
+
+
+def test_nested_layout_places_the_same_way(hl_file, result):
+    nested = translate_x12_complete_structured(hl_file, profile=PROFILE_TYPED_ONLY, layout=LAYOUT_NESTED)
+    (transaction,) = nested["interchanges"][0]["functional_groups"][0]["transaction_sets"]
+    assert transaction["hierarchy"] == result["hierarchy"]
+    assert transaction["claims"] == result["claims"]
+
+
+def test_viewer_sections_use_the_claims_loops(hl_file):
+    claims = {}
+    for sections in parse_x12_for_viewer(hl_file):
+        data = {section["section"]: section["data"] for section in sections}
+        claims[data["claim"]["id"]] = data
+    
+    assert claims["C1"]["billing_Provider"]["name"] == "FIRST CLINIC"
+    assert claims["C3"]["billing_Provider"]["name"] == "SECOND CLINIC"
+    # The subscriber, not the 2010CA patient or the 2330A other subscriber
+    assert (claims["C2"]["subscriber"]["lastName"], claims["C2"]["subscriber"]["dob"]) == ("DOE", "1970-01-01")
+    assert claims["C3"]["subscriber"]["lastName"] == "ROE"
+    assert claims["C3"]["payer"]["name"] == "PAYER TWO"
+    assert claims["C4"]["payer"]["name"] == "PAYER ONE"
+    assert claims["C1"]["renderingProvider"]["lastName"] == "RENDER"
+
+
+def test_loop_stack_closes_loops_below_a_new_hl():
+    loops = LoopStack()
+    provider = loops.open_hl("1", "", "20")
+    subscriber = loops.open_hl("2", "1", "22")
+    loops.open_loop("2300", {"claim_id": "C1"})
+    loops.open_loop("2400", {"line_number": "1"})
+    assert [loop_id for loop_id, _ in loops.stack] == ["2000A", "2000B", "2300", "2400"]
+    
+    # A second service line replaces the first; a new claim closes both
+    loops.open_loop("2400", {"line_number": "2"})
+    assert loops.owner == {"line_number": "2"}
+    loops.open_loop("2300", {"claim_id": "C2"})
+    assert [loop_id for loop_id, _ in loops.stack] == ["2000A", "2000B", "2300"]
+    
+    # A patient HL under the subscriber: the claim is closed, the lineage kept
+    patient = loops.open_hl("3", "2", "23")
+    assert loops.stack == [("2000A", provider), ("2000B", subscriber), ("2000C", patient)]
+    assert loops.ancestor("2000B") is subscriber
+    assert loops.hl_node() is patient
+    
+    # An unknown parent starts a new root
+    orphan = loops.open_hl("9", "42", "22")
+    assert loops.end_transaction() == [provider, orphan]
+    assert loops.loop is None
+
+
+def test_viewer_subscriber_has_every_key():
+    # Claim 3 of 837P_2 has an NM1*IL but no SBR or DMG
+    sections = parse_x12_for_viewer(os.path.join(SAMPLES_DIR, "837P_2.txt"))[2]
+    subscriber = next(section["data"] for section in sections if section["section"] == "subscriber")
+    assert subscriber == {
+        "firstName": "Doe", "lastName": "Jane", "id": "123456789",
+        "address": {"street": "345 W 9th St", "city": "Santa Rosa", "state": "CA", "zip": "95401"},
+        "relationship": "self", "groupNumber": "", "planType": "", "dob": "", "sex": ""
+    }
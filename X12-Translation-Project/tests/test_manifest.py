@@ -0,0 +1,20 @@
+"""Incremental manifest: which outputs are still current"""
+
+from x12_manifest import check_input, record_digest
+
+
+def test_every_output_must_exist(tmp_path):
+    input_file = tmp_path / "claim.txt"
+    input_file.write_bytes(b"ST*837*0001~SE*2*0001~")
+    outputs = [tmp_path / "claim_parsed.json", tmp_path / "claim_claim.json"]
+    outputs[0].write_text("{}")
+    
+    # A new file is only stat'ed; the worker that translates it hashes it
+    is_current, entry = check_input(None, str(input_file), [str(p) for p in outputs], "1", {})
+    assert not is_current and entry["sha256"] is None
+    entry = record_digest(entry, "abc")
+    
+    # The viewer output is missing, so the main output alone isn't enough
+    assert not check_input(entry, str(input_file), [str(p) for p in outputs], "1", {})[0]
+    outputs[1].write_text("[]")
+    assert check_input(entry, str(input_file), [str(p) for p in outputs], "1", {})[0]
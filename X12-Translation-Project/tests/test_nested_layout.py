@@ -0,0 +1,169 @@
+"""Nested interchange -> group -> transaction set layout (several ST/SE sets per file)"""
+
+import json
+
+import pytest
+
+from conftest import isa
+from x12_claims_parser import (
+    LAYOUT_NESTED, PROFILE_RAW_ONLY, PROFILE_TYPED_ONLY, translate_x12_complete_structured,
+    translate_x12_streaming
+)
+from x12_json import dumps
+
+
+def transaction(control, provider, subscriber, claim_ids, se=True):
+    """One 837P transaction set: a billing provider, a subscriber and their claims"""
+    segments = [
+        f"ST*837*{control}*005010X222A1",
+        f"BHT*0019*00*{control}*20200101*1200*CH",
+        "NM1*41*2*SUBMITTER*****46*S1",
+        "HL*1**20*1",
+        f"NM1*85*2*{provider}*****XX*1234567893",
+        "HL*2*1*22*0",
+        "SBR*P*18*G1******CI",
+        f"NM1*IL*1*{subscriber}*PAT****MI*M1",
+        "NM1*PR*2*PAYER*****PI*P1",
+    ]
+    for claim_id in claim_ids:
+        segments += [f"CLM*{claim_id}*100***11:B:1*Y*A*Y*Y", "LX*1", "SV1*HC:99213*100*UN*1***1"]
+    if se:
+        segments.append(f"SE*{len(segments) + 1}*{control}")
+    return "".join(segment + "~" for segment in segments)
+
+
+def group(control, *transactions):
+    return (f"GS*HC*S*R*20200101*1200*{control}*X*005010X222A1~" + "".join(transactions)
+            + f"GE*{len(transactions)}*{control}~")
+
+
+def interchange(*groups):
+    return isa() + "".join(groups) + "IEA*1*000000001~"
+
+
+# Interchange 1: group 1 (two sets), group 2 (one set); interchange 2: one set
+BATCH = (
+    interchange(
+        group("1", transaction("0001", "NORTH CLINIC", "ALPHA", ["A1", "A2"]),
+              transaction("0002", "SOUTH CLINIC", "BRAVO", ["B1"])),
+        group("2", transaction("0003", "EAST CLINIC", "CHARLIE", ["C1"]))
+    )
+    + interchange(group("3", transaction("0004", "WEST CLINIC", "DELTA", ["D1"])))
+)
+
+
+@pytest.fixture
+def batch_file(write_x12):
+    return write_x12(BATCH)
+
+
+def transaction_sets(nested):
+    return [transaction
+            for interchange in nested["interchanges"]
+            for group in interchange["functional_groups"]
+            for transaction in group["transaction_sets"]]
+
+
+def test_nested_tree(batch_file):
+    nested = translate_x12_complete_structured(batch_file, layout=LAYOUT_NESTED)
+    
+    assert [[group["functional_group"]["group_control_number"] for group in interchange["functional_groups"]]
+            for interchange in nested["interchanges"]] == [["1", "2"], ["3"]]
+    assert [[[transaction["transaction_set"]["transaction_control_number"]
+              for transaction in group["transaction_sets"]]
+             for group in interchange["functional_groups"]]
+            for interchange in nested["interchanges"]] == [[["0001", "0002"], ["0003"]], [["0004"]]]
+    assert all(interchange["interchange_header"]["interchange_control_number"] == "000000001"
+               for interchange in nested["interchanges"])
+    # One type for the file when every set has the same one
+    flat = translate_x12_complete_structured(batch_file)
+    assert nested["file_info"]["file_type"] == flat["file_info"]["file_type"]
+    assert nested["summary"] == {
+        "total_segments": BATCH.count("~"),
+        "total_transaction_sets": 4,
+        "total_claims": 5,
+        "total_service_lines": 5
+    }
+
+
+def test_each_transaction_set_keeps_its_own_headers(batch_file):
+    sets = transaction_sets(translate_x12_complete_structured(batch_file, layout=LAYOUT_NESTED))
+    
+    assert [ts["billing_provider"]["name_last_or_organization"] for ts in sets] == [
+        "NORTH CLINIC", "SOUTH CLINIC", "EAST CLINIC", "WEST CLINIC"
+    ]
+    assert [ts["subscriber"]["name_last_or_organization"] for ts in sets] == ["ALPHA", "BRAVO", "CHARLIE", "DELTA"]
+    assert [[claim["claim_id"] for claim in ts["claims"]] for ts in sets] == [["A1", "A2"], ["B1"], ["C1"], ["D1"]]
+    assert [ts["summary"]["total_claims"] for ts in sets] == [2, 1, 1, 1]
+    # ST through SE, envelope segments excluded
+    assert [ts["summary"]["total_segments"] for ts in sets] == [
+        int(ts["all_segments"][-1]["elements"][1]) for ts in sets
+    ]
+    assert all(ts["file_type"].startswith("X12 837") for ts in sets)
+
+
+def test_flat_layout_keeps_every_claim_but_only_the_last_headers(batch_file):
+    flat = translate_x12_complete_structured(batch_file)
+    assert [claim["claim_id"] for claim in flat["claims"]] == ["A1", "A2", "B1", "C1", "D1"]
+    assert flat["transaction_set"]["transaction_control_number"] == "0004"
+    assert flat["billing_provider"]["name_last_or_organization"] == "WEST CLINIC"
+
+
+def test_sink_receives_each_level_in_file_order(batch_file):
+    events = []
+    result = translate_x12_complete_structured(batch_file, sink=lambda key, item: events.append((key, item)),
+                                               layout=LAYOUT_NESTED)
+    
+    assert [key for key, _ in events] == [
+        "interchange", "functional_group", "transaction_set", "transaction_set",
+        "functional_group", "transaction_set",
+        "interchange", "functional_group", "transaction_set"
+    ]
+    assert [item["transaction_set"]["transaction_control_number"]
+            for key, item in events if key == "transaction_set"] == ["0001", "0002", "0003", "0004"]
+    assert "interchanges" not in result
+    assert result["summary"]["total_transaction_sets"] == 4
+
+
+def test_streamed_nested_file_matches_in_memory_result(batch_file, tmp_path):
+    output_file = str(tmp_path / "nested.json")
+    translate_x12_streaming(batch_file, output_file, layout=LAYOUT_NESTED)
+    
+    with open(output_file, encoding="utf-8") as f:
+        streamed = json.load(f)
+    assert streamed == json.loads(dumps(translate_x12_complete_structured(batch_file, layout=LAYOUT_NESTED)))
+
+
+def test_mixed_transaction_types(write_x12):
+    remittance = "ST*835*0002~BPR*I*100*C*ACH~TRN*1*12345*1512345678~SE*4*0002~"
+    path = write_x12(interchange(group("1", transaction("0001", "NORTH CLINIC", "ALPHA", ["A1"]), remittance)))
+    nested = translate_x12_complete_structured(path, layout=LAYOUT_NESTED)
+    
+    claim_set, remittance_set = transaction_sets(nested)
+    assert remittance_set["file_type"] == "X12 835 Healthcare Claim Payment/Advice"
+    assert remittance_set["claims"] == []
+    assert nested["file_info"]["file_type"] == f"{claim_set['file_type']} + {remittance_set['file_type']}"
+
+
+def test_transaction_set_without_se(write_x12):
+    path = write_x12(interchange(group("1", transaction("0001", "NORTH CLINIC", "ALPHA", ["A1"], se=False),
+                                      transaction("0002", "SOUTH CLINIC", "BRAVO", ["B1"]))))
+    sets = transaction_sets(translate_x12_complete_structured(path, profile=PROFILE_TYPED_ONLY,
+                                                              layout=LAYOUT_NESTED))
+    
+    assert [[claim["claim_id"] for claim in ts["claims"]] for ts in sets] == [["A1"], ["B1"]]
+    assert [ts["summary"]["total_segments"] for ts in sets] == [12, 13]
+
+
+def test_set_without_envelope_gets_empty_headers(write_x12):
+    nested = translate_x12_complete_structured(write_x12(transaction("0001", "NORTH CLINIC", "ALPHA", ["A1"])),
+                                               layout=LAYOUT_NESTED)
+    (interchange_,) = nested["interchanges"]
+    assert interchange_["interchange_header"] == {}
+    assert interchange_["functional_groups"][0]["functional_group"] == {}
+    assert len(transaction_sets(nested)) == 1
+
+
+def test_nested_layout_needs_typed_sections(batch_file):
+    with pytest.raises(ValueError, match="raw-only"):
+        translate_x12_complete_structured(batch_file, profile=PROFILE_RAW_ONLY, layout=LAYOUT_NESTED)
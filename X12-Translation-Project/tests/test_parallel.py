@@ -0,0 +1,48 @@
+"""translate_x12_parallel must give exactly the serial translator's result"""
+
+import os
+
+import pytest
+
+from benchmarks.generate_claims import TEMPLATES, generate_837
+from conftest import SAMPLES_DIR
+from x12_claims_parser import (
+    PROFILE_FULL, PROFILE_RAW_ONLY, PROFILE_TYPED_ONLY, translate_x12_complete_structured,
+    translate_x12_parallel
+)
+from x12_json import dumps
+
+
+@pytest.fixture(scope="module", params=sorted(TEMPLATES))
+def multi_st_file(request, tmp_path_factory):
+    """Synthetic 837 of the given subtype: 40 claims over several ST/SE sets"""
+    path = str(tmp_path_factory.mktemp("synthetic") / f"{request.param}.edi")
+    stats = generate_837(os.path.join(SAMPLES_DIR, TEMPLATES[request.param]), path, 40,
+                         claims_per_transaction=6)
+    assert stats["transactions"] > 2
+    return path, stats
+
+
+@pytest.mark.parametrize("profile", [PROFILE_FULL, PROFILE_TYPED_ONLY, PROFILE_RAW_ONLY])
+def test_parallel_matches_serial(multi_st_file, profile):
+    path, stats = multi_st_file
+    serial = translate_x12_complete_structured(path, profile=profile)
+    parallel = translate_x12_parallel(path, workers=2, profile=profile)
+    
+    assert dumps(parallel) == dumps(serial)
+    assert parallel["summary"]["total_claims"] == stats["claims"]
+    assert parallel["summary"]["total_segments"] == stats["segments"]
+
+
+def test_parallel_records_match_serial(multi_st_file):
+    path, _ = multi_st_file
+    assert (dumps(translate_x12_parallel(path, workers=2, records=True))
+            == dumps(translate_x12_complete_structured(path)))
+
+
+def test_claims_keep_file_order(multi_st_file):
+    path, stats = multi_st_file
+    claims = translate_x12_parallel(path, workers=3, profile=PROFILE_TYPED_ONLY)["claims"]
+    copies = [int(claim["claim_id"].rsplit("-", 1)[1]) for claim in claims]
+    assert copies == sorted(copies)
+    assert len(claims) == stats["claims"]
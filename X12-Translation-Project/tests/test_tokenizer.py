@@ -0,0 +1,85 @@
+"""Tokenizer rules shared by every entry point (x12core.tokenizer)"""
+
+import pytest
+
+from conftest import isa
+from x12core import SegmentStream, tokenize_file
+
+
+def segments(path, **kwargs):
+    return [elements for _, elements in tokenize_file(path, **kwargs)]
+
+
+def test_crlf_line_breaks_are_stripped(write_x12):
+    path = write_x12(isa() + "\r\nGS*HC*A*B*20200101*1200*1*X*005010X222A1~\r\n"
+                     "ST*837*0001~\r\nSE*2*0001~\r\n")
+    assert [elements[0] for elements in segments(path)] == ["ISA", "GS", "ST", "SE"]
+    assert segments(path)[2] == ["ST", "837", "0001"]
+
+
+def test_missing_final_segment_terminator(write_x12):
+    path = write_x12(isa() + "ST*837*0001~CLM*A1*100~SE*3*0001")
+    assert segments(path)[-1] == ["SE", "3", "0001"]
+
+
+def test_crlf_as_segment_terminator(write_x12):
+    path = write_x12(isa(terminator="\n") + "ST*837*0001\nCLM*A1*100\nSE*3*0001\n")
+    assert segments(path)[1:] == [["ST", "837", "0001"], ["CLM", "A1", "100"], ["SE", "3", "0001"]]
+
+
+@pytest.mark.parametrize("component_sep", [">", "^", "|"])
+def test_component_separator_is_normalized(write_x12, component_sep):
+    path = write_x12(isa(component_sep) + f"ST*837*0001~SV1*HC{component_sep}99213*75~"
+                     f"HI*ABK{component_sep}J449~SE*4*0001~")
+    assert segments(path)[2] == ["SV1", "HC:99213", "75"]
+    assert segments(path)[3] == ["HI", "ABK:J449"]
+
+
+def test_trailing_empty_elements_are_dropped(write_x12):
+    path = write_x12(isa() + "ST*837*0001~HI*ABK:J449*ABF:E119**~NM1*85*2*ACME*****~"
+                     "REF*~SE*5*0001~")
+    assert segments(path)[2] == ["HI", "ABK:J449", "ABF:E119"]
+    assert segments(path)[3] == ["NM1", "85", "2", "ACME"]
+    assert segments(path)[4] == ["REF"]
+
+
+def test_inner_empty_elements_are_kept(write_x12):
+    path = write_x12(isa() + "ST*837*0001~NM1*85*2*ACME*****XX*123~SE*3*0001~")
+    assert segments(path)[2] == ["NM1", "85", "2", "ACME", "", "", "", "", "XX", "123"]
+
+
+def test_bom_and_lowercase_segment_ids(write_x12):
+    path = write_x12(b"\xef\xbb\xbf" + isa().lower().encode() + b"st*837*0001~se*2*0001~")
+    assert [elements[0] for elements in segments(path)] == ["ISA", "ST", "SE"]
+
+
+def test_file_without_isa_envelope(write_x12):
+    path = write_x12("ST*837*0001~BHT*0019*00*1*20200101*1200*CH~SE*3*0001~")
+    assert segments(path) == [["ST", "837", "0001"], ["BHT", "0019", "00", "1", "20200101", "1200", "CH"],
+                              ["SE", "3", "0001"]]
+
+
+def test_windows_1252_text_is_decoded(write_x12):
+    path = write_x12(isa().encode() + b"ST*837*0001~NM1*85*2*O\x92BRIEN~SE*3*0001~")
+    assert segments(path)[2] == ["NM1", "85", "2", "O’BRIEN"]
+
+
+def test_segments_split_across_read_chunks(write_x12):
+    text = isa() + "ST*837*0001~" + "".join(f"LX*{i}~SV1*HC:99213*75~" for i in range(1, 200)) + "SE*400*0001~"
+    path = write_x12(text)
+    # Big enough for the ISA that delimiters are read from, small enough to cut segments
+    assert segments(path, chunk_size=128) == segments(path)
+
+
+def test_not_x12(write_x12):
+    path = write_x12("just some notes about EDI files\n")
+    with pytest.raises(RuntimeError, match="no ISA or ST segment"):
+        segments(path)
+
+
+def test_segment_stream_follows_the_same_rules(write_x12):
+    path = write_x12(b"\xef\xbb\xbf" + isa(">").encode() + b"\r\nst*837*0001~\r\n"
+                     b"SV1*HC>99213*75**~\r\nNM1*85*2*O\x92BRIEN~\r\nSE*4*0001")
+    with SegmentStream(path) as stream:
+        assert list(stream) == list(tokenize_file(path))
+        assert (stream.ele_sep, stream.seg_term) == ("*", "~")
@@ -0,0 +1,295 @@
+"""
+Claim Analytics
+Charge totals per payer and provider, CLM02 vs summed service-line charge
+reconciliation, and charge / unit percentiles - per file and per batch
+While a file is parsed the claim hook only appends to typed array.array
+columns (charges in cents, units, interned payer / NPI / procedure /
+place-of-service codes); every aggregate is then computed over those
+columns with NumPy, so a batch of millions of lines is a handful of
+vectorized passes instead of Python loops over nested dicts
+numpy is optional - only the aggregation step needs it
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Rows kept in the report for the longest lists
+TOP_PROCEDURES = 20
+UNBALANCED_SAMPLE = 50
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("Claim analytics need numpy (pip install numpy)")
+
+
+def to_cents(value):
+    """'44.66' -> 4466; empty or malformed -> 0"""
+    try:
+        return round(float(value) * 100)
+    except (TypeError, ValueError):
+        return 0
+
+
+def to_units(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Vocabulary:
+    """Interns strings (payer IDs, NPIs, codes) as small ints"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def remap(self, other):
+        """Array mapping other's codes to this vocabulary's (adding new values)"""
+        return np.array([self.code(value) for value in other.values], dtype=np.int32)
+
+
+def column(values, dtype):
+    return np.frombuffer(values, dtype=dtype)
+
+
+class ClaimAnalytics:
+    """
+    claim_hook for translate_x12_complete_structured that gathers claim and
+    service-line columns; summarize() turns them into the report
+    merge(other) appends another file's columns, for batch totals
+    Instances pickle cheaply, so batch workers can send them back whole
+    """
+
+    def __init__(self):
+        self.claim_ids = []
+        self.payers = Vocabulary()
+        self.providers = Vocabulary()
+        self.procedures = Vocabulary()
+        self.places = Vocabulary()
+
+        self._claim_charge = array('q')
+        self._claim_payer = array('i')
+        self._claim_billing = array('i')
+        self._claim_rendering = array('i')
+
+        self._line_claim = array('i')
+        self._line_charge = array('q')
+        self._line_units = array('d')
+        self._line_procedure = array('i')
+        self._line_place = array('i')
+
+    def __call__(self, claim, envelope):
+        claim_index = len(self.claim_ids)
+        self.claim_ids.append(claim.get("claim_id", ""))
+        self._claim_charge.append(to_cents(claim.get("total_charge")))
+        self._claim_payer.append(self.payers.code(claim.get("payer", {}).get("id_code", "")))
+        self._claim_billing.append(
+            self.providers.code(envelope.get("billing_provider", {}).get("id_code", "")))
+        self._claim_rendering.append(
+            self.providers.code(claim.get("rendering_provider", {}).get("id_code", "")))
+
+        # SV1-05 is only sent when it differs from the claim's facility code
+        facility_code = claim.get("claim_filing_indicator", "").split(':', 1)[0]
+        for service_line in claim.get("service_lines", ()):
+            service_info = service_line.get("service_info", {})
+            procedure = service_info.get("procedure_info", "").split(':')
+            self._line_claim.append(claim_index)
+            self._line_charge.append(to_cents(service_info.get("line_charge")))
+            self._line_units.append(to_units(service_info.get("unit_count")))
+            self._line_procedure.append(self.procedures.code(procedure[1] if len(procedure) > 1 else procedure[0]))
+            self._line_place.append(self.places.code(service_info.get("place_of_service") or facility_code))
+
+    @property
+    def claim_count(self):
+        return len(self.claim_ids)
+
+    @property
+    def service_line_count(self):
+        return len(self._line_claim)
+
+    def merge(self, other):
+        """Append another ClaimAnalytics' claims and lines to this one"""
+        require_numpy()
+        claim_offset = self.claim_count
+        payers = self.payers.remap(other.payers)
+        providers = self.providers.remap(other.providers)
+        procedures = self.procedures.remap(other.procedures)
+        places = self.places.remap(other.places)
+
+        def extend(target, values, mapping=None, offset=0):
+            values = column(values, np.int32)
+            if mapping is not None and len(values):
+                values = mapping[values]
+            target.frombytes((values + offset).astype(np.int32).tobytes())
+
+        self.claim_ids.extend(other.claim_ids)
+        self._claim_charge.extend(other._claim_charge)
+        extend(self._claim_payer, other._claim_payer, payers)
+        extend(self._claim_billing, other._claim_billing, providers)
+        extend(self._claim_rendering, other._claim_rendering, providers)
+
+        extend(self._line_claim, other._line_claim, offset=claim_offset)
+        self._line_charge.extend(other._line_charge)
+        self._line_units.extend(other._line_units)
+        extend(self._line_procedure, other._line_procedure, procedures)
+        extend(self._line_place, other._line_place, places)
+
+    def summarize(self):
+        """Aggregates as a JSON-ready dict (amounts in dollars)"""
+        require_numpy()
+        claim_charge = column(self._claim_charge, np.int64)
+        claim_payer = column(self._claim_payer, np.int32)
+        line_claim = column(self._line_claim, np.int32)
+        line_charge = column(self._line_charge, np.int64)
+        line_units = column(self._line_units, np.float64)
+        claim_count = len(claim_charge)
+
+        # Per-claim line totals in one pass; float64 is exact for cents well past 10^13 dollars
+        line_total = np.bincount(line_claim, weights=line_charge, minlength=claim_count).astype(np.int64)
+        line_count = np.bincount(line_claim, minlength=claim_count)
+
+        return {
+            "claims": claim_count,
+            "service_lines": len(line_charge),
+            "total_charge": dollars(claim_charge.sum()),
+            "total_line_charge": dollars(line_charge.sum()),
+            "charges_by_payer": self._by_group(self.payers, "payer_id", claim_payer,
+                                               claim_charge, line_claim, line_charge),
+            "charges_by_billing_provider": self._by_group(
+                self.providers, "npi", column(self._claim_billing, np.int32),
+                claim_charge, line_claim, line_charge),
+            "charges_by_rendering_provider": self._by_group(
+                self.providers, "npi", column(self._claim_rendering, np.int32),
+                claim_charge, line_claim, line_charge),
+            "reconciliation": self._reconcile(claim_charge, line_total, line_count),
+            "percentiles": {
+                "claim_charge": percentiles(claim_charge / 100.0),
+                "line_charge": percentiles(line_charge / 100.0),
+                "units": percentiles(line_units),
+            },
+            "procedure_codes": self._by_code(self.procedures, column(self._line_procedure, np.int32),
+                                             line_charge, line_units, TOP_PROCEDURES),
+            "place_of_service": self._by_code(self.places, column(self._line_place, np.int32),
+                                              line_charge, line_units),
+        }
+
+    @staticmethod
+    def _by_group(vocabulary, key, claim_group, claim_charge, line_claim, line_charge):
+        size = len(vocabulary.values)
+        claims = np.bincount(claim_group, minlength=size)
+        charges = np.bincount(claim_group, weights=claim_charge, minlength=size)
+        line_group = claim_group[line_claim]
+        lines = np.bincount(line_group, minlength=size)
+        line_charges = np.bincount(line_group, weights=line_charge, minlength=size)
+
+        groups = []
+        for code in np.argsort(-charges, kind='stable'):
+            if not claims[code] or not vocabulary.values[code]:
+                continue
+            groups.append({
+                key: vocabulary.values[code],
+                "claims": int(claims[code]),
+                "total_charge": dollars(charges[code]),
+                "service_lines": int(lines[code]),
+                "line_charge": dollars(line_charges[code]),
+            })
+        return groups
+
+    @staticmethod
+    def _by_code(vocabulary, line_code, line_charge, line_units, limit=None):
+        size = len(vocabulary.values)
+        lines = np.bincount(line_code, minlength=size)
+        charges = np.bincount(line_code, weights=line_charge, minlength=size)
+        units = np.bincount(line_code, weights=line_units, minlength=size)
+
+        codes = []
+        for code in np.argsort(-lines, kind='stable')[:limit]:
+            if not lines[code]:
+                continue
+            codes.append({
+                "code": vocabulary.values[code],
+                "lines": int(lines[code]),
+                "line_charge": dollars(charges[code]),
+                "units": round(float(units[code]), 3),
+            })
+        return codes
+
+    def _reconcile(self, claim_charge, line_total, line_count):
+        """CLM02 against the sum of the claim's service-line charges"""
+        has_lines = line_count > 0
+        difference = claim_charge - line_total
+        unbalanced = np.flatnonzero(has_lines & (difference != 0))
+        return {
+            "balanced": int(np.count_nonzero(has_lines)) - len(unbalanced),
+            "unbalanced": len(unbalanced),
+            "without_service_lines": int(np.count_nonzero(~has_lines)),
+            "unbalanced_difference": dollars(np.abs(difference[unbalanced]).sum()),
+            "unbalanced_claims": [
+                {
+                    "claim_id": self.claim_ids[i],
+                    "total_charge": dollars(claim_charge[i]),
+                    "line_charge": dollars(line_total[i]),
+                    "difference": dollars(difference[i]),
+                }
+                for i in unbalanced[:UNBALANCED_SAMPLE]
+            ],
+        }
+
+
+def dollars(cents):
+    return round(float(cents) / 100, 2)
+
+
+def percentiles(values):
+    if not len(values):
+        return {}
+    points = np.percentile(values, PERCENTILES)
+    result = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, points)}
+    result["min"] = round(float(values.min()), 2)
+    result["max"] = round(float(values.max()), 2)
+    result["mean"] = round(float(values.mean()), 2)
+    return result
+
+
+def print_report(summary, top=5):
+    """Print the headline numbers of a summarize() result"""
+    reconciliation = summary["reconciliation"]
+    print(f"\n📈 Analytics:")
+    print(f"   - Claims: {summary['claims']:,}, service lines: {summary['service_lines']:,}")
+    print(f"   - Total charge: ${summary['total_charge']:,.2f} "
+          f"(service lines ${summary['total_line_charge']:,.2f})")
+    print(f"   - Reconciliation: {reconciliation['balanced']:,} balanced, "
+          f"{reconciliation['unbalanced']:,} unbalanced "
+          f"(${reconciliation['unbalanced_difference']:,.2f}), "
+          f"{reconciliation['without_service_lines']:,} without service lines")
+    for claim in reconciliation["unbalanced_claims"][:top]:
+        print(f"     ⚠️  {claim['claim_id']}: CLM02 ${claim['total_charge']:,.2f} "
+              f"vs lines ${claim['line_charge']:,.2f}")
+
+    line_charge = summary["percentiles"]["line_charge"]
+    if line_charge:
+        print(f"   - Line charge p50/p90/p99: ${line_charge['p50']:,.2f} / "
+              f"${line_charge['p90']:,.2f} / ${line_charge['p99']:,.2f}")
+
+    for title, key, name in (("payers", "charges_by_payer", "payer_id"),
+                             ("billing providers", "charges_by_billing_provider", "npi")):
+        if summary[key]:
+            print(f"   - Top {title}:")
+            for group in summary[key][:top]:
+                print(f"     {group[name]:<15} {group['claims']:>9,} claims  ${group['total_charge']:>14,.2f}")
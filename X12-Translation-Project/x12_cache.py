@@ -0,0 +1,168 @@
+"""
+On-Disk Result Cache
+Translation results keyed by the SHA-256 of the input bytes plus the parser
+name, parser version and output options - a resent file is read once to
+hash it instead of being parsed again
+Entries are compact JSON files; once the cache grows past max_bytes the
+least recently used ones (oldest mtime, refreshed on every hit) are evicted
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from x12_json import dumps
+
+
+DEFAULT_CACHE_DIR = ".x12_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Evict down to this share of max_bytes so every put doesn't rescan
+EVICT_TARGET = 0.9
+
+# Processes sharing a cache only count their own writes between scans:
+# rescan after writing this share of max_bytes to count everyone else's
+RESCAN_SHARE = 1 / 16
+
+
+def file_digest(filepath, chunk_size=HASH_CHUNK_SIZE):
+    """SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of parser output on disk
+    Safe to share between processes: entries are written to a temp file and
+    renamed into place, and a vanished entry just counts as a miss; the size
+    limit is re-checked against the directory, not just this process's writes
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size = None
+        self._written = 0   # bytes this process wrote since the last scan
+
+    def make_key(self, digest, *parts):
+        """Cache key for a content digest plus parser name/version/options"""
+        return hashlib.sha256("|".join((digest,) + parts).encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        # Two-character shards keep directories small with many entries
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Cached data for key, or None"""
+        path = self.path_for(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError):
+            # Half-written or corrupt entry: drop it and parse again
+            self._remove(path)
+            return None
+        return data
+
+    def put(self, key, data):
+        """Store data under key, then evict if the cache is over its size"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        payload = dumps(data).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        self._written += len(payload)
+        if self._size is None or self._written >= self.max_bytes * RESCAN_SHARE:
+            self.check_size()
+        else:
+            self._size += len(payload)
+            if self._size > self.max_bytes:
+                # Other processes may have evicted meanwhile: count again first
+                self.check_size()
+
+    def check_size(self):
+        """Rescan the cache (other processes write to it too), evict if over max_bytes"""
+        self._size = self._scan_size()
+        self._written = 0
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def fetch(self, filepath, compute, *parts):
+        """
+        Cached result for filepath, computing and storing it on a miss
+        parts (parser name, version, profile, ...) are folded into the key
+        Returns (data, hit)
+        """
+        key = self.make_key(file_digest(filepath), *parts)
+
+        data = self.get(key)
+        if data is not None:
+            return data, True
+
+        data = compute()
+        self.put(key, data)
+        return data, False
+
+    def evict(self):
+        """Remove least recently used entries until under EVICT_TARGET of max_bytes"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TARGET
+
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+
+        self._size = total
+        self._written = 0
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith('.json'):
+                        yield entry.path
+
+    def _scan_size(self):
+        total = 0
+        for path in self._entries():
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return total
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Claim Index
+SQLite index over translated output: claim ID, subscriber ID, billing and
+rendering NPI, payer ID and service date -> the output file plus the byte
+offset and length of that claim's serialized record, so a lookup reads one
+claim instead of loading and scanning every _parsed.json
+Built during translation (batch_translator.py --index, x12_claims_parser.py
+--index); queried with this script or ClaimIndex.find()
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+
+
+INDEX_COLUMNS = ("claim_id", "subscriber_id", "billing_npi", "rendering_npi",
+                 "payer_id", "service_date")
+INDEX_SCHEMA_VERSION = 1
+
+# Rows per executemany batch while a streaming translation is being indexed
+INSERT_BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    output_file TEXT NOT NULL UNIQUE,
+    source_file TEXT,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    claim_id TEXT,
+    subscriber_id TEXT,
+    billing_npi TEXT,
+    rendering_npi TEXT,
+    payer_id TEXT,
+    service_date TEXT,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS claims_claim_id ON claims(claim_id);
+CREATE INDEX IF NOT EXISTS claims_subscriber_id ON claims(subscriber_id);
+CREATE INDEX IF NOT EXISTS claims_billing_npi ON claims(billing_npi);
+CREATE INDEX IF NOT EXISTS claims_rendering_npi ON claims(rendering_npi);
+CREATE INDEX IF NOT EXISTS claims_payer_id ON claims(payer_id);
+CREATE INDEX IF NOT EXISTS claims_service_date ON claims(service_date);
+CREATE INDEX IF NOT EXISTS claims_file_id ON claims(file_id);
+"""
+
+
+def first_date(date_value):
+    """D8 'CCYYMMDD' as is; RD8 'CCYYMMDD-CCYYMMDD' -> its start date"""
+    return date_value.split('-', 1)[0] if date_value else ""
+
+
+def service_date(claim):
+    """
+    Date of service for a claim: the first service line date (DTP*472),
+    else a claim-level 472, else the statement period start (DTP*434)
+    """
+    for service_line in claim.get("service_lines", ()):
+        for date in service_line.get("dates", ()):
+            if date["date_qualifier"] == '472':
+                return first_date(date["date_value"])
+
+    fallback = ""
+    for date in claim.get("dates", ()):
+        if date["date_qualifier"] == '472':
+            return first_date(date["date_value"])
+        if date["date_qualifier"] == '434' and not fallback:
+            fallback = first_date(date["date_value"])
+    return fallback
+
+
+def claim_index_keys(claim, envelope):
+    """
+    Index key tuple (INDEX_COLUMNS order) for a finished claim
+    envelope supplies the "subscriber" and "billing_provider" of the loop
+    the claim belongs to
+    """
+    return (
+        claim.get("claim_id", ""),
+        envelope.get("subscriber", {}).get("id_code", ""),
+        envelope.get("billing_provider", {}).get("id_code", ""),
+        claim.get("rendering_provider", {}).get("id_code", ""),
+        claim.get("payer", {}).get("id_code", ""),
+        service_date(claim),
+    )
+
+
+class ClaimRows:
+    """
+    Pairs each claim's index keys with where the writer put it
+    Use the instance as translate_x12_complete_structured's claim_hook and
+    its written() as the writer's on_claim; rows collects
+    keys + (offset, length) in output order
+    flush(rows) is called every INSERT_BATCH rows when given (streaming)
+    """
+
+    def __init__(self, claim_keys=(), flush=None):
+        self._pending = deque(tuple(keys) for keys in claim_keys)
+        self._flush = flush
+        self.rows = []
+
+    def __call__(self, claim, envelope):
+        self._pending.append(claim_index_keys(claim, envelope))
+
+    def written(self, offset, length):
+        self.rows.append(self._pending.popleft() + (offset, length))
+        if self._flush is not None and len(self.rows) >= INSERT_BATCH:
+            self._flush(self.rows)
+            self.rows = []
+
+    @property
+    def keys(self):
+        """Keys of claims not written yet (all of them before writing)"""
+        return [list(keys) for keys in self._pending]
+
+
+class ClaimIndex:
+    """
+    The SQLite claim index
+    WAL mode, so lookups keep working while a batch is adding files
+    Re-indexing an output file replaces its earlier rows
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+        self._db.execute(f"PRAGMA user_version={INDEX_SCHEMA_VERSION}")
+
+    def begin_file(self, output_file, source_file=None):
+        """Drop any rows for output_file and register it again; returns its file id"""
+        output_file = os.path.abspath(output_file)
+        with self._db:
+            self._db.execute("DELETE FROM files WHERE output_file = ?", (output_file,))
+            cursor = self._db.execute(
+                "INSERT INTO files (output_file, source_file, indexed_at) VALUES (?, ?, ?)",
+                (output_file, source_file, time.time())
+            )
+        return cursor.lastrowid
+
+    def add_rows(self, file_id, rows):
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO claims (file_id, claim_id, subscriber_id, billing_npi, rendering_npi, "
+                "payer_id, service_date, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(file_id,) + tuple(row) for row in rows]
+            )
+
+    def replace_file(self, output_file, rows, source_file=None):
+        """Index all claims of one output file (replacing earlier rows for it)"""
+        file_id = self.begin_file(output_file, source_file)
+        self.add_rows(file_id, rows)
+        return file_id
+
+    def find(self, **criteria):
+        """
+        Claims matching every given column (see INDEX_COLUMNS), e.g.
+        find(claim_id="A1000001") or find(payer_id="87726", service_date="20260102")
+        npi= matches the billing or the rendering NPI
+        Returns dicts with the keys plus output_file, source_file, offset, length
+        """
+        clauses = []
+        params = []
+        for column, value in criteria.items():
+            if column == "npi":
+                clauses.append("(billing_npi = ? OR rendering_npi = ?)")
+                params.extend((value, value))
+            elif column in INDEX_COLUMNS:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unknown index column '{column}' (choose from npi, {', '.join(INDEX_COLUMNS)})")
+        if not clauses:
+            raise ValueError("find() needs at least one criterion")
+
+        cursor = self._db.execute(
+            f"SELECT {', '.join(INDEX_COLUMNS)}, files.output_file, files.source_file, offset, length "
+            f"FROM claims JOIN files ON files.id = claims.file_id "
+            f"WHERE {' AND '.join(clauses)} ORDER BY files.output_file, offset",
+            params
+        )
+        names = INDEX_COLUMNS + ("output_file", "source_file", "offset", "length")
+        return [dict(zip(names, row)) for row in cursor]
+
+    def count(self):
+        return self._db.execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_claim(match):
+    """Load one claim from its output file using a find() result"""
+    with open(match["output_file"], 'rb') as f:
+        f.seek(match["offset"])
+        return json.loads(f.read(match["length"]))
+
+
+LOOKUP_OPTIONS = {
+    "--claim-id": "claim_id",
+    "--subscriber-id": "subscriber_id",
+    "--npi": "npi",
+    "--billing-npi": "billing_npi",
+    "--rendering-npi": "rendering_npi",
+    "--payer-id": "payer_id",
+    "--service-date": "service_date",
+}
+
+
+def main():
+    args = sys.argv[1:]
+
+    if not args or args[0] in ['-h', '--help']:
+        print("=" * 70)
+        print("X12 Claim Index Lookup")
+        print("=" * 70)
+        print("\nUsage:")
+        print("  python3 x12_claim_index.py <index.db> [criteria] [--locations]")
+        print("\nCriteria (combine any; all must match):")
+        for option in LOOKUP_OPTIONS:
+            print(f"  {option} VALUE")
+        print("\n  --npi matches the billing or rendering NPI; dates are CCYYMMDD")
+        print("  --locations  Print file/offset only instead of the claims")
+        print("\nBuild the index while translating:")
+        print("  python3 batch_translator.py input_files output_files --index claims.db")
+        print("=" * 70)
+        sys.exit(1)
+
+    db_path = args.pop(0)
+    locations_only = '--locations' in args
+    args = [arg for arg in args if arg != '--locations']
+
+    criteria = {}
+    while args:
+        option = args.pop(0)
+        if option not in LOOKUP_OPTIONS or not args:
+            print(f"❌ Error: expected one of {', '.join(LOOKUP_OPTIONS)} followed by a value")
+            sys.exit(1)
+        criteria[LOOKUP_OPTIONS[option]] = args.pop(0)
+
+    if not os.path.exists(db_path):
+        print(f"❌ Error: index '{db_path}' not found!")
+        sys.exit(1)
+
+    with ClaimIndex(db_path) as index:
+        matches = index.find(**criteria)
+
+    for match in matches:
+        print(f"📄 {match['output_file']} @ {match['offset']} (+{match['length']} bytes)")
+        if not locations_only:
+            print(json.dumps(read_claim(match), indent=2, ensure_ascii=False))
+    print(f"🔎 {len(matches)} claim(s) found")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 X12 837P Complete Structured Parser with All Information
-Uses PyX12 to create organized JSON with business headers
+Uses the built-in streaming tokenizer to create organized JSON with business headers
 Includes ALL data - no filtering
 MODIFIED: Dynamic file type detection with multi-method approach
 """
@@ -9,7 +9,33 @@ MODIFIED: Dynamic file type detection with multi-method approach
 import json
 import sys
 import os
-from pyx12.x12file import X12Reader
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from x12core import iter_segments, index_transaction_sets, LoopStack, CLAIM_LOOP, SERVICE_LINE_LOOP
+from x12_stream_writer import JSONClaimWriter, JSONLinesClaimWriter, NestedJSONWriter
+from x12_json import write_json
+from x12_records import SEGMENT_BUILDERS, RECORD_TYPES, Segment, RawSegment
+from x12_timings import ParseTimings
+from x12_claim_index import ClaimIndex, ClaimRows
+from x12_columnar import COLUMNAR_FORMATS, DEFAULT_BATCH_SIZE, ColumnarClaimWriter, require_pyarrow
+from x12_analytics import ClaimAnalytics, print_report, require_numpy
+
+
+PROFILE_FULL = "full"
+PROFILE_TYPED_ONLY = "typed-only"
+PROFILE_RAW_ONLY = "raw-only"
+OUTPUT_PROFILES = (PROFILE_FULL, PROFILE_TYPED_ONLY, PROFILE_RAW_ONLY)
+
+OUTPUT_FORMATS = ("json",) + COLUMNAR_FORMATS
+
+LAYOUT_FLAT = "flat"
+LAYOUT_NESTED = "nested"
+OUTPUT_LAYOUTS = (LAYOUT_FLAT, LAYOUT_NESTED)
+
+PENDING_FILE_TYPE = "X12 Transaction (Processing...)"
+
+# Bump whenever the detailed output changes: cached results are keyed on it
+PARSER_VERSION = "3.1"
 
 
 def detect_file_type(transaction_set_id):
@@ -84,392 +110,777 @@ def determine_837_subtype(claim_type_code, filename='', provider_names=None, pay
     return 'X12 837 Healthcare Claim'
 
 
-def translate_x12_complete_structured(filepath):
+def apply_enhanced_detection(result, filepath, claim_provider_names, claim_payer_names):
     """
-    Translate X12 to structured JSON with ALL information
-    Returns complete hierarchical structure with business headers
-    MODIFIED: Detects file type dynamically
+    Refine an 837 file type once the whole file has been seen
+    Uses BHT06 plus billing provider, subscriber and per-claim names
+    """
+    if result.get("_needs_enhanced_detection") and result["transaction_set"].get("transaction_set_id") == "837":
+        provider_names = []
+        payer_names = []
+        
+        if result.get("billing_provider", {}).get("name_last_or_organization"):
+            provider_names.append(result["billing_provider"]["name_last_or_organization"])
+        
+        if result.get("subscriber", {}).get("name_last_or_organization"):
+            payer_names.append(result["subscriber"]["name_last_or_organization"])
+        
+        payer_names.extend(sorted(claim_payer_names))
+        provider_names.extend(sorted(claim_provider_names))
+        
+        claim_type = result.get("transaction_set", {}).get("beginning_hierarchical_transaction", {}).get("claim_type", "")
+        filename = os.path.basename(filepath)
+        
+        result["file_info"]["file_type"] = determine_837_subtype(
+            claim_type, 
+            filename, 
+            provider_names, 
+            payer_names
+        )
+        
+        del result["_needs_enhanced_detection"]
+
+
+def new_result(filepath, profile=PROFILE_FULL, streaming=False):
+    """
+    Empty detailed result holding only the sections the profile keeps
+    Streaming results never hold claims or all_segments (they go to the sink)
     """
     result = {
         "file_info": {
             "source_file": filepath,
-            "file_type": "X12 Transaction (Processing...)"
-        },
-        "interchange_header": {},
-        "functional_group": {},
+            "file_type": PENDING_FILE_TYPE
+        }
+    }
+    
+    if profile != PROFILE_RAW_ONLY:
+        result["interchange_header"] = {}
+        result["functional_group"] = {}
+        result["transaction_set"] = {}
+        result["billing_provider"] = {}
+        result["subscriber"] = {}
+        if not streaming:
+            result["claims"] = []
+    
+    if profile != PROFILE_TYPED_ONLY and not streaming:
+        result["all_segments"] = []
+    
+    return result
+
+
+def new_transaction(keep_segments=True):
+    """
+    Empty sections of one transaction set (nested layout); the handlers
+    fill them exactly as they fill a flat result
+    """
+    transaction = {
+        "file_info": {"file_type": PENDING_FILE_TYPE},
         "transaction_set": {},
         "billing_provider": {},
         "subscriber": {},
-        "claims": [],
-        "all_segments": []
+        "claims": []
     }
+    if keep_segments:
+        transaction["all_segments"] = []
+    return transaction
+
+
+def combined_file_type(file_types):
+    """File type of a nested result: its transaction sets' type(s)"""
+    distinct = list(dict.fromkeys(file_types))
+    if not distinct:
+        return PENDING_FILE_TYPE
+    return " + ".join(distinct)
+
+
+class InterchangeTree:
+    """
+    emit(key, item) target that assembles the nested layout in memory:
+    interchanges -> functional_groups -> transaction_sets
+    A transaction set or group that arrives without an enclosing header
+    gets an empty one
+    """
     
-    current_claim = None
-    current_service_lines = []
+    def __init__(self):
+        self.interchanges = []
+        self._groups = None
+        self._transaction_sets = None
     
-    try:
-        with open(filepath, 'r') as f:
-            reader = X12Reader(f)
+    def __call__(self, key, item):
+        if key == "interchange":
+            interchange = {"interchange_header": item, "functional_groups": []}
+            self.interchanges.append(interchange)
+            self._groups = interchange["functional_groups"]
+            self._transaction_sets = None
+        elif key == "functional_group":
+            if self._groups is None:
+                self("interchange", {})
+            group = {"functional_group": item, "transaction_sets": []}
+            self._groups.append(group)
+            self._transaction_sets = group["transaction_sets"]
+        else:
+            if self._transaction_sets is None:
+                self("functional_group", {})
+            self._transaction_sets.append(item)
+
+
+class TransactionSets:
+    """
+    Nested-layout bookkeeping: swaps state.result to a fresh transaction set
+    at ST and hands the finished set to emit("transaction_set", ...) at SE
+    emit is an InterchangeTree, or a streaming writer (x12_stream_writer) -
+    then only the open transaction set is held in memory
+    """
+    
+    def __init__(self, filepath, emit, keep_segments=True):
+        self.filepath = filepath
+        self.emit = emit
+        self.keep_segments = keep_segments
+        self.file_types = []
+        # Sections for stray segments outside ST...SE; never output
+        self.outside = new_transaction(keep_segments)
+        self._start = None
+    
+    def open(self, state):
+        """Start a transaction set at its ST (closing one left without SE)"""
+        if self.keep_segments:
+            st_segment = state.result["all_segments"][-1]
+        self.close(state, 1)
+        
+        state.result = new_transaction(self.keep_segments)
+        if self.keep_segments:
+            state.result["all_segments"].append(st_segment)
+        state.claim_provider_names = set()
+        state.claim_payer_names = set()
+        self._start = (state.segment_count - 1, state.claim_count, state.service_line_count)
+    
+    def close(self, state, trailing=0):
+        """
+        Finish the open transaction set (if any) and emit it
+        trailing: segments already read that belong after it (the ISA / GS /
+        ST that ends a set missing its SE)
+        """
+        if self._start is None:
+            return
+        state.close_claim()
+        state.close_hierarchy()
+        
+        transaction = state.result
+        if trailing and self.keep_segments:
+            del transaction["all_segments"][-trailing:]
+        apply_enhanced_detection(transaction, self.filepath, state.claim_provider_names,
+                                 state.claim_payer_names)
+        transaction.pop("_needs_enhanced_detection", None)
+        file_type = transaction.pop("file_info")["file_type"]
+        self.file_types.append(file_type)
+        
+        segments, claims, service_lines = self._start
+        transaction = {"file_type": file_type, **transaction}
+        transaction["summary"] = {
+            "total_segments": state.segment_count - trailing - segments,
+            "total_claims": state.claim_count - claims,
+            "total_service_lines": state.service_line_count - service_lines
+        }
+        self.emit("transaction_set", transaction)
+        
+        state.result = self.outside = new_transaction(self.keep_segments)
+        self._start = None
+
+
+# Segment ID -> handler(state, elements); filled in by @segment_handler
+SEGMENT_HANDLERS = {}
+RAW_SEGMENT_HANDLERS = {}
+
+
+def segment_handler(seg_id, registry=SEGMENT_HANDLERS):
+    """Register the decorated function as the handler for seg_id"""
+    def register(handler):
+        registry[seg_id] = handler
+        return handler
+    return register
+
+
+class TranslationState:
+    """Everything the segment handlers share while one file is translated"""
+    
+    __slots__ = ("result", "sink", "keep_elements", "records", "claim_hook", "claim_envelope",
+                 "current_claim", "current_service_lines", "loops", "transactions",
+                 "segment_count", "claim_count", "service_line_count",
+                 "claim_provider_names", "claim_payer_names",
+                 "raw_transaction_set_id", "raw_claim_type", "raw_in_claim")
+    
+    def __init__(self, result, sink=None, keep_elements=True, records=False, claim_hook=None):
+        self.result = result
+        self.sink = sink
+        self.keep_elements = keep_elements
+        self.records = records
+        self.claim_hook = claim_hook
+        self.claim_envelope = None
+        
+        self.current_claim = None
+        self.current_service_lines = []
+        self.loops = LoopStack()
+        self.transactions = None
+        
+        self.segment_count = 0
+        self.claim_count = 0
+        self.service_line_count = 0
+        self.claim_provider_names = set()
+        self.claim_payer_names = set()
+        
+        # raw-only keeps just enough state for file type and summary counts
+        self.raw_transaction_set_id = ""
+        self.raw_claim_type = ""
+        self.raw_in_claim = False
+    
+    def build_segment(self, seg_id, elements):
+        """Typed dict (or record) for a segment, laid out by SEGMENT_FIELDS"""
+        if self.records:
+            return RECORD_TYPES.get(seg_id, Segment)(elements, self.keep_elements)
+        return SEGMENT_BUILDERS[seg_id](elements, self.keep_elements)
+    
+    def add_item(self, key, item):
+        if self.sink is not None:
+            self.sink(key, item)
+        else:
+            self.result.setdefault(key, []).append(item)
+    
+    def close_claim(self):
+        """Finish the open claim (if any) and hand it to the output"""
+        claim = self.current_claim
+        if claim:
+            service_lines = self.current_service_lines
+            claim["service_lines"] = service_lines
+            self.claim_count += 1
+            self.service_line_count += len(service_lines)
             
-            for segment in reader:
-                seg_id = segment.get_seg_id()
-                
-                seg_str = str(segment)
-                elements = seg_str.split('*')
-                
-                result["all_segments"].append({
-                    "segment_id": seg_id,
-                    "elements": elements
-                })
-                
-                # ISA - Interchange Control Header
-                if seg_id == 'ISA':
-                    result["interchange_header"] = {
-                        "segment_id": "ISA",
-                        "authorization_info_qualifier": elements[1] if len(elements) > 1 else "",
-                        "authorization_info": elements[2] if len(elements) > 2 else "",
-                        "security_info_qualifier": elements[3] if len(elements) > 3 else "",
-                        "security_info": elements[4] if len(elements) > 4 else "",
-                        "sender_id_qualifier": elements[5] if len(elements) > 5 else "",
-                        "sender_id": elements[6] if len(elements) > 6 else "",
-                        "receiver_id_qualifier": elements[7] if len(elements) > 7 else "",
-                        "receiver_id": elements[8] if len(elements) > 8 else "",
-                        "interchange_date": elements[9] if len(elements) > 9 else "",
-                        "interchange_time": elements[10] if len(elements) > 10 else "",
-                        "standards_id": elements[11] if len(elements) > 11 else "",
-                        "version_number": elements[12] if len(elements) > 12 else "",
-                        "interchange_control_number": elements[13] if len(elements) > 13 else "",
-                        "acknowledgment_requested": elements[14] if len(elements) > 14 else "",
-                        "usage_indicator": elements[15] if len(elements) > 15 else "",
-                        "all_elements": elements
-                    }
-                
-                # GS - Functional Group Header
-                elif seg_id == 'GS':
-                    result["functional_group"] = {
-                        "segment_id": "GS",
-                        "functional_id_code": elements[1] if len(elements) > 1 else "",
-                        "application_sender_code": elements[2] if len(elements) > 2 else "",
-                        "application_receiver_code": elements[3] if len(elements) > 3 else "",
-                        "date": elements[4] if len(elements) > 4 else "",
-                        "time": elements[5] if len(elements) > 5 else "",
-                        "group_control_number": elements[6] if len(elements) > 6 else "",
-                        "responsible_agency_code": elements[7] if len(elements) > 7 else "",
-                        "version_code": elements[8] if len(elements) > 8 else "",
-                        "all_elements": elements
-                    }
-                
-                # ST - Transaction Set Header
-                elif seg_id == 'ST':
-                    transaction_set_id = elements[1] if len(elements) > 1 else ""
-                    
-                    result["transaction_set"] = {
-                        "segment_id": "ST",
-                        "transaction_set_id": transaction_set_id,
-                        "transaction_control_number": elements[2] if len(elements) > 2 else "",
-                        "implementation_convention_ref": elements[3] if len(elements) > 3 else "",
-                        "all_elements": elements
-                    }
-                    
-                    result["file_info"]["file_type"] = detect_file_type(transaction_set_id)
-                
-                # BHT - Beginning of Hierarchical Transaction
-                elif seg_id == 'BHT':
-                    claim_type = elements[6] if len(elements) > 6 else ""
-                    
-                    result["transaction_set"]["beginning_hierarchical_transaction"] = {
-                        "segment_id": "BHT",
-                        "hierarchical_structure_code": elements[1] if len(elements) > 1 else "",
-                        "transaction_set_purpose_code": elements[2] if len(elements) > 2 else "",
-                        "reference_id": elements[3] if len(elements) > 3 else "",
-                        "date": elements[4] if len(elements) > 4 else "",
-                        "time": elements[5] if len(elements) > 5 else "",
-                        "claim_type": claim_type,
-                        "all_elements": elements
-                    }
-                    
-                    result["_needs_enhanced_detection"] = True
-                
-                # NM1 - Name/Entity
-                elif seg_id == 'NM1':
-                    entity_code = elements[1] if len(elements) > 1 else ""
-                    entity_data = {
-                        "segment_id": "NM1",
-                        "entity_id_code": entity_code,
-                        "entity_type_qualifier": elements[2] if len(elements) > 2 else "",
-                        "name_last_or_organization": elements[3] if len(elements) > 3 else "",
-                        "name_first": elements[4] if len(elements) > 4 else "",
-                        "name_middle": elements[5] if len(elements) > 5 else "",
-                        "name_prefix": elements[6] if len(elements) > 6 else "",
-                        "name_suffix": elements[7] if len(elements) > 7 else "",
-                        "id_code_qualifier": elements[8] if len(elements) > 8 else "",
-                        "id_code": elements[9] if len(elements) > 9 else "",
-                        "all_elements": elements
-                    }
-                    
-                    if entity_code == '85':
-                        result["billing_provider"] = entity_data
-                    elif entity_code == 'IL':
-                        result["subscriber"] = entity_data
-                    elif entity_code == 'QC':
-                        if current_claim:
-                            current_claim["patient"] = entity_data
-                    elif entity_code == 'PR':
-                        if current_claim:
-                            current_claim["payer"] = entity_data
-                    elif entity_code == '82':
-                        if current_claim:
-                            current_claim["rendering_provider"] = entity_data
-                    else:
-                        if "other_entities" not in result:
-                            result["other_entities"] = []
-                        result["other_entities"].append(entity_data)
-                
-                # N3 - Address
-                elif seg_id == 'N3':
-                    address_data = {
-                        "segment_id": "N3",
-                        "address_line_1": elements[1] if len(elements) > 1 else "",
-                        "address_line_2": elements[2] if len(elements) > 2 else "",
-                        "all_elements": elements
-                    }
-                    if current_claim and "patient" in current_claim:
-                        current_claim["patient"]["address"] = address_data
-                    elif result["billing_provider"]:
-                        result["billing_provider"]["address"] = address_data
-                
-                # N4 - Geographic Location
-                elif seg_id == 'N4':
-                    location_data = {
-                        "segment_id": "N4",
-                        "city": elements[1] if len(elements) > 1 else "",
-                        "state": elements[2] if len(elements) > 2 else "",
-                        "postal_code": elements[3] if len(elements) > 3 else "",
-                        "country_code": elements[4] if len(elements) > 4 else "",
-                        "all_elements": elements
-                    }
-                    if current_claim and "patient" in current_claim:
-                        current_claim["patient"]["geographic_location"] = location_data
-                    elif result["billing_provider"]:
-                        result["billing_provider"]["geographic_location"] = location_data
-                
-                # REF - Reference Information
-                elif seg_id == 'REF':
-                    ref_data = {
-                        "segment_id": "REF",
-                        "reference_id_qualifier": elements[1] if len(elements) > 1 else "",
-                        "reference_id": elements[2] if len(elements) > 2 else "",
-                        "description": elements[3] if len(elements) > 3 else "",
-                        "all_elements": elements
-                    }
-                    if current_claim:
-                        if "references" not in current_claim:
-                            current_claim["references"] = []
-                        current_claim["references"].append(ref_data)
-                    else:
-                        if "header_references" not in result:
-                            result["header_references"] = []
-                        result["header_references"].append(ref_data)
-                
-                # PER - Contact Information
-                elif seg_id == 'PER':
-                    contact_data = {
-                        "segment_id": "PER",
-                        "contact_function_code": elements[1] if len(elements) > 1 else "",
-                        "name": elements[2] if len(elements) > 2 else "",
-                        "communication_number_qualifier_1": elements[3] if len(elements) > 3 else "",
-                        "communication_number_1": elements[4] if len(elements) > 4 else "",
-                        "communication_number_qualifier_2": elements[5] if len(elements) > 5 else "",
-                        "communication_number_2": elements[6] if len(elements) > 6 else "",
-                        "all_elements": elements
-                    }
-                    if "contacts" not in result:
-                        result["contacts"] = []
-                    result["contacts"].append(contact_data)
-                
-                # CLM - Claim Information
-                elif seg_id == 'CLM':
-                    if current_claim:
-                        current_claim["service_lines"] = current_service_lines
-                        result["claims"].append(current_claim)
-                    
-                    current_claim = {
-                        "segment_id": "CLM",
-                        "claim_id": elements[1] if len(elements) > 1 else "",
-                        "total_charge": elements[2] if len(elements) > 2 else "",
-                        "claim_filing_indicator": elements[5] if len(elements) > 5 else "",
-                        "provider_signature_indicator": elements[6] if len(elements) > 6 else "",
-                        "assignment_plan": elements[7] if len(elements) > 7 else "",
-                        "benefits_assignment": elements[8] if len(elements) > 8 else "",
-                        "release_info": elements[9] if len(elements) > 9 else "",
-                        "all_elements": elements
-                    }
-                    current_service_lines = []
-                
-                # HI - Health Care Diagnosis Code
-                elif seg_id == 'HI' and current_claim:
-                    diagnosis_codes = []
-                    for i in range(1, len(elements)):
-                        if elements[i]:
-                            diagnosis_codes.append(elements[i])
-                    current_claim["diagnosis_codes"] = {
-                        "segment_id": "HI",
-                        "codes": diagnosis_codes,
-                        "all_elements": elements
-                    }
-                
-                # DTP - Date/Time/Period
-                elif seg_id == 'DTP':
-                    date_data = {
-                        "segment_id": "DTP",
-                        "date_qualifier": elements[1] if len(elements) > 1 else "",
-                        "date_format": elements[2] if len(elements) > 2 else "",
-                        "date_value": elements[3] if len(elements) > 3 else "",
-                        "all_elements": elements
-                    }
-                    
-                    date_qualifier = elements[1] if len(elements) > 1 else ""
-                    
-                    # Check if this is a service line date (472 = service date)
-                    if date_qualifier == '472' and current_claim and current_service_lines:
-                        # Add to the most recent service line
-                        if "dates" not in current_service_lines[-1]:
-                            current_service_lines[-1]["dates"] = []
-                        current_service_lines[-1]["dates"].append(date_data)
-                    elif current_claim:
-                        # Otherwise add to claim level
-                        if "dates" not in current_claim:
-                            current_claim["dates"] = []
-                        current_claim["dates"].append(date_data)
-                
-                # LX - Service Line Number
-                elif seg_id == 'LX' and current_claim:
-                    current_service_line = {
-                        "segment_id": "LX",
-                        "line_number": elements[1] if len(elements) > 1 else "",
-                        "all_elements": elements
-                    }
-                    current_service_lines.append(current_service_line)
-                
-                # SV1 - Professional Service
-                elif seg_id == 'SV1' and current_claim and current_service_lines:
-                    current_service_lines[-1]["service_info"] = {
-                        "segment_id": "SV1",
-                        "procedure_info": elements[1] if len(elements) > 1 else "",
-                        "line_charge": elements[2] if len(elements) > 2 else "",
-                        "unit_basis": elements[3] if len(elements) > 3 else "",
-                        "unit_count": elements[4] if len(elements) > 4 else "",
-                        "place_of_service": elements[5] if len(elements) > 5 else "",
-                        "diagnosis_pointer": elements[7] if len(elements) > 7 else "",
-                        "all_elements": elements
-                    }
-                
-                # HL - Hierarchical Level
-                elif seg_id == 'HL':
-                    hl_data = {
-                        "segment_id": "HL",
-                        "hierarchical_id": elements[1] if len(elements) > 1 else "",
-                        "parent_id": elements[2] if len(elements) > 2 else "",
-                        "level_code": elements[3] if len(elements) > 3 else "",
-                        "child_code": elements[4] if len(elements) > 4 else "",
-                        "all_elements": elements
-                    }
-                    if "hierarchical_levels" not in result:
-                        result["hierarchical_levels"] = []
-                    result["hierarchical_levels"].append(hl_data)
-                
-                # SBR - Subscriber Information
-                elif seg_id == 'SBR':
-                    sbr_data = {
-                        "segment_id": "SBR",
-                        "payer_responsibility": elements[1] if len(elements) > 1 else "",
-                        "individual_relationship": elements[2] if len(elements) > 2 else "",
-                        "group_number": elements[3] if len(elements) > 3 else "",
-                        "group_name": elements[4] if len(elements) > 4 else "",
-                        "insurance_type": elements[5] if len(elements) > 5 else "",
-                        "claim_filing_indicator": elements[9] if len(elements) > 9 else "",
-                        "all_elements": elements
-                    }
-                    result["subscriber"]["insurance_info"] = sbr_data
-                
-                # PRV - Provider Information
-                elif seg_id == 'PRV':
-                    prv_data = {
-                        "segment_id": "PRV",
-                        "provider_code": elements[1] if len(elements) > 1 else "",
-                        "reference_id_qualifier": elements[2] if len(elements) > 2 else "",
-                        "reference_id": elements[3] if len(elements) > 3 else "",
-                        "all_elements": elements
-                    }
-                    if "provider_info" not in result:
-                        result["provider_info"] = []
-                    result["provider_info"].append(prv_data)
-                
-                # DMG - Demographics
-                elif seg_id == 'DMG':
-                    dmg_data = {
-                        "segment_id": "DMG",
-                        "date_format": elements[1] if len(elements) > 1 else "",
-                        "date_of_birth": elements[2] if len(elements) > 2 else "",
-                        "gender": elements[3] if len(elements) > 3 else "",
-                        "all_elements": elements
-                    }
-                    if current_claim and "patient" in current_claim:
-                        current_claim["patient"]["demographics"] = dmg_data
-                
-                # AMT - Monetary Amount
-                elif seg_id == 'AMT':
-                    amt_data = {
-                        "segment_id": "AMT",
-                        "amount_qualifier": elements[1] if len(elements) > 1 else "",
-                        "amount": elements[2] if len(elements) > 2 else "",
-                        "all_elements": elements
-                    }
-                    if current_claim:
-                        if "amounts" not in current_claim:
-                            current_claim["amounts"] = []
-                        current_claim["amounts"].append(amt_data)
+            # Names are only needed for 837 subtype detection once the file is done
+            if claim.get("payer", {}).get("name_last_or_organization"):
+                self.claim_payer_names.add(claim["payer"]["name_last_or_organization"])
+            if claim.get("rendering_provider", {}).get("name_last_or_organization"):
+                self.claim_provider_names.add(claim["rendering_provider"]["name_last_or_organization"])
             
-            # Save last claim
-            if current_claim:
-                current_claim["service_lines"] = current_service_lines
-                result["claims"].append(current_claim)
+            if self.claim_hook is not None:
+                self.claim_hook(claim, self.claim_envelope)
+            self.add_item("claims", claim)
+        
+        self.current_claim = None
+        self.current_service_lines = []
+    
+    def close_hierarchy(self):
+        """Hand the transaction set's HL tree (one entry per root node) to the output"""
+        for root in self.loops.end_transaction():
+            self.add_item("hierarchy", root)
+
+
+# ISA - Interchange Control Header
+@segment_handler("ISA")
+def handle_isa(state, elements):
+    state.result["interchange_header"] = state.build_segment("ISA", elements)
+
+
+# GS - Functional Group Header
+@segment_handler("GS")
+def handle_gs(state, elements):
+    state.result["functional_group"] = state.build_segment("GS", elements)
+
+
+# ST - Transaction Set Header
+@segment_handler("ST")
+def handle_st(state, elements):
+    transaction_set = state.build_segment("ST", elements)
+    state.result["transaction_set"] = transaction_set
+    state.result["file_info"]["file_type"] = detect_file_type(transaction_set["transaction_set_id"])
+
+
+# BHT - Beginning of Hierarchical Transaction
+@segment_handler("BHT")
+def handle_bht(state, elements):
+    state.result["transaction_set"]["beginning_hierarchical_transaction"] = state.build_segment("BHT", elements)
+    state.result["_needs_enhanced_detection"] = True
+
+
+# NM1 entity code -> key of the HL node (2010AA/AB, 2010BA/BB, 2010CA) it fills
+HL_ENTITY_KEYS = {"85": "billing_provider", "87": "pay_to_provider", "IL": "subscriber",
+                  "PR": "payer", "QC": "patient"}
+
+
+# NM1 - Name/Entity
+# Attached to the innermost open loop: HL node, claim (2310/2330) or service
+# line (2420); the N3/N4/DMG/REF/PRV segments that follow belong to it
+@segment_handler("NM1")
+def handle_nm1(state, elements):
+    entity_data = state.build_segment("NM1", elements)
+    entity_code = entity_data["entity_id_code"]
+    loops = state.loops
+    loop = loops.loop
+    
+    if loop is None:
+        # Header (1000A/1000B), or a transaction set without HL loops
+        if entity_code == '85':
+            state.result["billing_provider"] = entity_data
+        elif entity_code == 'IL':
+            state.result["subscriber"] = entity_data
+        else:
+            state.add_item("other_entities", entity_data)
+    elif loop == CLAIM_LOOP or loop == SERVICE_LINE_LOOP:
+        owner = loops.owner
+        # After an SBR (2320) the names are another payer's (2330A-G)
+        if entity_code == '82' and "other_subscribers" not in owner:
+            owner["rendering_provider"] = entity_data
+        else:
+            owner.setdefault("other_entities", []).append(entity_data)
+    else:
+        node = loops.owner
+        key = HL_ENTITY_KEYS.get(entity_code)
+        if key is None:
+            node.setdefault("other_entities", []).append(entity_data)
+        else:
+            node[key] = entity_data
+            if entity_code == '85':
+                state.result["billing_provider"] = entity_data
+            elif entity_code == 'IL':
+                if "insurance_info" in node:
+                    entity_data["insurance_info"] = node["insurance_info"]
+                state.result["subscriber"] = entity_data
+    
+    loops.entity = entity_data
+
+
+# N3 - Address
+@segment_handler("N3")
+def handle_n3(state, elements):
+    entity = state.loops.entity
+    if entity is not None:
+        entity["address"] = state.build_segment("N3", elements)
+
+
+# N4 - Geographic Location
+@segment_handler("N4")
+def handle_n4(state, elements):
+    entity = state.loops.entity
+    if entity is not None:
+        entity["geographic_location"] = state.build_segment("N4", elements)
+
+
+# REF - Reference Information
+# The current entity's, else the open service line's, claim's or HL node's
+@segment_handler("REF")
+def handle_ref(state, elements):
+    ref_data = state.build_segment("REF", elements)
+    loops = state.loops
+    owner = loops.entity or loops.owner
+    if owner is not None:
+        owner.setdefault("references", []).append(ref_data)
+    else:
+        state.add_item("header_references", ref_data)
+
+
+# PER - Contact Information
+@segment_handler("PER")
+def handle_per(state, elements):
+    state.add_item("contacts", state.build_segment("PER", elements))
+
+
+# CLM - Claim Information
+# Payer (2010BB) and patient (2010CA) are read from the claim's own HL loops
+@segment_handler("CLM")
+def handle_clm(state, elements):
+    state.close_claim()
+    claim = state.build_segment("CLM", elements)
+    loops = state.loops
+    loops.open_loop(CLAIM_LOOP, claim)
+    
+    hl_node = loops.hl_node()
+    subscriber_node = loops.ancestor("2000B")
+    if hl_node is not None:
+        claim["hierarchical_id"] = hl_node["hierarchical_level"]["hierarchical_id"]
+        if subscriber_node is not None and "payer" in subscriber_node:
+            claim["payer"] = subscriber_node["payer"]
+        patient_node = loops.ancestor("2000C")
+        if patient_node is not None and "patient" in patient_node:
+            claim["patient"] = patient_node["patient"]
+    
+    state.current_claim = claim
+    if state.claim_hook is not None:
+        # The claim closes lazily (next CLM / HL / SE) - keep the subscriber
+        # and billing provider of the loops it was opened under
+        billing_node = loops.ancestor("2000A")
+        result = state.result
+        state.claim_envelope = {
+            "subscriber": (subscriber_node.get("subscriber", {}) if subscriber_node is not None
+                           else result.get("subscriber", {})),
+            "billing_provider": (billing_node.get("billing_provider", {}) if billing_node is not None
+                                 else result.get("billing_provider", {}))
+        }
+
+
+# HI - Health Care Diagnosis Code
+@segment_handler("HI")
+def handle_hi(state, elements):
+    if not state.current_claim:
+        return
+    # Composite codes, not fixed fields: every non-empty element after HI
+    diagnosis_codes = {
+        "segment_id": "HI",
+        "codes": [code for code in elements[1:] if code]
+    }
+    if state.keep_elements:
+        diagnosis_codes["all_elements"] = elements
+    state.current_claim["diagnosis_codes"] = diagnosis_codes
+
+
+# DTP - Date/Time/Period
+# Service line dates inside 2400, claim dates otherwise
+@segment_handler("DTP")
+def handle_dtp(state, elements):
+    current_claim = state.current_claim
+    if not current_claim:
+        return
+    date_data = state.build_segment("DTP", elements)
+    
+    if state.loops.loop == SERVICE_LINE_LOOP:
+        state.current_service_lines[-1].setdefault("dates", []).append(date_data)
+    else:
+        current_claim.setdefault("dates", []).append(date_data)
+
+
+# LX - Service Line Number
+@segment_handler("LX")
+def handle_lx(state, elements):
+    if state.current_claim:
+        service_line = state.build_segment("LX", elements)
+        state.current_service_lines.append(service_line)
+        state.loops.open_loop(SERVICE_LINE_LOOP, service_line)
+
+
+# SV1 - Professional Service
+@segment_handler("SV1")
+def handle_sv1(state, elements):
+    if state.current_claim and state.current_service_lines:
+        state.current_service_lines[-1]["service_info"] = state.build_segment("SV1", elements)
+
+
+# SV2 - Institutional Service
+@segment_handler("SV2")
+def handle_sv2(state, elements):
+    if state.current_claim and state.current_service_lines:
+        state.current_service_lines[-1]["service_info"] = state.build_segment("SV2", elements)
+
+
+# SV3 - Dental Service
+@segment_handler("SV3")
+def handle_sv3(state, elements):
+    if state.current_claim and state.current_service_lines:
+        state.current_service_lines[-1]["service_info"] = state.build_segment("SV3", elements)
+
+
+# HL - Hierarchical Level
+# Ends the open claim; the new node hangs off its parent, found by HL02
+@segment_handler("HL")
+def handle_hl(state, elements):
+    state.close_claim()
+    hierarchical_level = state.build_segment("HL", elements)
+    state.add_item("hierarchical_levels", hierarchical_level)
+    node = state.loops.open_hl(hierarchical_level["hierarchical_id"], hierarchical_level["parent_id"],
+                               hierarchical_level["level_code"])
+    node["hierarchical_level"] = hierarchical_level
+
+
+# SBR - Subscriber Information
+# 2000B: the subscriber loop's; inside a claim (2320): another payer's subscriber
+@segment_handler("SBR")
+def handle_sbr(state, elements):
+    insurance_info = state.build_segment("SBR", elements)
+    loops = state.loops
+    loop = loops.loop
+    if loop is None:
+        state.result["subscriber"]["insurance_info"] = insurance_info
+    elif loop == CLAIM_LOOP or loop == SERVICE_LINE_LOOP:
+        state.current_claim.setdefault("other_subscribers", []).append(insurance_info)
+        loops.entity = None
+    else:
+        loops.owner["insurance_info"] = insurance_info
+
+
+# PRV - Provider Information
+@segment_handler("PRV")
+def handle_prv(state, elements):
+    provider_info = state.build_segment("PRV", elements)
+    loops = state.loops
+    owner = loops.entity or loops.owner
+    if owner is not None:
+        owner["provider_info"] = provider_info
+    else:
+        state.add_item("provider_info", provider_info)
+
+
+# DMG - Demographics
+@segment_handler("DMG")
+def handle_dmg(state, elements):
+    entity = state.loops.entity
+    if entity is not None:
+        entity["demographics"] = state.build_segment("DMG", elements)
+
+
+# AMT - Monetary Amount
+@segment_handler("AMT")
+def handle_amt(state, elements):
+    if not state.current_claim:
+        return
+    owner = state.current_service_lines[-1] if state.loops.loop == SERVICE_LINE_LOOP else state.current_claim
+    owner.setdefault("amounts", []).append(state.build_segment("AMT", elements))
+
+
+# SE - Transaction Set Trailer
+# Close the open claim so it never absorbs the next set's headers, and
+# emit the set's finished HL tree
+@segment_handler("SE")
+def handle_se(state, elements):
+    state.close_claim()
+    state.close_hierarchy()
+
+
+# nested layout: ISA / GS / ST / SE open and close the interchange, group
+# and transaction set levels; the segments between ST and SE go through the
+# handlers above into the open transaction set's own sections
+NESTED_SEGMENT_HANDLERS = dict(SEGMENT_HANDLERS)
+
+
+@segment_handler("ISA", NESTED_SEGMENT_HANDLERS)
+def handle_nested_isa(state, elements):
+    transactions = state.transactions
+    transactions.close(state, 1)
+    transactions.emit("interchange", state.build_segment("ISA", elements))
+
+
+@segment_handler("GS", NESTED_SEGMENT_HANDLERS)
+def handle_nested_gs(state, elements):
+    transactions = state.transactions
+    transactions.close(state, 1)
+    transactions.emit("functional_group", state.build_segment("GS", elements))
+
+
+@segment_handler("ST", NESTED_SEGMENT_HANDLERS)
+def handle_nested_st(state, elements):
+    state.transactions.open(state)
+    handle_st(state, elements)
+
+
+@segment_handler("SE", NESTED_SEGMENT_HANDLERS)
+def handle_nested_se(state, elements):
+    state.transactions.close(state)
+
+
+# raw-only profile: no typed sections, just the counters and file type
+@segment_handler("ST", RAW_SEGMENT_HANDLERS)
+def handle_raw_st(state, elements):
+    state.raw_transaction_set_id = elements[1] if len(elements) > 1 else ""
+    state.result["file_info"]["file_type"] = detect_file_type(state.raw_transaction_set_id)
+
+
+@segment_handler("BHT", RAW_SEGMENT_HANDLERS)
+def handle_raw_bht(state, elements):
+    state.raw_claim_type = elements[6] if len(elements) > 6 else ""
+
+
+@segment_handler("CLM", RAW_SEGMENT_HANDLERS)
+def handle_raw_clm(state, elements):
+    state.claim_count += 1
+    state.raw_in_claim = True
+
+
+@segment_handler("LX", RAW_SEGMENT_HANDLERS)
+def handle_raw_lx(state, elements):
+    if state.raw_in_claim:
+        state.service_line_count += 1
+
+
+@segment_handler("SE", RAW_SEGMENT_HANDLERS)
+def handle_raw_se(state, elements):
+    state.raw_in_claim = False
+
+
+def combine_claim_hooks(*hooks):
+    """One claim_hook that calls every hook given (None entries are skipped)"""
+    hooks = [hook for hook in hooks if hook is not None]
+    if len(hooks) < 2:
+        return hooks[0] if hooks else None
+    
+    def claim_hook(claim, envelope):
+        for hook in hooks:
+            hook(claim, envelope)
+    return claim_hook
+
+
+def add_analytics(data, analytics):
+    """Put analytics.summarize() into data["summary"]["analytics"] (no-op without analytics)"""
+    if analytics is not None:
+        data["summary"]["analytics"] = analytics.summarize()
+
+
+class DetailedBuilder:
+    """
+    Push-style detailed translation: feed(seg_id, elements) for every
+    segment in file order, then finish() for the result dict
+    translate_x12_complete_structured drives one from the tokenizer;
+    x12_multi_output drives it alongside other builders from one pass
+    layout="nested" builds interchanges -> functional_groups ->
+    transaction_sets instead of one flat result; with a sink each finished
+    transaction set goes to sink("transaction_set", ...) (after the
+    "interchange" / "functional_group" headers it sits under)
+    """
+    
+    def __init__(self, filepath, sink=None, profile=PROFILE_FULL, records=False, claim_hook=None,
+                 layout=LAYOUT_FLAT):
+        if profile not in OUTPUT_PROFILES:
+            raise ValueError(f"Unknown output profile '{profile}' (choose from {', '.join(OUTPUT_PROFILES)})")
+        if layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"Unknown output layout '{layout}' (choose from {', '.join(OUTPUT_LAYOUTS)})")
+        
+        self.filepath = filepath
+        self.raw_only = profile == PROFILE_RAW_ONLY
+        keep_segments = profile != PROFILE_TYPED_ONLY
+        
+        if layout == LAYOUT_NESTED:
+            if self.raw_only:
+                raise ValueError("The nested layout needs typed sections, which the raw-only profile does not build")
+            self.result = {"file_info": {"source_file": filepath, "file_type": PENDING_FILE_TYPE}}
+            if sink is None:
+                tree = InterchangeTree()
+                self.result["interchanges"] = tree.interchanges
+                sink = tree
+            self.transactions = TransactionSets(filepath, sink, keep_segments)
+            self.state = TranslationState(self.transactions.outside, keep_elements=profile == PROFILE_FULL,
+                                          records=records, claim_hook=claim_hook)
+            self.state.transactions = self.transactions
+            handlers = NESTED_SEGMENT_HANDLERS
+        else:
+            self.result = new_result(filepath, profile, streaming=sink is not None)
+            self.transactions = None
+            self.state = TranslationState(self.result, sink, keep_elements=profile == PROFILE_FULL,
+                                          records=records, claim_hook=claim_hook)
+            handlers = RAW_SEGMENT_HANDLERS if self.raw_only else SEGMENT_HANDLERS
+        
+        self.feed = self._segment_feed(handlers, keep_segments, records)
+    
+    def _segment_feed(self, handlers, keep_segments, records):
+        """feed(seg_id, elements) with everything it touches bound as locals"""
+        state = self.state
+        get_handler = handlers.get
+        add_item = state.add_item
+        
+        def feed(seg_id, elements):
+            state.segment_count += 1
+            if keep_segments:
+                if records:
+                    add_item("all_segments", RawSegment(elements))
+                else:
+                    add_item("all_segments", {
+                        "segment_id": seg_id,
+                        "elements": elements
+                    })
             
-            # Enhanced 837 subtype detection
-            if result.get("_needs_enhanced_detection") and result["transaction_set"].get("transaction_set_id") == "837":
-                provider_names = []
-                payer_names = []
-                
-                if result.get("billing_provider", {}).get("name_last_or_organization"):
-                    provider_names.append(result["billing_provider"]["name_last_or_organization"])
-                
-                if result.get("subscriber", {}).get("name_last_or_organization"):
-                    payer_names.append(result["subscriber"]["name_last_or_organization"])
-                
-                for claim in result.get("claims", []):
-                    if claim.get("payer", {}).get("name_last_or_organization"):
-                        payer_names.append(claim["payer"]["name_last_or_organization"])
-                    if claim.get("rendering_provider", {}).get("name_last_or_organization"):
-                        provider_names.append(claim["rendering_provider"]["name_last_or_organization"])
-                
-                claim_type = result.get("transaction_set", {}).get("beginning_hierarchical_transaction", {}).get("claim_type", "")
-                filename = os.path.basename(filepath)
-                
+            handler = get_handler(seg_id)
+            if handler is not None:
+                handler(state, elements)
+        
+        return feed
+    
+    def finish(self):
+        """Close the last claim, detect the 837 subtype and add the summary"""
+        state = self.state
+        result = self.result
+        
+        if self.transactions is not None:
+            # Last transaction set (if its SE is missing); the file's type is
+            # its transaction sets' type(s)
+            self.transactions.close(state)
+            file_types = self.transactions.file_types
+            result["file_info"]["file_type"] = combined_file_type(file_types)
+            result["summary"] = {
+                "total_segments": state.segment_count,
+                "total_transaction_sets": len(file_types),
+                "total_claims": state.claim_count,
+                "total_service_lines": state.service_line_count
+            }
+            return result
+        
+        # Save last claim (and the HL tree of a set without SE)
+        state.close_claim()
+        if not self.raw_only:
+            state.close_hierarchy()
+        
+        # Enhanced 837 subtype detection
+        if self.raw_only:
+            # No entity names without typed sections: BHT06 and filename only
+            if state.raw_transaction_set_id == "837":
                 result["file_info"]["file_type"] = determine_837_subtype(
-                    claim_type, 
-                    filename, 
-                    provider_names, 
-                    payer_names
+                    state.raw_claim_type, os.path.basename(self.filepath)
                 )
-                
-                del result["_needs_enhanced_detection"]
+        else:
+            apply_enhanced_detection(result, self.filepath, state.claim_provider_names,
+                                     state.claim_payer_names)
+        
+        # Add summary
+        result["summary"] = {
+            "total_segments": state.segment_count,
+            "total_claims": state.claim_count,
+            "total_service_lines": state.service_line_count
+        }
+        return result
+
+
+def translate_x12_complete_structured(filepath, sink=None, span=None, delimiters=None,
+                                      profile=PROFILE_FULL, records=False, timings=None,
+                                      claim_hook=None, layout=LAYOUT_FLAT):
+    """
+    Translate X12 to structured JSON with ALL information
+    Returns complete hierarchical structure with business headers
+    MODIFIED: Detects file type dynamically
+    STREAMING: When a sink is given, every finished claim (and every entry of
+    the repeating lists, all_segments included) is handed to sink(key, item)
+    instead of being kept - the returned dict is just the envelope plus summary
+    SPAN: span=(start, end) with known delimiters translates just that byte
+    range of the file (used by translate_x12_parallel)
+    PROFILE: which copies of the data to build (see OUTPUT_PROFILES)
+      full       - typed sections with all_elements, plus all_segments
+      typed-only - typed sections only, no all_elements / all_segments
+      raw-only   - all_segments only, no typed sections
+    DISPATCH: each segment goes to its SEGMENT_HANDLERS entry; segments
+    without one are only kept in all_segments
+    RECORDS: records=True builds x12_records objects instead of nested dicts
+    (same keys, a fraction of the memory); x12_json serializes them as usual
+    TIMINGS: pass an x12_timings.ParseTimings to collect per-segment-ID and
+    read/tokenize/build phase times; they also go into summary["timings"]
+    CLAIM HOOK: claim_hook(claim, envelope) is called for every finished
+    claim just before it is output; envelope holds the "subscriber" and
+    "billing_provider" in effect where the claim started (x12_claim_index)
+    LAYOUT: "flat" (default) - one result; a file with several ST...SE sets
+    keeps the last set's headers and every set's claims in one list
+      "nested" - {"file_info", "interchanges": [{"interchange_header",
+      "functional_groups": [{"functional_group", "transaction_sets": [...]}]}],
+      "summary"}; each transaction set holds its own headers, claims,
+      hierarchy and summary. With a sink, sets are handed over as they end
+    """
+    builder = DetailedBuilder(filepath, sink, profile=profile, records=records, claim_hook=claim_hook,
+                              layout=layout)
+    feed = builder.feed
+    
+    try:
+        with open(filepath, 'rb') as f:
+            if timings is None:
+                segments = iter_segments(f, span=span, delimiters=delimiters)
+            else:
+                segments = timings.segments(iter_segments(timings.stream(f), span=span,
+                                                          delimiters=delimiters))
             
-            # Add summary
-            result["summary"] = {
-                "total_segments": len(result["all_segments"]),
-                "total_claims": len(result["claims"]),
-                "total_service_lines": sum(len(claim.get("service_lines", [])) for claim in result["claims"])
-            }
+            for seg_id, elements in segments:
+                feed(seg_id, elements)
+            
+            result = builder.finish()
+            if timings is not None:
+                result["summary"]["timings"] = timings.to_dict()
             
             return result
     
@@ -477,13 +888,172 @@ def translate_x12_complete_structured(filepath):
         raise RuntimeError(f"Error translating X12 file: {str(e)}")
 
 
+def translate_x12_span(filepath, delimiters, profile, records, span):
+    """Translate one byte range of a file (process-pool worker entry point)"""
+    return translate_x12_complete_structured(filepath, span=span, delimiters=delimiters,
+                                             profile=profile, records=records)
+
+
+def merge_partial_results(filepath, parts, profile=PROFILE_FULL):
+    """
+    Fold per-range results (in file order) into one detailed result
+    Header sections keep the last non-empty value, like the serial loop
+    overwriting them; lists are concatenated in order
+    """
+    merged = new_result(filepath, profile)
+    saw_bht = False
+    
+    for part in parts:
+        for key, value in part.items():
+            if key in ("file_info", "summary", "_needs_enhanced_detection"):
+                continue
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            elif value:
+                merged[key] = value
+        
+        if "beginning_hierarchical_transaction" in part.get("transaction_set", {}):
+            saw_bht = True
+    
+    if profile == PROFILE_RAW_ONLY:
+        # Each range settled its own type from ST/BHT; the last transaction set wins
+        for part in parts:
+            if part["file_info"]["file_type"] != PENDING_FILE_TYPE:
+                merged["file_info"]["file_type"] = part["file_info"]["file_type"]
+    elif merged["transaction_set"]:
+        merged["file_info"]["file_type"] = detect_file_type(merged["transaction_set"].get("transaction_set_id"))
+    
+    if saw_bht:
+        merged["_needs_enhanced_detection"] = True
+        apply_enhanced_detection(
+            merged,
+            filepath,
+            {c["rendering_provider"]["name_last_or_organization"] for c in merged["claims"]
+             if c.get("rendering_provider", {}).get("name_last_or_organization")},
+            {c["payer"]["name_last_or_organization"] for c in merged["claims"]
+             if c.get("payer", {}).get("name_last_or_organization")}
+        )
+    
+    merged["summary"] = {
+        "total_segments": sum(part["summary"]["total_segments"] for part in parts),
+        "total_claims": sum(part["summary"]["total_claims"] for part in parts),
+        "total_service_lines": sum(part["summary"]["total_service_lines"] for part in parts)
+    }
+    
+    return merged
+
+
+def translate_x12_parallel(filepath, workers=None, profile=PROFILE_FULL, records=False):
+    """
+    Translate one large file using several processes
+    Byte ranges of the ST...SE transaction sets are parsed in a process pool
+    and merged back in file order; envelope segments are parsed here
+    Falls back to the serial translator for single-transaction files
+    """
+    try:
+        delimiters, pieces = index_transaction_sets(filepath)
+    except Exception as e:
+        raise RuntimeError(f"Error translating X12 file: {str(e)}")
+    
+    transaction_spans = [(start, end) for kind, start, end in pieces if kind == "transaction"]
+    if len(transaction_spans) < 2 or workers == 1:
+        return translate_x12_complete_structured(filepath, profile=profile, records=records)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        transaction_parts = iter(pool.map(partial(translate_x12_span, filepath, delimiters, profile, records),
+                                          transaction_spans))
+        
+        parts = []
+        for kind, start, end in pieces:
+            if kind == "transaction":
+                parts.append(next(transaction_parts))
+            else:
+                parts.append(translate_x12_span(filepath, delimiters, profile, records, (start, end)))
+    
+    return merge_partial_results(filepath, parts, profile)
+
+
+def detailed_cache_parts(filepath, profile, layout=LAYOUT_FLAT):
+    """
+    Cache key parts of a detailed result: PARSER_VERSION, the profile, the
+    837 subtype the filename alone would suggest (detection can fall back
+    on it) and - for the nested layout only, so flat keys stay as they
+    were - the layout
+    """
+    parts = ("detailed", PARSER_VERSION, profile, determine_837_subtype("", os.path.basename(filepath)))
+    if layout != LAYOUT_FLAT:
+        parts += (layout,)
+    return parts
+
+
+def translate_x12_cached(filepath, cache, profile=PROFILE_FULL, layout=LAYOUT_FLAT):
+    """
+    translate_x12_complete_structured through an x12_cache.ResultCache
+    Keyed on the file's content hash and detailed_cache_parts, so a resent
+    file under another name still hits
+    Returns (data, hit)
+    """
+    data, hit = cache.fetch(
+        filepath,
+        lambda: translate_x12_complete_structured(filepath, profile=profile, layout=layout),
+        *detailed_cache_parts(filepath, profile, layout)
+    )
+    data["file_info"]["source_file"] = filepath
+    return data, hit
+
+
+def translate_x12_indexed(filepath, output_file, cache=None, profile=PROFILE_FULL, analytics=None):
+    """
+    Translate and write output_file, collecting claim index rows on the way
+    The document is written by JSONClaimWriter (same keys, claims first) so
+    every claim's byte range is known; with a cache the claims' index keys
+    are cached next to the data, so cache hits can be indexed too
+    analytics (an x12_analytics.ClaimAnalytics) needs every claim parsed, so
+    it bypasses the cache; its summary goes into summary["analytics"]
+    Returns (data, index rows, hit) - hand the rows to
+    ClaimIndex.replace_file(output_file, rows, filepath)
+    """
+    claim_rows = ClaimRows()
+    
+    def compute():
+        data = translate_x12_complete_structured(filepath, profile=profile,
+                                                 claim_hook=combine_claim_hooks(claim_rows, analytics))
+        add_analytics(data, analytics)
+        return {"data": data, "claim_keys": claim_rows.keys}
+    
+    if cache is not None and analytics is None:
+        filename_hint = determine_837_subtype("", os.path.basename(filepath))
+        entry, hit = cache.fetch(filepath, compute, "detailed+claim-keys", PARSER_VERSION,
+                                 profile, filename_hint)
+        entry["data"]["file_info"]["source_file"] = filepath
+        claim_rows = ClaimRows(entry["claim_keys"])
+    else:
+        entry, hit = compute(), False
+    
+    data = entry["data"]
+    envelope = {key: value for key, value in data.items() if key != "claims"}
+    with JSONClaimWriter(output_file, inline_claims=profile != PROFILE_RAW_ONLY,
+                         on_claim=claim_rows.written) as writer:
+        for claim in data.get("claims", []):
+            writer("claims", claim)
+        writer.finish(envelope)
+    
+    return data, claim_rows.rows, hit
+
+
 def validate_output(data):
     """Validate the structured output"""
     try:
         if not isinstance(data, dict):
             return False, "Output must be a dictionary"
         
-        if "all_segments" not in data or len(data["all_segments"]) == 0:
+        if "all_segments" in data:
+            segment_count = len(data["all_segments"])
+        else:
+            # Streaming output keeps no segment list, only the count
+            segment_count = data.get("summary", {}).get("total_segments", 0)
+        
+        if segment_count == 0:
             return False, "No segments found"
         
         if "summary" not in data:
@@ -495,28 +1065,113 @@ def validate_output(data):
         return False, f"Validation error: {str(e)}"
 
 
-def save_with_validation(data, output_file):
-    """Save with validation"""
-    with open(output_file, 'w') as f:
-        json.dump(data, f, indent=2)
-    
+def print_summary(data, output_file):
+    """Print the translation summary block"""
     print(f"✅ Translation complete!")
     print(f"💾 Output: {output_file}")
     print(f"📊 File Type: {data['file_info']['file_type']}")
     print(f"📊 Summary:")
+    if "total_transaction_sets" in data['summary']:
+        print(f"   - Transaction sets: {data['summary']['total_transaction_sets']}")
     print(f"   - Total segments: {data['summary']['total_segments']}")
     print(f"   - Total claims: {data['summary']['total_claims']}")
     print(f"   - Total service lines: {data['summary']['total_service_lines']}")
+
+
+def translate_x12_streaming(filepath, output_file, jsonl=False, profile=PROFILE_FULL, timings=None,
+                            index=None, analytics=None, layout=LAYOUT_FLAT):
+    """
+    Translate X12 straight to disk one claim at a time
+    Writes a single JSON document, or JSON Lines records when jsonl=True
+    Returns the envelope and summary (no claims or all_segments in memory)
+    With timings, claims are serialized as they close, so their write time
+    counts towards the build phase; only the envelope is "serialize"
+    index (an x12_claim_index.ClaimIndex) records each claim's byte range
+    as it is written
+    analytics (an x12_analytics.ClaimAnalytics) gathers every claim; its
+    summary is written with the envelope (summary["analytics"])
+    layout="nested" writes one transaction set at a time instead (as the
+    "transaction_set" records of JSON Lines); it cannot be indexed
+    """
+    if layout == LAYOUT_NESTED and index is not None:
+        raise ValueError("The claim index needs the flat layout")
+    
+    claim_rows = None
+    if index is not None:
+        file_id = index.begin_file(output_file, filepath)
+        claim_rows = ClaimRows(flush=partial(index.add_rows, file_id))
+    on_claim = claim_rows.written if claim_rows is not None else None
+    
+    if jsonl:
+        writer = JSONLinesClaimWriter(output_file, on_claim=on_claim)
+    elif layout == LAYOUT_NESTED:
+        writer = NestedJSONWriter(output_file)
+    else:
+        writer = JSONClaimWriter(output_file, inline_claims=profile != PROFILE_RAW_ONLY,
+                                 on_claim=on_claim)
+    
+    with writer:
+        data = translate_x12_complete_structured(filepath, sink=writer, profile=profile,
+                                                 timings=timings,
+                                                 claim_hook=combine_claim_hooks(claim_rows, analytics),
+                                                 layout=layout)
+        add_analytics(data, analytics)
+        if timings is None:
+            writer.finish(data)
+        else:
+            with timings.phase("serialize"):
+                writer.finish(data)
+    
+    if claim_rows is not None:
+        index.add_rows(file_id, claim_rows.rows)
+    
+    return data
+
+
+def translate_x12_columnar(filepath, output_base, output_format="parquet",
+                           batch_size=DEFAULT_BATCH_SIZE, analytics=None):
+    """
+    Translate X12 into flat claim and service-line tables (Parquet or Arrow IPC)
+    Writes <output_base>_claims.<ext> and <output_base>_service_lines.<ext>
+    one record batch per batch_size claims; nothing but the envelope and
+    the current batch is held in memory
+    analytics (an x12_analytics.ClaimAnalytics) gathers the same claims
+    Returns (envelope and summary, (claims path, service lines path))
+    """
+    with ColumnarClaimWriter(output_base, output_format, batch_size, source_file=filepath) as writer:
+        data = translate_x12_complete_structured(filepath, sink=lambda key, item: None,
+                                                 profile=PROFILE_TYPED_ONLY,
+                                                 claim_hook=combine_claim_hooks(writer, analytics))
+    add_analytics(data, analytics)
+    return data, writer.paths
+
+
+def save_with_validation(data, output_file, paranoid=False, pretty=False, timings=None):
+    """
+    Save with validation
+    Writes compact JSON unless pretty=True
+    The structure is validated in memory; the written file is only read back
+    and re-parsed when paranoid=True
+    timings (an x12_timings.ParseTimings) gets the write as its serialize phase
+    """
+    if timings is None:
+        write_json(data, output_file, pretty=pretty)
+    else:
+        with timings.phase("serialize"):
+            write_json(data, output_file, pretty=pretty)
+    
+    print_summary(data, output_file)
     
     print(f"\n🔍 Validating JSON output...")
     
-    try:
-        with open(output_file, 'r') as f:
-            json.load(f)
-        print(f"   ✅ JSON syntax valid")
-    except json.JSONDecodeError as e:
-        print(f"   ❌ JSON syntax error: {e}")
-        return False
+    if paranoid:
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                json.load(f)
+            print(f"   ✅ JSON syntax valid (re-read from disk)")
+        except json.JSONDecodeError as e:
+            print(f"   ❌ JSON syntax error: {e}")
+            return False
     
     is_valid, msg = validate_output(data)
     if is_valid:
@@ -529,8 +1184,86 @@ def save_with_validation(data, output_file):
     return True
 
 
+def pop_option(args, name, default=None):
+    """
+    Remove "<name> <value>" from an argument list and return the value
+    Raises ValueError when the option is given without a value
+    """
+    if name not in args:
+        return default
+    
+    i = args.index(name)
+    if i + 1 >= len(args):
+        raise ValueError(f"{name} needs a value")
+    
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
 def main():
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    
+    try:
+        workers = int(pop_option(args, '--workers', 1))
+        profile = pop_option(args, '--profile', PROFILE_FULL)
+        index_path = pop_option(args, '--index')
+        output_format = pop_option(args, '--format', 'json')
+        batch_size = int(pop_option(args, '--batch-size', DEFAULT_BATCH_SIZE))
+        layout = pop_option(args, '--layout', LAYOUT_FLAT)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
+    if profile not in OUTPUT_PROFILES:
+        print(f"❌ Error: unknown profile '{profile}' (choose from {', '.join(OUTPUT_PROFILES)})")
+        sys.exit(1)
+    
+    if layout not in OUTPUT_LAYOUTS:
+        print(f"❌ Error: unknown layout '{layout}' (choose from {', '.join(OUTPUT_LAYOUTS)})")
+        sys.exit(1)
+    
+    if layout == LAYOUT_NESTED:
+        if profile == PROFILE_RAW_ONLY:
+            print("❌ Error: --layout nested needs typed sections (use --profile full or typed-only)")
+            sys.exit(1)
+        if output_format != 'json' or index_path is not None or workers > 1:
+            print("❌ Error: --layout nested is JSON only and cannot be combined with --index or --workers")
+            sys.exit(1)
+    
+    if output_format not in OUTPUT_FORMATS:
+        print(f"❌ Error: unknown format '{output_format}' (choose from {', '.join(OUTPUT_FORMATS)})")
+        sys.exit(1)
+    
+    if output_format != 'json' and index_path is not None:
+        print("❌ Error: --index needs JSON output (it records byte offsets into the JSON)")
+        sys.exit(1)
+    
+    if output_format != 'json':
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+    
+    flags = [arg for arg in args if arg.startswith('--')]
+    args = [arg for arg in args if not arg.startswith('--')]
+    jsonl = '--jsonl' in flags
+    paranoid = '--paranoid' in flags
+    pretty = '--pretty' in flags
+    records = '--records' in flags
+    stream = jsonl or '--stream' in flags
+    timings = ParseTimings() if '--timings' in flags else None
+    analytics = ClaimAnalytics() if '--analytics' in flags else None
+    
+    if analytics is not None:
+        try:
+            require_numpy()
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+    
+    if not args:
         print("=" * 70)
         print("X12 Complete Structured Parser (Dynamic File Type Detection)")
         print("=" * 70)
@@ -541,33 +1274,138 @@ def main():
         print("  ✅ Supports: 837P, 837I, 837D, 835, 270, 271, 276, 277, etc.")
         print("  ✅ Automatic validation")
         print("\nUsage:")
-        print("  python3 x12_claims_parser.py <input_file> [output_file]")
+        print("  python3 x12_claims_parser.py <input_file> [output_file] [options]")
+        print("\nOptions:")
+        print("  --stream      Write claims as they are parsed (constant memory)")
+        print("  --jsonl       Stream as JSON Lines records instead of one document")
+        print("  --workers N   Parse the file's ST/SE transaction sets in N processes")
+        print("  --paranoid    Re-read the written JSON to double-check its syntax")
+        print("  --pretty      Indented JSON (default output is compact)")
+        print("  --profile P   full (default), typed-only (no all_elements/all_segments)")
+        print("                or raw-only (all_segments only)")
+        print("  --records     Hold the parse in compact records instead of dicts")
+        print("  --timings     Time each segment type and the read/tokenize/build/serialize")
+        print("                phases (printed, and kept in summary.timings)")
+        print("  --index DB    Record each claim's location in the SQLite claim index DB")
+        print("                (look claims up with x12_claim_index.py)")
+        print("  --format F    json (default), or parquet / arrow: flat claim and")
+        print("                service-line tables (needs pyarrow)")
+        print("  --batch-size N  Claims per Parquet/Arrow record batch (default 10000)")
+        print("  --layout L    flat (default) or nested: interchanges -> functional groups")
+        print("                -> transaction sets, each with its own headers and claims")
+        print("                (with --stream, written one transaction set at a time)")
+        print("  --analytics   Charge totals per payer/provider, CLM02 vs service-line")
+        print("                reconciliation, percentiles (needs numpy; kept in")
+        print("                summary.analytics)")
         print("\nExamples:")
         print("  python3 x12_claims_parser.py input_files/837p.txt")
         print("  python3 x12_claims_parser.py input_files/837d.txt")
         print("  python3 x12_claims_parser.py input_files/835.txt")
+        print("  python3 x12_claims_parser.py big_batch.837 --stream")
+        print("  python3 x12_claims_parser.py big_batch.837 --workers 8")
+        print("  python3 x12_claims_parser.py big_batch.837 --profile typed-only")
+        print("  python3 x12_claims_parser.py big_batch.837 --format parquet")
+        print("  python3 x12_claims_parser.py payer_batch.837 --layout nested --stream")
         print("=" * 70)
         sys.exit(1)
     
-    input_file = sys.argv[1]
+    input_file = args[0]
     
     if not os.path.exists(input_file):
         print(f"❌ Error: Input file '{input_file}' not found!")
         sys.exit(1)
     
-    if len(sys.argv) >= 3:
-        output_file = sys.argv[2]
+    if output_format != 'json':
+        # Two tables: <base>_claims.<ext> and <base>_service_lines.<ext>
+        if len(args) >= 2:
+            output_base = os.path.splitext(args[1])[0]
+        else:
+            os.makedirs("output_files", exist_ok=True)
+            output_base = f"output_files/{os.path.splitext(os.path.basename(input_file))[0]}"
+        
+        print(f"\n🔄 Translating X12 file to {output_format} tables...\n")
+        print(f"📄 Input:  {input_file}")
+        try:
+            data, paths = translate_x12_columnar(input_file, output_base, output_format, batch_size,
+                                                 analytics=analytics)
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            sys.exit(1)
+        print_summary(data, paths[0])
+        print(f"💾 Service lines: {paths[1]}")
+        if analytics is not None:
+            print_report(data["summary"]["analytics"])
+        is_valid, msg = validate_output(data)
+        if not is_valid:
+            print(f"   ❌ Structure validation failed: {msg}")
+            sys.exit(1)
+        return
+    
+    if len(args) >= 2:
+        output_file = args[1]
     else:
         os.makedirs("output_files", exist_ok=True)
         base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = f"output_files/{base_name}_parsed.json"
+        extension = "jsonl" if jsonl else "json"
+        output_file = f"output_files/{base_name}_parsed.{extension}"
     
     print(f"\n🔄 Translating X12 file to structured JSON...\n")
     print(f"📄 Input:  {input_file}")
     
+    index = ClaimIndex(index_path) if index_path is not None else None
+    
     try:
-        data = translate_x12_complete_structured(input_file)
-        success = save_with_validation(data, output_file)
+        if stream:
+            data = translate_x12_streaming(input_file, output_file, jsonl=jsonl, profile=profile,
+                                           timings=timings, index=index, analytics=analytics,
+                                           layout=layout)
+            print_summary(data, output_file)
+            if timings is not None:
+                timings.print_report()
+            if analytics is not None:
+                print_report(data["summary"]["analytics"])
+            if index is not None:
+                print(f"🗂️  Indexed {data['summary']['total_claims']} claim(s) in {index_path}")
+            is_valid, msg = validate_output(data)
+            if not is_valid:
+                print(f"   ❌ Structure validation failed: {msg}")
+                sys.exit(1)
+            return
+        
+        if index is not None:
+            # Claims need the claim hook and a writer that reports offsets
+            data, rows, _ = translate_x12_indexed(input_file, output_file, profile=profile,
+                                                  analytics=analytics)
+            index.replace_file(output_file, rows, input_file)
+            print_summary(data, output_file)
+            if analytics is not None:
+                print_report(data["summary"]["analytics"])
+            print(f"🗂️  Indexed {len(rows)} claim(s) in {index_path}")
+            is_valid, msg = validate_output(data)
+            if not is_valid:
+                print(f"   ❌ Structure validation failed: {msg}")
+                sys.exit(1)
+            return
+        
+        if workers > 1:
+            if timings is not None:
+                print("⚠️  --timings is not available with --workers; ignoring it")
+                timings = None
+            if analytics is not None:
+                print("⚠️  --analytics is not available with --workers; ignoring it")
+                analytics = None
+            data = translate_x12_parallel(input_file, workers, profile=profile, records=records)
+        else:
+            data = translate_x12_complete_structured(input_file, profile=profile, records=records,
+                                                     timings=timings, claim_hook=analytics,
+                                                     layout=layout)
+            add_analytics(data, analytics)
+        success = save_with_validation(data, output_file, paranoid=paranoid, pretty=pretty,
+                                       timings=timings)
+        if timings is not None:
+            timings.print_report()
+        if analytics is not None:
+            print_report(data["summary"]["analytics"])
         
         if success:
             print(f"\n💡 To view output:")
@@ -578,6 +1416,10 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    
+    finally:
+        if index is not None:
+            index.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+"""
+Columnar Export (Parquet / Arrow IPC)
+Flat claim-level and service-line-level tables instead of nested JSON: one
+row per claim and one per service line, with explicitly typed columns
+(claim IDs and NPIs as strings, charges as decimals, dates as dates)
+Rows are handed to pyarrow in record batches of batch_size claims, so memory
+stays flat however many claims a file holds
+pyarrow is optional - only this export needs it
+"""
+
+import datetime
+from decimal import Decimal, InvalidOperation
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from x12_claim_index import claim_index_keys
+
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+FILE_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+DEFAULT_BATCH_SIZE = 10000
+
+# Charges: up to 16 digits before the decimal point, cents after
+MONEY_PRECISION = 18
+MONEY_SCALE = 2
+CENTS = Decimal(1).scaleb(-MONEY_SCALE)
+
+# Column name -> pyarrow type name (resolved once pyarrow is imported)
+CLAIM_COLUMNS = (
+    ("source_file", "string"),
+    ("claim_id", "string"),
+    ("total_charge", "money"),
+    ("facility_code", "string"),
+    ("claim_frequency_code", "string"),
+    ("subscriber_id", "string"),
+    ("subscriber_last_name", "string"),
+    ("subscriber_first_name", "string"),
+    ("billing_npi", "string"),
+    ("billing_provider_name", "string"),
+    ("rendering_npi", "string"),
+    ("payer_id", "string"),
+    ("payer_name", "string"),
+    ("service_date", "date"),
+    ("diagnosis_codes", "string_list"),
+    ("service_line_count", "int32"),
+)
+
+SERVICE_LINE_COLUMNS = (
+    ("source_file", "string"),
+    ("claim_id", "string"),
+    ("line_number", "int32"),
+    ("procedure_qualifier", "string"),
+    ("procedure_code", "string"),
+    ("procedure_modifiers", "string_list"),
+    ("line_charge", "money"),
+    ("unit_basis", "string"),
+    ("unit_count", "float64"),
+    ("place_of_service", "string"),
+    ("diagnosis_pointer", "string"),
+    ("service_date", "date"),
+)
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet/Arrow output needs pyarrow (pip install pyarrow)")
+
+
+def arrow_schema(columns):
+    types = {
+        "string": pa.string(),
+        "money": pa.decimal128(MONEY_PRECISION, MONEY_SCALE),
+        "date": pa.date32(),
+        "string_list": pa.list_(pa.string()),
+        "int32": pa.int32(),
+        "float64": pa.float64(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def to_money(value):
+    """'44.66' -> Decimal('44.66'); empty or malformed -> None"""
+    if not value:
+        return None
+    try:
+        return Decimal(value.rstrip('~')).quantize(CENTS)
+    except InvalidOperation:
+        return None
+
+
+def to_date(value):
+    """'CCYYMMDD' -> datetime.date; anything else -> None"""
+    if len(value) != 8 or not value.isdigit():
+        return None
+    try:
+        return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:]))
+    except ValueError:
+        return None
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def split_procedure(procedure_info):
+    """'HC:H0047:HG' -> ('HC', 'H0047', ['HG'])"""
+    parts = [part.strip() for part in procedure_info.split(':')] if procedure_info else []
+    if len(parts) < 2:
+        return "", procedure_info.strip() if procedure_info else "", []
+    return parts[0], parts[1], [part for part in parts[2:] if part]
+
+
+def line_service_date(service_line, claim_date):
+    for date in service_line.get("dates", ()):
+        if date["date_qualifier"] == '472':
+            return to_date(date["date_value"].split('-', 1)[0])
+    return claim_date
+
+
+def output_paths(output_base, output_format):
+    """(<base>_claims.<ext>, <base>_service_lines.<ext>)"""
+    extension = FILE_EXTENSIONS[output_format]
+    return f"{output_base}_claims{extension}", f"{output_base}_service_lines{extension}"
+
+
+class ColumnarClaimWriter:
+    """
+    claim_hook for translate_x12_complete_structured that appends every
+    finished claim (and its service lines) to column buffers and writes
+    them as one record batch per batch_size claims
+    """
+
+    def __init__(self, output_base, output_format="parquet", batch_size=DEFAULT_BATCH_SIZE,
+                 source_file=""):
+        require_pyarrow()
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format '{output_format}' (choose from {', '.join(COLUMNAR_FORMATS)})")
+
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.source_file = source_file
+        self.paths = output_paths(output_base, output_format)
+        self.claim_count = 0
+        self.service_line_count = 0
+
+        self._claim_schema = arrow_schema(CLAIM_COLUMNS)
+        self._line_schema = arrow_schema(SERVICE_LINE_COLUMNS)
+        self._claims = {name: [] for name, _ in CLAIM_COLUMNS}
+        self._lines = {name: [] for name, _ in SERVICE_LINE_COLUMNS}
+        self._pending = 0
+
+        self._sinks = []
+        self._claim_writer = self._open(self.paths[0], self._claim_schema)
+        self._line_writer = self._open(self.paths[1], self._line_schema)
+
+    def _open(self, path, schema):
+        if self.output_format == "parquet":
+            return pq.ParquetWriter(path, schema)
+        sink = pa.OSFile(path, 'wb')
+        self._sinks.append(sink)
+        return pa.ipc.new_file(sink, schema)
+
+    def __call__(self, claim, envelope):
+        claim_id, subscriber_id, billing_npi, rendering_npi, payer_id, date = claim_index_keys(claim, envelope)
+        claim_date = to_date(date)
+        subscriber = envelope.get("subscriber", {})
+        facility = claim.get("claim_filing_indicator", "").split(':')
+        service_lines = claim.get("service_lines", ())
+
+        columns = self._claims
+        columns["source_file"].append(self.source_file)
+        columns["claim_id"].append(claim_id)
+        columns["total_charge"].append(to_money(claim.get("total_charge", "")))
+        columns["facility_code"].append(facility[0])
+        columns["claim_frequency_code"].append(facility[2] if len(facility) > 2 else "")
+        columns["subscriber_id"].append(subscriber_id)
+        columns["subscriber_last_name"].append(subscriber.get("name_last_or_organization", ""))
+        columns["subscriber_first_name"].append(subscriber.get("name_first", ""))
+        columns["billing_npi"].append(billing_npi)
+        columns["billing_provider_name"].append(
+            envelope.get("billing_provider", {}).get("name_last_or_organization", ""))
+        columns["rendering_npi"].append(rendering_npi)
+        columns["payer_id"].append(payer_id)
+        columns["payer_name"].append(claim.get("payer", {}).get("name_last_or_organization", ""))
+        columns["service_date"].append(claim_date)
+        columns["diagnosis_codes"].append(list(claim.get("diagnosis_codes", {}).get("codes", ())))
+        columns["service_line_count"].append(len(service_lines))
+
+        lines = self._lines
+        for service_line in service_lines:
+            service_info = service_line.get("service_info", {})
+            qualifier, code, modifiers = split_procedure(service_info.get("procedure_info", ""))
+            lines["source_file"].append(self.source_file)
+            lines["claim_id"].append(claim_id)
+            lines["line_number"].append(to_int(service_line.get("line_number")))
+            lines["procedure_qualifier"].append(qualifier)
+            lines["procedure_code"].append(code)
+            lines["procedure_modifiers"].append(modifiers)
+            lines["line_charge"].append(to_money(service_info.get("line_charge", "")))
+            lines["unit_basis"].append(service_info.get("unit_basis", ""))
+            lines["unit_count"].append(to_float(service_info.get("unit_count")))
+            lines["place_of_service"].append(service_info.get("place_of_service", ""))
+            lines["diagnosis_pointer"].append(service_info.get("diagnosis_pointer", ""))
+            lines["service_date"].append(line_service_date(service_line, claim_date))
+
+        self.claim_count += 1
+        self.service_line_count += len(service_lines)
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as one record batch per table"""
+        if not self._pending:
+            return
+        self._claim_writer.write_batch(pa.RecordBatch.from_pydict(self._claims, schema=self._claim_schema))
+        if self._lines["claim_id"]:
+            self._line_writer.write_batch(pa.RecordBatch.from_pydict(self._lines, schema=self._line_schema))
+        for column in self._claims.values():
+            column.clear()
+        for column in self._lines.values():
+            column.clear()
+        self._pending = 0
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._claim_writer.close()
+            self._line_writer.close()
+            for sink in self._sinks:
+                sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,52 @@
+"""
+JSON Serializer Layer
+Shared by every writer in the project: compact separators by default,
+orjson when it is installed (stdlib json otherwise), pretty=True for the
+old indent=2 layout
+Compact records (x12_records) are turned into dicts here, as they are written
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+COMPACT_SEPARATORS = (',', ':')
+
+
+def to_json(obj):
+    """default= hook: records serialize through their to_dict()"""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def dumps(data, pretty=False):
+    """Serialize to a str"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(data, default=to_json, option=option).decode('utf-8')
+
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False, default=to_json)
+    return json.dumps(data, separators=COMPACT_SEPARATORS, ensure_ascii=False, default=to_json)
+
+
+def write_json(data, output_file, pretty=False):
+    """Serialize straight to a file (UTF-8)"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(data, default=to_json, option=option))
+        return
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        if pretty:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=to_json)
+        else:
+            json.dump(data, f, separators=COMPACT_SEPARATORS, ensure_ascii=False, default=to_json)
+
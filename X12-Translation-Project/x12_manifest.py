@@ -0,0 +1,88 @@
+"""
+Incremental Batch Manifest
+Remembers, for every input file, the mtime, size, content hash, parser
+version and output options its current output was written with - a batch
+run then only translates new or changed files
+"""
+
+import json
+import os
+import tempfile
+
+from x12_cache import file_digest
+
+
+MANIFEST_NAME = ".x12_manifest.json"
+MANIFEST_FORMAT = 1
+
+
+def load_manifest(manifest_path):
+    """Manifest entries by input filename ({} when missing or unreadable)"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(manifest_path, entries):
+    """Write the manifest atomically (temp file + rename)"""
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"format": MANIFEST_FORMAT, "files": entries}, f,
+                      separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def check_input(entry, input_file, output_files, parser_version, options):
+    """
+    Are output_files (every output of input_file) all still current?
+    Same mtime and size as the manifest entry -> current without reading
+    the file; same size but new mtime (touched, copied back) -> current when
+    the content hash still matches
+    Returns (is_current, entry) - the entry to record once output_files
+    hold a translation of the file as it is now; a new entry's "sha256" is
+    None unless it was hashed here, so the worker translating the file can
+    hash it (see record_digest)
+    """
+    stat = os.stat(input_file)
+    digest = None
+
+    if (entry and entry.get("parser_version") == parser_version
+            and entry.get("options") == options
+            and all(os.path.exists(path) for path in output_files)):
+        if entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            return True, entry
+
+        if entry.get("size") == stat.st_size:
+            digest = file_digest(input_file)
+            if digest == entry.get("sha256"):
+                return True, dict(entry, mtime_ns=stat.st_mtime_ns)
+
+    return False, {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "parser_version": parser_version,
+        "options": options,
+        "output": os.path.basename(output_files[0])
+    }
+
+
+def record_digest(entry, digest):
+    """entry from check_input with the content hash filled in once the file is translated"""
+    if entry["sha256"] is None:
+        entry = dict(entry, sha256=digest)
+    return entry
@@ -0,0 +1,201 @@
+"""
+Batch Translation Metrics
+Prometheus text-format metrics for batch_translate: files processed, segment /
+claim / service line throughput, per-file latency histogram, failures by
+exception class, bytes in and out
+Written as a textfile-collector .prom file at the end of a run, and/or served
+live on a localhost HTTP endpoint while the batch is running
+No prometheus_client needed - the exposition format is written by hand
+"""
+
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+METRIC_PREFIX = "x12_batch"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Per-file latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for name, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class BatchMetrics:
+    """
+    Metrics for one batch run
+    batch_translate calls observe(record) for every translated file,
+    observe_skipped(n) for unchanged files and finish(seconds) at the end;
+    render() returns the Prometheus text exposition at any point
+    """
+
+    def __init__(self, labels=None):
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.files = {"success": 0, "failed": 0, "skipped": 0}
+        self.cache_hits = 0
+        self.segments = 0
+        self.claims = 0
+        self.service_lines = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.failures = {}
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.duration = None
+        self.workers = 1
+
+    def observe(self, record):
+        """Count one batch result record (see batch_translator.translate_one_file)"""
+        with self._lock:
+            seconds = record.get('seconds')
+            if seconds is not None:
+                self.latency_count += 1
+                self.latency_sum += seconds
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if seconds <= bound:
+                        self.bucket_counts[i] += 1
+
+            self.bytes_in += record.get('bytes_in', 0)
+
+            if record['status'] == 'SUCCESS':
+                self.files["success"] += 1
+                self.cache_hits += 1 if record.get('cached') else 0
+                self.segments += record.get('segments', 0)
+                self.claims += record.get('claims', 0)
+                self.service_lines += record.get('service_lines', 0)
+                self.bytes_out += record.get('bytes_out', 0)
+            else:
+                self.files["failed"] += 1
+                error_type = record.get('error_type', 'Exception')
+                self.failures[error_type] = self.failures.get(error_type, 0) + 1
+
+    def observe_skipped(self, count):
+        with self._lock:
+            self.files["skipped"] += count
+
+    def finish(self, seconds):
+        with self._lock:
+            self.duration = seconds
+
+    def elapsed(self):
+        return self.duration if self.duration is not None else time.time() - self.started
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            lines = []
+            base = self.labels
+            elapsed = self.elapsed()
+
+            def metric(name, kind, help_text, samples):
+                full_name = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for suffix, labels, value in samples:
+                    lines.append(f"{full_name}{suffix}{format_labels(dict(base, **labels))} "
+                                 f"{format_value(value)}")
+
+            metric("files_total", "counter", "Input files by outcome",
+                   [("", {"status": status}, count) for status, count in self.files.items()])
+            metric("cache_hits_total", "counter", "Files answered from the result cache",
+                   [("", {}, self.cache_hits)])
+            metric("failures_total", "counter", "Failed files by exception class",
+                   [("", {"exception": name}, count) for name, count in sorted(self.failures.items())])
+            metric("segments_total", "counter", "Segments translated", [("", {}, self.segments)])
+            metric("claims_total", "counter", "Claims translated", [("", {}, self.claims)])
+            metric("service_lines_total", "counter", "Service lines translated",
+                   [("", {}, self.service_lines)])
+            metric("input_bytes_total", "counter", "Bytes of X12 input read", [("", {}, self.bytes_in)])
+            metric("output_bytes_total", "counter", "Bytes of JSON output written",
+                   [("", {}, self.bytes_out)])
+
+            rate = (lambda count: count / elapsed) if elapsed > 0 else (lambda count: 0.0)
+            metric("segments_per_second", "gauge", "Segments translated per second of batch wall time",
+                   [("", {}, round(rate(self.segments), 3))])
+            metric("claims_per_second", "gauge", "Claims translated per second of batch wall time",
+                   [("", {}, round(rate(self.claims), 3))])
+            metric("service_lines_per_second", "gauge",
+                   "Service lines translated per second of batch wall time",
+                   [("", {}, round(rate(self.service_lines), 3))])
+
+            buckets = [("_bucket", {"le": format_value(bound)}, count)
+                       for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts)]
+            buckets.append(("_bucket", {"le": "+Inf"}, self.latency_count))
+            buckets.append(("_sum", {}, round(self.latency_sum, 6)))
+            buckets.append(("_count", {}, self.latency_count))
+            metric("file_duration_seconds", "histogram", "Per-file translate + write latency", buckets)
+
+            metric("duration_seconds", "gauge", "Wall time of the batch run so far",
+                   [("", {}, round(elapsed, 3))])
+            metric("workers", "gauge", "Worker processes used", [("", {}, self.workers)])
+            metric("last_run_timestamp_seconds", "gauge", "Unix time the batch run started",
+                   [("", {}, round(self.started, 3))])
+
+            return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Write the metrics for the node_exporter textfile collector
+        The file is written next to its destination and renamed into place so
+        the collector never scrapes a half-written file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.prom.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """
+    Serve metrics.render() at http://<host>:<port>/metrics from a daemon thread
+    Returns the server; call server.shutdown() to stop it
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass   # keep scrapes out of the batch output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="x12-metrics", daemon=True)
+    thread.start()
+    return server
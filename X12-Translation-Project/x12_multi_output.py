@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Multi-Output Translation
+Tokenizes each file once and feeds every segment to several output builders
+at the same time: the detailed structure (x12_claims_parser), the viewer
+sections (parser_for_viewer) and - as claim hooks on the detailed builder -
+Parquet/Arrow tables and analytics
+Producing *_parsed.json and *_claim.json this way reads and tokenizes a
+file once instead of once per output
+"""
+
+import os
+import sys
+
+from x12core import iter_segments
+from x12_claims_parser import (
+    DetailedBuilder, combine_claim_hooks, add_analytics, validate_output,
+    print_summary, pop_option, detailed_cache_parts, PROFILE_FULL, PROFILE_TYPED_ONLY, PROFILE_RAW_ONLY,
+    OUTPUT_PROFILES, LAYOUT_FLAT, LAYOUT_NESTED, OUTPUT_LAYOUTS
+)
+from x12_viewer import ViewerBuilder, PARSER_VERSION as VIEWER_PARSER_VERSION
+from x12_json import write_json
+from x12_cache import file_digest
+from x12_columnar import COLUMNAR_FORMATS, DEFAULT_BATCH_SIZE, ColumnarClaimWriter, require_pyarrow
+from x12_analytics import ClaimAnalytics, print_report, require_numpy
+
+
+def discard(key, item):
+    """Sink for a detailed builder that only runs for its claim hooks"""
+
+
+def translate_x12_multi(filepath, detailed=True, viewer=True, profile=PROFILE_FULL, records=False,
+                        claim_hook=None, timings=None, layout=LAYOUT_FLAT):
+    """
+    Detailed and viewer output of one file from a single tokenizer pass
+    Both match what translate_x12_complete_structured and
+    parse_x12_for_viewer return for the same file
+    claim_hook(claim, envelope) sees every claim the detailed builder
+    finishes (x12_columnar / x12_analytics); with detailed=False the builder
+    still runs for it, typed-only, and returns just envelope and summary
+    layout applies to the detailed result (see translate_x12_complete_structured)
+    Returns (detailed result, viewer sections); None for either not built
+    """
+    if claim_hook is not None and profile == PROFILE_RAW_ONLY:
+        raise ValueError("Tables and analytics need typed claims, which the raw-only profile does not build")
+
+    detailed_builder = None
+    if detailed:
+        detailed_builder = DetailedBuilder(filepath, profile=profile, records=records,
+                                           claim_hook=claim_hook, layout=layout)
+    elif claim_hook is not None:
+        detailed_builder = DetailedBuilder(filepath, sink=discard, profile=PROFILE_TYPED_ONLY,
+                                           claim_hook=claim_hook)
+    viewer_builder = ViewerBuilder(records) if viewer else None
+
+    feeds = [builder.feed for builder in (detailed_builder, viewer_builder) if builder is not None]
+    if not feeds:
+        raise ValueError("Nothing to build: ask for detailed or viewer output")
+
+    try:
+        with open(filepath, 'rb') as f:
+            if timings is None:
+                segments = iter_segments(f)
+            else:
+                segments = timings.segments(iter_segments(timings.stream(f)))
+
+            if len(feeds) == 2:
+                feed_detailed, feed_viewer = feeds
+                for seg_id, elements in segments:
+                    feed_detailed(seg_id, elements)
+                    feed_viewer(seg_id, elements)
+            else:
+                feed = feeds[0]
+                for seg_id, elements in segments:
+                    feed(seg_id, elements)
+
+            detailed_data = detailed_builder.finish() if detailed_builder is not None else None
+            viewer_data = viewer_builder.finish() if viewer_builder is not None else None
+
+            if timings is not None and detailed_data is not None:
+                detailed_data["summary"]["timings"] = timings.to_dict()
+
+            return detailed_data, viewer_data
+
+    except Exception as e:
+        raise RuntimeError(f"Error translating X12 file: {str(e)}")
+
+
+def translate_x12_multi_cached(filepath, cache, profile=PROFILE_FULL, layout=LAYOUT_FLAT):
+    """
+    translate_x12_multi (detailed + viewer) through an x12_cache.ResultCache
+    Uses the same keys as translate_x12_cached and parse_x12_for_viewer_cached,
+    so files either single-output run has seen are hits here and vice versa
+    The file is parsed - once, for both - unless both entries are cached
+    Returns (detailed, viewer, hit)
+    """
+    digest = file_digest(filepath)
+    detailed_key = cache.make_key(digest, *detailed_cache_parts(filepath, profile, layout))
+    viewer_key = cache.make_key(digest, "viewer", VIEWER_PARSER_VERSION)
+
+    detailed = cache.get(detailed_key)
+    viewer = cache.get(viewer_key)
+    hit = detailed is not None and viewer is not None
+
+    if hit:
+        detailed["file_info"]["source_file"] = filepath
+    else:
+        detailed, viewer = translate_x12_multi(filepath, profile=profile, layout=layout)
+        cache.put(detailed_key, detailed)
+        cache.put(viewer_key, viewer)
+
+    return detailed, viewer, hit
+
+
+def translate_x12_outputs(filepath, detailed_file=None, viewer_file=None, tables_base=None,
+                          tables_format="parquet", batch_size=DEFAULT_BATCH_SIZE, profile=PROFILE_FULL,
+                          pretty=False, analytics=None, cache=None, layout=LAYOUT_FLAT):
+    """
+    Write every requested output of one file from a single tokenizer pass
+      detailed_file - detailed JSON (x12_claims_parser layout)
+      viewer_file   - viewer section JSON (parser_for_viewer layout)
+      tables_base   - <tables_base>_claims.<ext> and _service_lines.<ext>
+                      tables in tables_format (x12_columnar)
+    analytics (an x12_analytics.ClaimAnalytics) gathers the same claims;
+    its summary goes into summary["analytics"]
+    cache (an x12_cache.ResultCache) is only used for the JSON outputs -
+    tables and analytics need every claim parsed
+    layout applies to detailed_file (see translate_x12_complete_structured)
+    Returns (detailed result - just envelope and summary without
+    detailed_file -, paths written, hit)
+    """
+    if detailed_file is None and tables_base is None:
+        raise ValueError("translate_x12_outputs needs detailed_file or tables_base")
+
+    writer = None
+    if tables_base is not None:
+        writer = ColumnarClaimWriter(tables_base, tables_format, batch_size, source_file=filepath)
+
+    hit = False
+    try:
+        if cache is not None and writer is None and analytics is None and viewer_file is not None:
+            data, viewer_data, hit = translate_x12_multi_cached(filepath, cache, profile=profile,
+                                                                layout=layout)
+        else:
+            data, viewer_data = translate_x12_multi(
+                filepath, detailed=detailed_file is not None, viewer=viewer_file is not None,
+                profile=profile, claim_hook=combine_claim_hooks(writer, analytics), layout=layout
+            )
+    finally:
+        if writer is not None:
+            writer.close()
+
+    paths = []
+    add_analytics(data, analytics)
+
+    if detailed_file is not None:
+        write_json(data, detailed_file, pretty=pretty)
+        paths.append(detailed_file)
+    if viewer_file is not None:
+        write_json(viewer_data, viewer_file, pretty=pretty)
+        paths.append(viewer_file)
+    if writer is not None:
+        paths.extend(writer.paths)
+
+    return data, paths, hit
+
+
+def main():
+    args = sys.argv[1:]
+
+    try:
+        profile = pop_option(args, '--profile', PROFILE_FULL)
+        tables_format = pop_option(args, '--tables')
+        batch_size = int(pop_option(args, '--batch-size', DEFAULT_BATCH_SIZE))
+        layout = pop_option(args, '--layout', LAYOUT_FLAT)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    if profile not in OUTPUT_PROFILES:
+        print(f"❌ Error: unknown profile '{profile}' (choose from {', '.join(OUTPUT_PROFILES)})")
+        sys.exit(1)
+
+    if layout not in OUTPUT_LAYOUTS:
+        print(f"❌ Error: unknown layout '{layout}' (choose from {', '.join(OUTPUT_LAYOUTS)})")
+        sys.exit(1)
+
+    if layout == LAYOUT_NESTED and profile == PROFILE_RAW_ONLY:
+        print("❌ Error: --layout nested needs typed sections (use --profile full or typed-only)")
+        sys.exit(1)
+
+    if tables_format is not None:
+        if tables_format not in COLUMNAR_FORMATS:
+            print(f"❌ Error: unknown table format '{tables_format}' (choose from {', '.join(COLUMNAR_FORMATS)})")
+            sys.exit(1)
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+
+    flags = [arg for arg in args if arg.startswith('--')]
+    args = [arg for arg in args if not arg.startswith('--')]
+    pretty = '--pretty' in flags
+    viewer = '--no-viewer' not in flags
+    analytics = ClaimAnalytics() if '--analytics' in flags else None
+
+    if analytics is not None:
+        try:
+            require_numpy()
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            sys.exit(1)
+
+    if (tables_format is not None or analytics is not None) and profile == PROFILE_RAW_ONLY:
+        print("❌ Error: --tables and --analytics need typed claims (use --profile full or typed-only)")
+        sys.exit(1)
+
+    if not args:
+        print("=" * 70)
+        print("X12 Single-Pass Multi-Output Translator")
+        print("=" * 70)
+        print("\nTokenizes the file once and builds every output from that one pass:")
+        print("  ✅ <input>_parsed.json  - complete structured output (x12_claims_parser)")
+        print("  ✅ <input>_claim.json   - claim viewer sections (parser_for_viewer)")
+        print("  ✅ <input>_claims.<ext> + <input>_service_lines.<ext> with --tables")
+        print("\nUsage:")
+        print("  python3 x12_multi_output.py <input_file> [output_dir] [options]")
+        print("\nDefault: output_dir='output_files'")
+        print("\nOptions:")
+        print("  --tables F    Also write parquet or arrow claim / service-line tables")
+        print("                (needs pyarrow)")
+        print("  --batch-size N  Claims per Parquet/Arrow record batch (default 10000)")
+        print("  --no-viewer   Skip the viewer JSON")
+        print("  --profile P   full (default), typed-only or raw-only (detailed JSON)")
+        print("  --layout L    flat (default) or nested: interchanges -> functional groups")
+        print("                -> transaction sets (detailed JSON)")
+        print("  --pretty      Indented JSON (default output is compact)")
+        print("  --analytics   Charge totals, reconciliation and percentiles (needs numpy;")
+        print("                kept in summary.analytics)")
+        print("\nExamples:")
+        print("  python3 x12_multi_output.py input_files/837p.txt")
+        print("  python3 x12_multi_output.py big_batch.837 out --tables parquet")
+        print("=" * 70)
+        sys.exit(1)
+
+    input_file = args[0]
+    output_dir = args[1] if len(args) > 1 else "output_files"
+
+    if not os.path.exists(input_file):
+        print(f"❌ Error: Input file '{input_file}' not found!")
+        sys.exit(1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, os.path.splitext(os.path.basename(input_file))[0])
+
+    print(f"\n🔄 Translating X12 file to every output in one pass...\n")
+    print(f"📄 Input:  {input_file}")
+
+    try:
+        data, paths, _ = translate_x12_outputs(
+            input_file,
+            detailed_file=f"{base}_parsed.json",
+            viewer_file=f"{base}_claim.json" if viewer else None,
+            tables_base=base if tables_format is not None else None,
+            tables_format=tables_format or "parquet",
+            batch_size=batch_size, profile=profile, pretty=pretty, analytics=analytics,
+            layout=layout
+        )
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        sys.exit(1)
+
+    print_summary(data, paths[0])
+    for path in paths[1:]:
+        print(f"💾 Output: {path}")
+    if analytics is not None:
+        print_report(data["summary"]["analytics"])
+
+    is_valid, msg = validate_output(data)
+    if not is_valid:
+        print(f"   ❌ Structure validation failed: {msg}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+X12 Segment Schema and Compact Record Model
+SEGMENT_FIELDS is the detailed-format schema shared by the parsers.
+The record classes are an optional alternative to nested dicts: __slots__
+objects that keep a reference to the element list and build their dict
+only when serialized (x12_json calls to_dict)
+"""
+
+
+# Segment schema registry: segment ID -> field names for elements[1], [2], ...
+# None skips an element position; missing trailing elements come out as ""
+SEGMENT_FIELDS = {
+    "ISA": ("authorization_info_qualifier", "authorization_info", "security_info_qualifier",
+            "security_info", "sender_id_qualifier", "sender_id", "receiver_id_qualifier",
+            "receiver_id", "interchange_date", "interchange_time", "standards_id",
+            "version_number", "interchange_control_number", "acknowledgment_requested",
+            "usage_indicator"),
+    "GS": ("functional_id_code", "application_sender_code", "application_receiver_code",
+           "date", "time", "group_control_number", "responsible_agency_code", "version_code"),
+    "ST": ("transaction_set_id", "transaction_control_number", "implementation_convention_ref"),
+    "BHT": ("hierarchical_structure_code", "transaction_set_purpose_code", "reference_id",
+            "date", "time", "claim_type"),
+    "NM1": ("entity_id_code", "entity_type_qualifier", "name_last_or_organization",
+            "name_first", "name_middle", "name_prefix", "name_suffix",
+            "id_code_qualifier", "id_code"),
+    "N3": ("address_line_1", "address_line_2"),
+    "N4": ("city", "state", "postal_code", "country_code"),
+    "REF": ("reference_id_qualifier", "reference_id", "description"),
+    "PER": ("contact_function_code", "name", "communication_number_qualifier_1",
+            "communication_number_1", "communication_number_qualifier_2",
+            "communication_number_2"),
+    "CLM": ("claim_id", "total_charge", None, None, "claim_filing_indicator",
+            "provider_signature_indicator", "assignment_plan", "benefits_assignment",
+            "release_info"),
+    "DTP": ("date_qualifier", "date_format", "date_value"),
+    "LX": ("line_number",),
+    "SV1": ("procedure_info", "line_charge", "unit_basis", "unit_count",
+            "place_of_service", None, "diagnosis_pointer"),
+    "SV2": ("revenue_code", "procedure_info", "line_charge", "unit_basis", "unit_count"),
+    "SV3": ("procedure_info", "line_charge", "place_of_service", "oral_cavity_designation",
+            "prosthesis_crown_inlay_code", "unit_count"),
+    "HL": ("hierarchical_id", "parent_id", "level_code", "child_code"),
+    "SBR": ("payer_responsibility", "individual_relationship", "group_number",
+            "group_name", "insurance_type", None, None, None, "claim_filing_indicator"),
+    "PRV": ("provider_code", "reference_id_qualifier", "reference_id"),
+    "DMG": ("date_format", "date_of_birth", "gender"),
+    "AMT": ("amount_qualifier", "amount"),
+}
+
+
+def make_segment_builder(seg_id, fields):
+    """
+    Turn a field-name tuple into build(elements, keep_elements) -> dict
+    The (position, name) table is worked out once per segment ID, so building
+    a segment is one pass over the named positions
+    """
+    positions = tuple((i, name) for i, name in enumerate(fields, 1) if name)
+    
+    def build(elements, keep_elements):
+        n = len(elements)
+        data = {'segment_id': seg_id}
+        for i, name in positions:
+            data[name] = elements[i] if n > i else ''
+        if keep_elements:
+            data['all_elements'] = elements
+        return data
+    
+    return build
+
+
+SEGMENT_BUILDERS = {seg_id: make_segment_builder(seg_id, fields) for seg_id, fields in SEGMENT_FIELDS.items()}
+
+
+SEGMENT_POSITIONS = {
+    seg_id: {name: i for i, name in enumerate(fields, 1) if name}
+    for seg_id, fields in SEGMENT_FIELDS.items()
+}
+
+
+class Segment:
+    """
+    Typed segment record: behaves like the dict SEGMENT_BUILDERS would build
+    (record[key], key in record, get, setdefault) but only stores the element
+    list; keys added later (address, dates, service_lines, ...) go to a small
+    dict that is created on first use
+    """
+    
+    __slots__ = ("elements", "keep_elements", "extra")
+    
+    def __init__(self, elements, keep_elements=True):
+        self.elements = elements
+        self.keep_elements = keep_elements
+        self.extra = None
+    
+    @property
+    def segment_id(self):
+        return self.elements[0]
+    
+    def __getitem__(self, key):
+        extra = self.extra
+        if extra is not None and key in extra:
+            return extra[key]
+        
+        elements = self.elements
+        if key == "segment_id":
+            return elements[0]
+        if key == "all_elements" and self.keep_elements:
+            return elements
+        
+        position = SEGMENT_POSITIONS[elements[0]].get(key)
+        if position is None:
+            raise KeyError(key)
+        return elements[position] if len(elements) > position else ""
+    
+    def __setitem__(self, key, value):
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+    
+    def __contains__(self, key):
+        if self.extra is not None and key in self.extra:
+            return True
+        if key == "segment_id" or (key == "all_elements" and self.keep_elements):
+            return True
+        return key in SEGMENT_POSITIONS[self.elements[0]]
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+    
+    def to_dict(self):
+        data = SEGMENT_BUILDERS[self.elements[0]](self.elements, self.keep_elements)
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.elements!r})"
+
+
+class Entity(Segment):
+    """NM1 name/entity record"""
+    __slots__ = ()
+
+
+class Claim(Segment):
+    """CLM claim record"""
+    __slots__ = ()
+
+
+class ServiceLine(Segment):
+    """LX service line record"""
+    __slots__ = ()
+
+
+# Record class per segment ID for the detailed format; the rest use Segment
+RECORD_TYPES = {"NM1": Entity, "CLM": Claim, "LX": ServiceLine}
+
+
+class RawSegment:
+    """all_segments entry: {"segment_id": ..., "elements": [...]}"""
+    
+    __slots__ = ("elements",)
+    
+    def __init__(self, elements):
+        self.elements = elements
+    
+    def __getitem__(self, key):
+        if key == "segment_id":
+            return self.elements[0]
+        if key == "elements":
+            return self.elements
+        raise KeyError(key)
+    
+    def to_dict(self):
+        return {"segment_id": self.elements[0], "elements": self.elements}
+
+
+class SlotRecord:
+    """
+    Dict-style access over a fixed set of __slots__ keys
+    Unset slots count as missing keys; to_dict keeps the slot order
+    """
+    
+    __slots__ = ()
+    
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+    
+    def __contains__(self, key):
+        return hasattr(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+    
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__ if hasattr(self, key)}
+
+
+class ViewerClaim(SlotRecord):
+    """
+    Viewer-format claim; serializes as the "claim" section data, the other
+    keys (diagnosis, serviceLines, payer, ...) become sections of their own
+    """
+    
+    __slots__ = ("id", "totalCharge", "placeOfService", "serviceType", "indicators",
+                 "onsetDate", "clearinghouseClaimNumber",
+                 "diagnosis", "serviceLines", "payer", "renderingProvider", "serviceFacility")
+    
+    SECTION_KEYS = __slots__[:7]
+    
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.SECTION_KEYS}
+
+
+class ViewerServiceLine(SlotRecord):
+    """Viewer-format service line"""
+    
+    __slots__ = ("lineNumber", "codeQualifier", "procedureCode", "charge", "unitQualifier",
+                 "units", "diagnosisPointer", "emergencyIndicator", "serviceDate",
+                 "placeOfService")
@@ -0,0 +1,191 @@
+"""
+Incremental Writers for Streaming Translation
+Sinks for translate_x12_complete_structured(filepath, sink=...) that write
+each claim to disk as soon as it is finished, then the envelope and summary
+at the end - peak memory follows the largest claim, not the file
+Both claim writers can report where each claim landed in the output file
+(on_claim(offset, length), in bytes) for x12_claim_index; NestedJSONWriter
+writes the nested layout one transaction set at a time
+"""
+
+import shutil
+import tempfile
+
+from x12_json import dumps
+
+
+def encode(data):
+    return dumps(data).encode('utf-8')
+
+
+class JSONLinesClaimWriter:
+    """
+    JSON Lines sink: one {"record": <key>, "data": {...}} object per line
+    <key> is the detailed-output list the item belongs to ("claims",
+    "hierarchical_levels", ...); the last line is {"record": "envelope"}
+    on_claim(offset, length) gets the byte range of each claim's "data" object
+    """
+
+    def __init__(self, output_file, on_claim=None):
+        self.output_file = output_file
+        self._out = open(output_file, 'wb')
+        self._on_claim = on_claim
+
+    def __call__(self, key, item):
+        out = self._out
+        out.write(b'{"record":' + encode(key) + b',"data":')
+        payload = encode(item)
+        if key == "claims" and self._on_claim is not None:
+            self._on_claim(out.tell(), len(payload))
+        out.write(payload)
+        out.write(b'}\n')
+
+    def finish(self, envelope):
+        self._out.write(encode({"record": "envelope", "data": envelope}))
+        self._out.write(b'\n')
+
+    def close(self):
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JSONClaimWriter:
+    """
+    Single-document JSON sink with the same keys as the detailed output
+    Claims are written inline as they arrive; the other repeating lists are
+    spooled to temporary files and stitched in after the envelope
+    inline_claims=False (raw-only output) leaves the "claims" key out
+    on_claim(offset, length) gets the byte range of each claim object
+    """
+
+    def __init__(self, output_file, inline_claims=True, on_claim=None):
+        self.output_file = output_file
+        self._out = open(output_file, 'wb')
+        self._out.write(b'{\n  "claims": [' if inline_claims else b'{')
+        self._inline_claims = inline_claims
+        self._on_claim = on_claim
+        self._claims_written = 0
+        self._spools = {}
+
+    def __call__(self, key, item):
+        if key == "claims":
+            out = self._out
+            out.write(b',\n    ' if self._claims_written else b'\n    ')
+            payload = encode(item)
+            if self._on_claim is not None:
+                self._on_claim(out.tell(), len(payload))
+            out.write(payload)
+            self._claims_written += 1
+            return
+
+        spool = self._spools.get(key)
+        if spool is None:
+            spool = self._spools[key] = tempfile.TemporaryFile('w+b')
+        else:
+            spool.write(b',')
+        spool.write(b'\n    ')
+        spool.write(encode(item))
+
+    def finish(self, envelope):
+        separator = b'\n  '
+        if self._inline_claims:
+            self._out.write(b'\n  ]' if self._claims_written else b']')
+            separator = b',\n  '
+
+        for key, value in envelope.items():
+            if key in self._spools:
+                continue
+            self._out.write(separator + encode(key) + b': ' + encode(value))
+            separator = b',\n  '
+
+        for key, spool in self._spools.items():
+            self._out.write(separator + encode(key) + b': [')
+            spool.seek(0)
+            shutil.copyfileobj(spool, self._out)
+            self._out.write(b'\n  ]')
+            separator = b',\n  '
+
+        self._out.write(b'\n}\n')
+
+    def close(self):
+        for spool in self._spools.values():
+            spool.close()
+        self._spools = {}
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class NestedJSONWriter:
+    """
+    Single-document JSON sink for the nested layout (layout="nested")
+    "interchange" and "functional_group" items open a new interchange /
+    group object, each "transaction_set" is written into the open group as
+    it arrives; an object stays open until the next header or finish()
+    A transaction set or group without an enclosing header gets an empty one
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self._out = open(output_file, 'wb')
+        self._out.write(b'{\n  "interchanges": [')
+        self._depth = 0          # 0 top level, 1 in an interchange, 2 in a group
+        self._written = [0, 0, 0]  # items written in the list open at each depth
+
+    def _open_item(self, depth):
+        """Separator and indentation for the next item of the list at depth"""
+        self._out.write((b',\n' if self._written[depth] else b'\n') + b'  ' * (2 * depth + 2))
+        self._written[depth] += 1
+
+    def _close_to(self, depth):
+        while self._depth > depth:
+            self._depth -= 1
+            empty = not self._written[self._depth + 1]
+            self._out.write(b']}' if empty else b'\n' + b'  ' * (2 * self._depth + 2) + b']}')
+
+    def __call__(self, key, item):
+        out = self._out
+        if key == "interchange":
+            self._close_to(0)
+            self._open_item(0)
+            out.write(b'{"interchange_header": ' + encode(item) + b', "functional_groups": [')
+            self._depth = 1
+            self._written[1] = 0
+        elif key == "functional_group":
+            if self._depth == 0:
+                self("interchange", {})
+            self._close_to(1)
+            self._open_item(1)
+            out.write(b'{"functional_group": ' + encode(item) + b', "transaction_sets": [')
+            self._depth = 2
+            self._written[2] = 0
+        else:
+            if self._depth < 2:
+                self("functional_group", {})
+            self._open_item(2)
+            out.write(encode(item))
+
+    def finish(self, envelope):
+        self._close_to(0)
+        self._out.write(b'\n  ]' if self._written[0] else b']')
+        for key, value in envelope.items():
+            self._out.write(b',\n  ' + encode(key) + b': ' + encode(value))
+        self._out.write(b'\n}\n')
+
+    def close(self):
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
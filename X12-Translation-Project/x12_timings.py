@@ -0,0 +1,112 @@
+"""
+Opt-in Parse Timings
+Counts and cumulative nanoseconds per segment ID, plus read / tokenize /
+build / serialize phase timers, for finding out where a slow file spends
+its time
+The parsers only see a ParseTimings through the byte stream and segment
+iterator they loop over - without one the parse loops run untouched
+"""
+
+from contextlib import contextmanager
+from time import perf_counter_ns
+
+
+PHASES = ("read", "tokenize", "build", "serialize")
+
+
+class TimedStream:
+    """Binary file wrapper that adds the time spent in read() to the read phase"""
+
+    def __init__(self, stream, timings):
+        self._stream = stream
+        self._timings = timings
+
+    def read(self, size=-1):
+        start = perf_counter_ns()
+        data = self._stream.read(size)
+        self._timings.phase_ns["read"] += perf_counter_ns() - start
+        return data
+
+    def seek(self, offset, whence=0):
+        return self._stream.seek(offset, whence)
+
+
+class ParseTimings:
+    """
+    Timing collector for one parse
+    stream(f) and segments(iterable) wrap what the parse loop reads from;
+    the time the loop spends on a segment (between receiving it and asking
+    for the next one) is charged to that segment's ID and the build phase
+    """
+
+    def __init__(self):
+        self.phase_ns = dict.fromkeys(PHASES, 0)
+        self.segment_counts = {}
+        self.segment_ns = {}
+
+    def stream(self, f):
+        return TimedStream(f, self)
+
+    def segments(self, segments):
+        """Yield from a (seg_id, elements) iterator, timing tokenizer and consumer"""
+        counts = self.segment_counts
+        totals = self.segment_ns
+        phase_ns = self.phase_ns
+        iterator = iter(segments)
+        waiting_ns = 0
+
+        while True:
+            start = perf_counter_ns()
+            read_before = phase_ns["read"]
+            try:
+                segment = next(iterator)
+            except StopIteration:
+                break
+            received = perf_counter_ns()
+            # File reads happen inside next(); they are already in "read"
+            waiting_ns += received - start - (phase_ns["read"] - read_before)
+
+            yield segment
+
+            seg_id = segment[0]
+            elapsed = perf_counter_ns() - received
+            counts[seg_id] = counts.get(seg_id, 0) + 1
+            totals[seg_id] = totals.get(seg_id, 0) + elapsed
+            phase_ns["build"] += elapsed
+
+        phase_ns["tokenize"] += waiting_ns
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the with-block to phase `name`"""
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.phase_ns[name] = self.phase_ns.get(name, 0) + perf_counter_ns() - start
+
+    def to_dict(self):
+        """Phase milliseconds plus per-segment count / total / mean, slowest first"""
+        segments = {}
+        for seg_id in sorted(self.segment_ns, key=self.segment_ns.get, reverse=True):
+            count = self.segment_counts[seg_id]
+            total = self.segment_ns[seg_id]
+            segments[seg_id] = {"count": count, "total_ns": total, "mean_ns": total // count}
+
+        return {
+            "phases_ms": {name: round(ns / 1e6, 3) for name, ns in self.phase_ns.items()},
+            "segments": segments
+        }
+
+    def print_report(self, top=15):
+        """Print the phase timers and the `top` most expensive segment IDs"""
+        data = self.to_dict()
+        print(f"\n⏱️  Timings:")
+        for name, ms in data["phases_ms"].items():
+            print(f"   - {name}: {ms:.1f} ms")
+
+        if data["segments"]:
+            print(f"   {'segment':<8} {'count':>10} {'total ms':>10} {'mean ns':>9}")
+            for seg_id, info in list(data["segments"].items())[:top]:
+                print(f"   {seg_id:<8} {info['count']:>10,} {info['total_ns'] / 1e6:>10.1f} "
+                      f"{info['mean_ns']:>9,}")
@@ -0,0 +1,413 @@
+"""
+Claim Viewer Section Builder
+ViewerBuilder turns a stream of X12 segments into the section arrays the
+Claim Viewer displays; parser_for_viewer.py (and the Phoenix app's
+priv/python/parser_for_viewer.py) drive it from the tokenizer
+"""
+
+from x12core import (
+    LoopStack, CLAIM_LOOP, SERVICE_LINE_LOOP, clean_code, clean_value,
+    parse_date, parse_time, safe_float, safe_int
+)
+from x12_records import ViewerClaim, ViewerServiceLine
+
+
+# Bump whenever the viewer output changes: cached results are keyed on it
+PARSER_VERSION = "1.4"
+
+
+# Transaction set IDs named in the "no claims" diagnostic
+NON_CLAIM_TRANSACTIONS = {
+    '835': '835 Remittance Advice (payment file – not a claim)',
+    '270': '270 Eligibility Inquiry',
+    '271': '271 Eligibility Response',
+    '276': '276 Claim Status Request',
+    '277': '277 Claim Status Response',
+    '278': '278 Prior Authorization',
+    '834': '834 Benefit Enrollment',
+}
+
+# NM1 entity code -> party kept per HL node (or for the file, without HL loops)
+HL_PARTIES = {'85': 'billing_provider', '87': 'pay_to_provider', 'IL': 'subscriber', 'PR': 'payer'}
+
+
+class ViewerBuilder:
+    """
+    Push-style viewer parse: feed(seg_id, elements) for every segment in
+    file order, then finish() for the section arrays
+    parse_x12_for_viewer drives one from the tokenizer; x12_multi_output
+    drives it alongside other builders from one pass
+    Parties are placed by HL loop (x12core.LoopStack): each claim gets the
+    billing provider of its 2000A and the subscriber and payer of its 2000B;
+    names inside a claim's 2320/2330 other-subscriber loops are skipped
+    """
+    
+    def __init__(self, records=False):
+        self.claim_type = ViewerClaim if records else dict
+        self.service_line_type = ViewerServiceLine if records else dict
+        self.records = records
+        
+        self.transaction = {}
+        self.submitter = {}
+        self.receiver = {}
+        # Parties of a file without HL loops (and the fallback for one with them)
+        self.header = {'billing_provider': {}, 'pay_to_provider': {}, 'subscriber': {}, 'payer': {}}
+        
+        self.loops = LoopStack()
+        self.hl_node = None     # innermost open HL node (None before the first HL)
+        self.current_claim = None
+        self.in_other_subscriber = False
+        self.claims = []    # (claim, its 2000A node, its 2000B node) in file order
+        self.address = None     # (entity, address) of the last N3, completed by N4
+        self.seen_ids = set()
+        
+        handlers = {
+            'ISA': self.handle_isa, 'ST': self.handle_st, 'BHT': self.handle_bht,
+            'HL': self.handle_hl, 'NM1': self.handle_nm1, 'N3': self.handle_n3,
+            'N4': self.handle_n4, 'PER': self.handle_per, 'SBR': self.handle_sbr,
+            'DMG': self.handle_dmg, 'CLM': self.handle_clm, 'HI': self.handle_hi,
+            'DTP': self.handle_dtp, 'REF': self.handle_ref, 'LX': self.handle_lx,
+            'SV1': self.handle_sv1, 'SE': self.handle_se
+        }
+        self.handlers = handlers
+        get_handler = handlers.get
+        seen = self.seen_ids.add
+        
+        def feed(seg_id, elements):
+            seen(seg_id)
+            handler = get_handler(seg_id)
+            if handler is not None:
+                handler(elements)
+        
+        self.feed = feed
+    
+    def scope(self):
+        """Innermost open HL node, or the file-level parties without HL loops"""
+        node = self.hl_node
+        return self.header if node is None else node
+    
+    def new_subscriber(self, scope):
+        """Subscriber of scope with every key the viewer reads, whichever
+        of SBR / NM1*IL / DMG the file actually has"""
+        subscriber = scope['subscriber'] = {
+            'firstName': "", 'lastName': "", 'id': "", 'address': {},
+            'relationship': 'self', 'groupNumber': "", 'planType': "",
+            'dob': "", 'sex': ""
+        }
+        return subscriber
+    
+    def close_claim(self):
+        self.current_claim = None
+        self.in_other_subscriber = False
+    
+    # ISA - Interchange Control Header
+    def handle_isa(self, elements):
+        self.receiver['name'] = clean_value(elements[8] if len(elements) > 8 else "")
+        self.receiver['id'] = clean_value(elements[8] if len(elements) > 8 else "")
+        self.submitter['name'] = clean_value(elements[6] if len(elements) > 6 else "")
+    
+    # ST - Transaction Set Header
+    def handle_st(self, elements):
+        self.transaction['type'] = clean_value(elements[1] if len(elements) > 1 else "")
+        self.transaction['controlNumber'] = clean_value(elements[2] if len(elements) > 2 else "")
+        self.transaction['version'] = clean_value(elements[3] if len(elements) > 3 else "")
+    
+    # BHT - Beginning of Hierarchical Transaction
+    def handle_bht(self, elements):
+        self.transaction['purpose'] = clean_value(elements[1] if len(elements) > 1 else "")
+        self.transaction['referenceId'] = clean_value(elements[3] if len(elements) > 3 else "")
+        self.transaction['date'] = parse_date(clean_value(elements[4] if len(elements) > 4 else ""))
+        self.transaction['time'] = parse_time(clean_value(elements[5] if len(elements) > 5 else ""))
+    
+    # HL - Hierarchical Level: closes the claim, opens the 2000A/B/C loop
+    def handle_hl(self, elements):
+        self.close_claim()
+        self.hl_node = self.loops.open_hl(
+            clean_value(elements[1] if len(elements) > 1 else ""),
+            clean_value(elements[2] if len(elements) > 2 else ""),
+            clean_value(elements[3] if len(elements) > 3 else "")
+        )
+    
+    # SE - Transaction Set Trailer: HL IDs start over in the next set
+    def handle_se(self, elements):
+        self.close_claim()
+        self.loops.end_transaction()
+        self.hl_node = None
+    
+    # NM1 - Name/Entity
+    # 41 submitter, 40 receiver; 85 / 87 / IL / PR go to the open HL node
+    # (2010AA/AB/BA/BB); 82 rendering provider and 77 service facility to the claim
+    def handle_nm1(self, elements):
+        loops = self.loops
+        entity_code = clean_value(elements[1] if len(elements) > 1 else "")
+        name = clean_value(elements[3] if len(elements) > 3 else "")
+        entity_id = clean_value(elements[9] if len(elements) > 9 else "")
+        claim = self.current_claim
+        entity = None
+        
+        if claim is not None and self.in_other_subscriber:
+            pass    # 2330 other subscriber / payer names belong to the other coverage
+        
+        elif entity_code == '41':  # Submitter
+            self.submitter['name'] = name
+            self.submitter['id'] = entity_id
+            entity = ('submitter', self.submitter)
+        
+        elif entity_code == '40':  # Receiver
+            self.receiver['name'] = name
+            self.receiver['id'] = entity_id
+            entity = ('receiver', self.receiver)
+        
+        elif entity_code == '82':  # Rendering Provider (2310B; 2420A only without one)
+            if claim is not None and (loops.loop == CLAIM_LOOP or 'renderingProvider' not in claim):
+                claim['renderingProvider'] = {
+                    'firstName': clean_value(elements[4] if len(elements) > 4 else ""),
+                    'lastName': name,
+                    'npi': entity_id
+                }
+                entity = ('rendering_provider', claim['renderingProvider'])
+        
+        elif entity_code == '77':  # Service Facility
+            if claim is not None:
+                claim['serviceFacility'] = {'name': name, 'taxId': entity_id, 'address': {}}
+                entity = ('service_facility', claim['serviceFacility'])
+        
+        elif entity_code == 'PR' and claim is not None:  # Payer named inside the claim
+            claim['payer'] = {'name': name, 'payerId': entity_id}
+            entity = ('payer', claim['payer'])
+        
+        elif entity_code in HL_PARTIES:
+            kind = HL_PARTIES[entity_code]
+            scope = self.scope()
+            if entity_code == 'IL':  # Subscriber (SBR may have started it)
+                party = scope.get(kind) or self.new_subscriber(scope)
+                party['firstName'] = clean_value(elements[4] if len(elements) > 4 else "")
+                party['lastName'] = name
+                party['id'] = entity_id
+                party['address'] = {}
+            elif entity_code == 'PR':
+                party = scope[kind] = {'name': name, 'payerId': entity_id}
+            else:  # 85 Billing / 87 Pay-To Provider
+                party = scope[kind] = {'name': name, 'taxId': entity_id, 'address': {}}
+            entity = (kind, party)
+        
+        loops.entity = entity
+    
+    # N3 - Address (completed by the N4 after it)
+    def handle_n3(self, elements):
+        self.address = (self.loops.entity, {'street': clean_value(elements[1] if len(elements) > 1 else "")})
+    
+    # N4 - Geographic Location
+    def handle_n4(self, elements):
+        entity = self.loops.entity
+        if entity is None or self.address is None or self.address[0] is not entity:
+            return
+        address = self.address[1]
+        address['city'] = clean_value(elements[1] if len(elements) > 1 else "")
+        address['state'] = clean_value(elements[2] if len(elements) > 2 else "")
+        address['zip'] = clean_value(elements[3] if len(elements) > 3 else "")
+        if 'address' in entity[1]:
+            entity[1]['address'] = address
+    
+    # PER - Contact Information (submitter)
+    def handle_per(self, elements):
+        entity = self.loops.entity
+        if entity is not None and entity[0] == 'submitter':
+            self.submitter['contact'] = {
+                'name': clean_value(elements[2] if len(elements) > 2 else ""),
+                'phone': clean_value(elements[4] if len(elements) > 4 else ""),
+                'extension': clean_value(elements[6] if len(elements) > 6 else "")
+            }
+    
+    # SBR - Subscriber Information (2000B); inside a claim it opens a 2320 other subscriber
+    def handle_sbr(self, elements):
+        if self.current_claim is not None:
+            self.in_other_subscriber = True
+            self.loops.entity = None
+            return
+        scope = self.scope()
+        subscriber = scope.get('subscriber') or self.new_subscriber(scope)
+        subscriber['relationship'] = clean_value(elements[2] if len(elements) > 2 else "") or 'self'
+        subscriber['groupNumber'] = clean_value(elements[3] if len(elements) > 3 else "")
+        subscriber['planType'] = clean_value(elements[5] if len(elements) > 5 else "")
+    
+    # DMG - Demographics (subscriber)
+    def handle_dmg(self, elements):
+        entity = self.loops.entity
+        if entity is not None and entity[0] == 'subscriber':
+            entity[1]['dob'] = parse_date(clean_value(elements[2] if len(elements) > 2 else ""))
+            entity[1]['sex'] = clean_value(elements[3] if len(elements) > 3 else "")
+    
+    # CLM - Claim Information
+    def handle_clm(self, elements):
+        self.close_claim()
+        loops = self.loops
+        
+        claim = self.claim_type(
+            id=clean_value(elements[1] if len(elements) > 1 else ""),
+            totalCharge=safe_float(elements[2] if len(elements) > 2 else ""),
+            placeOfService="",
+            serviceType="",
+            indicators={
+                'assigned': clean_value(elements[7] if len(elements) > 7 else ""),
+                'providerSignature': clean_value(elements[6] if len(elements) > 6 else ""),
+                'releaseInfo': clean_value(elements[9] if len(elements) > 9 else ""),
+                'patientSignature': clean_value(elements[8] if len(elements) > 8 else ""),
+                'relatedCause': ""
+            },
+            onsetDate="",
+            clearinghouseClaimNumber="",
+            diagnosis={'primary': "", 'secondary': []},
+            serviceLines=[]
+        )
+        self.current_claim = claim
+        self.claims.append((claim, loops.ancestor('2000A'), loops.ancestor('2000B')))
+        loops.open_loop(CLAIM_LOOP, claim)
+    
+    # HI - Health Care Diagnosis Code (first code primary, the rest secondary)
+    def handle_hi(self, elements):
+        claim = self.current_claim
+        if claim is None:
+            return
+        diagnosis = claim['diagnosis']
+        for i in range(1, len(elements)):
+            code = clean_code(elements[i]) if elements[i] else ""
+            if not code:
+                continue
+            if i == 1:
+                diagnosis['primary'] = code
+            else:
+                diagnosis['secondary'].append(code)
+    
+    # DTP - Date/Time/Period: 472 service date, 431/454 onset/admission date
+    def handle_dtp(self, elements):
+        claim = self.current_claim
+        if claim is None:
+            return
+        qualifier = clean_value(elements[1] if len(elements) > 1 else "")
+        if qualifier == '472':
+            if claim['serviceLines']:
+                date = clean_value(elements[3] if len(elements) > 3 else "")
+                claim['serviceLines'][-1]['serviceDate'] = parse_date(date)
+        elif qualifier in ('431', '454'):
+            claim['onsetDate'] = parse_date(clean_value(elements[3] if len(elements) > 3 else ""))
+    
+    # REF - Reference Information: D9 clearinghouse claim number
+    def handle_ref(self, elements):
+        claim = self.current_claim
+        if claim is not None and clean_value(elements[1] if len(elements) > 1 else "") == 'D9':
+            claim['clearinghouseClaimNumber'] = clean_value(elements[2] if len(elements) > 2 else "")
+    
+    # LX - Service Line Number
+    def handle_lx(self, elements):
+        claim = self.current_claim
+        if claim is None:
+            return
+        service_line = self.service_line_type(
+            lineNumber=safe_int(elements[1] if len(elements) > 1 else ""),
+            codeQualifier="",
+            procedureCode="",
+            charge=0,
+            unitQualifier="",
+            units=0,
+            diagnosisPointer="",
+            emergencyIndicator="",
+            serviceDate=""
+        )
+        claim['serviceLines'].append(service_line)
+        self.in_other_subscriber = False
+        self.loops.open_loop(SERVICE_LINE_LOOP, service_line)
+    
+    # SV1 - Professional Service
+    def handle_sv1(self, elements):
+        claim = self.current_claim
+        if claim is None or not claim['serviceLines']:
+            return
+        service_line = claim['serviceLines'][-1]
+        
+        procedure_info = clean_value(elements[1] if len(elements) > 1 else "")
+        if ':' in procedure_info:
+            parts = procedure_info.split(':')
+            service_line['codeQualifier'] = parts[0]
+            service_line['procedureCode'] = parts[1] if len(parts) > 1 else procedure_info
+        else:
+            service_line['procedureCode'] = procedure_info
+        
+        service_line['charge'] = safe_float(elements[2] if len(elements) > 2 else "")
+        service_line['unitQualifier'] = clean_value(elements[3] if len(elements) > 3 else "")
+        service_line['units'] = safe_float(elements[4] if len(elements) > 4 else "")
+        
+        place_of_service = clean_value(elements[5] if len(elements) > 5 else "")
+        if place_of_service:
+            service_line['placeOfService'] = place_of_service
+            if not claim['placeOfService']:
+                claim['placeOfService'] = place_of_service
+        
+        if len(elements) > 7 and elements[7]:
+            service_line['diagnosisPointer'] = safe_int(elements[7])
+    
+    def party(self, node, kind):
+        """A claim's party from its HL node, else the file-level one"""
+        if node is not None and node.get(kind):
+            return node[kind]
+        return self.header[kind]
+    
+    def finish(self):
+        """Section array of the only claim, or one array per claim"""
+        self.close_claim()
+        results = []
+        providers = {}  # id of a 2000A node -> (billing provider, pay-to provider)
+        
+        for claim, billing_node, subscriber_node in self.claims:
+            key = id(billing_node)
+            if key not in providers:
+                billing_provider = self.party(billing_node, 'billing_provider')
+                pay_to_provider = self.party(billing_node, 'pay_to_provider')
+                if not pay_to_provider.get('name'):
+                    pay_to_provider = billing_provider.copy()
+                providers[key] = (billing_provider, pay_to_provider)
+            billing_provider, pay_to_provider = providers[key]
+            
+            if self.records:
+                # ViewerClaim serializes as just the claim section fields
+                claim_section = claim
+            else:
+                claim_section = {
+                    'id': claim['id'],
+                    'totalCharge': claim['totalCharge'],
+                    'placeOfService': claim['placeOfService'],
+                    'serviceType': claim['serviceType'],
+                    'indicators': claim['indicators'],
+                    'onsetDate': claim['onsetDate'],
+                    'clearinghouseClaimNumber': claim['clearinghouseClaimNumber']
+                }
+            
+            results.append([
+                {"section": "transaction", "data": self.transaction},
+                {"section": "submitter", "data": self.submitter},
+                {"section": "receiver", "data": self.receiver},
+                {"section": "billing_Provider", "data": billing_provider},
+                {"section": "Pay_To_provider", "data": pay_to_provider},
+                {"section": "subscriber", "data": self.party(subscriber_node, 'subscriber')},
+                {"section": "payer", "data": claim.get('payer') or self.party(subscriber_node, 'payer')},
+                {"section": "claim", "data": claim_section},
+                {"section": "diagnosis", "data": claim['diagnosis']},
+                {"section": "renderingProvider", "data": claim.get('renderingProvider', {})},
+                {"section": "serviceFacility", "data": claim.get('serviceFacility', billing_provider)},
+                {"section": "service_Lines", "data": claim['serviceLines']}
+            ])
+        
+        return results[0] if len(results) == 1 else results
+    
+    def no_claims_error(self, ele_sep, seg_term):
+        """RuntimeError describing a file without CLM segments (claim viewer uploads)"""
+        transaction_type = self.transaction.get('type', 'unknown')
+        label = NON_CLAIM_TRANSACTIONS.get(transaction_type, f'transaction type {transaction_type}')
+        return RuntimeError(
+            f"No CLM (claim) segments found in this file. "
+            f"Transaction type detected: {label}. "
+            f"Segment types present: {', '.join(sorted(self.seen_ids))}. "
+            f"Detected element separator: '{ele_sep}', "
+            f"segment terminator: repr='{repr(seg_term)}'. "
+            "This parser handles 837P/837I/837D claim files only."
+        )
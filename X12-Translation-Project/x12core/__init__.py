@@ -0,0 +1,19 @@
+"""
+x12core - the X12 reading layer every parser in the project builds on
+tokenizer: delimiter detection and the one streaming tokenizer (detailed and
+viewer translators, and the memory-mapped SegmentStream of the claim viewer worker)
+values: element cleaning and conversion helpers
+loops: the HL loop engine (HL tree by ID, open 2000A-2400 loop stack)
+A performance fix made here reaches all parsers at once
+"""
+
+from x12core.tokenizer import (
+    CHUNK_SIZE, SNIFF_SIZE, detect_delimiters, index_transaction_sets, iter_segments,
+    open_x12_bytes, parse_isa_header, sniff_delimiters, tokenize_file, SegmentStream
+)
+from x12core.loops import (
+    CLAIM_LOOP, HL_LEVEL_LOOPS, SERVICE_LINE_LOOP, LoopStack
+)
+from x12core.values import (
+    clean_code, clean_value, el, parse_date, parse_time, safe_float, safe_int
+)
@@ -0,0 +1,105 @@
+"""
+HL Loop Engine
+Tracks where a segment sits in a transaction set's hierarchy while it is
+read: every HL node by its ID (a parent is one dict lookup however many
+subscribers came before) and the stack of open loops - 2000A billing
+provider, 2000B subscriber, 2000C patient, then the 2300 claim and 2400
+service line opened under them - plus the entity (NM1) that the N3 / N4 /
+DMG / REF segments after it belong to
+The engine only keeps the structure; the parser decides what a node holds
+"""
+
+
+# HL03 hierarchical level code -> loop ID
+HL_LEVEL_LOOPS = {"20": "2000A", "22": "2000B", "23": "2000C"}
+HL_LOOP = "2000"
+
+CLAIM_LOOP = "2300"
+SERVICE_LINE_LOOP = "2400"
+
+# Depth of the loops opened under an HL node; HL loops themselves are 0
+NESTED_LOOP_DEPTH = {CLAIM_LOOP: 1, SERVICE_LINE_LOOP: 2}
+
+
+class LoopStack:
+    """
+    Open loops of one transaction set as (loop ID, node) pairs, outermost
+    first, and the HL tree built so far
+    HL nodes are dicts ({"loop": ...}); a child is appended to its parent's
+    "children" list, nodes without a (known) parent go to roots
+    """
+
+    __slots__ = ("nodes", "roots", "stack", "entity")
+
+    def __init__(self):
+        self.nodes = {}     # HL01 -> (node, its lineage: the (loop ID, node) pairs from the root)
+        self.roots = []
+        self.stack = []
+        self.entity = None  # last NM1 of the innermost loop
+
+    @property
+    def loop(self):
+        """ID of the innermost open loop (None before the first HL)"""
+        stack = self.stack
+        return stack[-1][0] if stack else None
+
+    @property
+    def owner(self):
+        """Node, claim or service line of the innermost open loop"""
+        stack = self.stack
+        return stack[-1][1] if stack else None
+
+    def open_hl(self, hl_id, parent_id, level_code):
+        """
+        Enter the HL loop for HL01 / HL02 / HL03 and return its new node
+        The open loops become the node's lineage, so everything below its
+        parent (an earlier subscriber's claims included) is closed
+        """
+        loop_id = HL_LEVEL_LOOPS.get(level_code, HL_LOOP)
+        node = {"loop": loop_id}
+        parent = self.nodes.get(parent_id) if parent_id else None
+
+        if parent is None:
+            self.roots.append(node)
+            lineage = ((loop_id, node),)
+        else:
+            parent_node, parent_lineage = parent
+            parent_node.setdefault("children", []).append(node)
+            lineage = parent_lineage + ((loop_id, node),)
+
+        self.nodes[hl_id] = (node, lineage)
+        self.stack = list(lineage)
+        self.entity = None
+        return node
+
+    def open_loop(self, loop_id, owner):
+        """Enter a 2300 claim or 2400 service line loop under the innermost HL node"""
+        depth = NESTED_LOOP_DEPTH[loop_id]
+        stack = self.stack
+        while stack and NESTED_LOOP_DEPTH.get(stack[-1][0], 0) >= depth:
+            stack.pop()
+        stack.append((loop_id, owner))
+        self.entity = None
+
+    def ancestor(self, loop_id):
+        """Innermost open node of loop_id (e.g. the claim's 2000B), or None"""
+        for open_loop_id, node in reversed(self.stack):
+            if open_loop_id == loop_id:
+                return node
+        return None
+
+    def hl_node(self):
+        """Innermost open HL node, or None"""
+        for open_loop_id, node in reversed(self.stack):
+            if open_loop_id not in NESTED_LOOP_DEPTH:
+                return node
+        return None
+
+    def end_transaction(self):
+        """Close every loop (SE); returns the finished tree's root nodes"""
+        roots = self.roots
+        self.nodes = {}
+        self.roots = []
+        self.stack = []
+        self.entity = None
+        return roots
@@ -0,0 +1,357 @@
+"""
+Streaming X12 Segment Tokenizer
+Reads the ISA delimiters once, then yields (seg_id, elements) tuples
+straight from a buffered byte stream - no pyx12 round trip
+iter_segments is the one tokenizer: open files, byte ranges (parallel
+translation) and memory-mapped files (SegmentStream, the claim viewer's
+upload worker) are all byte sources for it, so every entry point splits,
+decodes and cleans segments by the same rules
+Delimiter detection only ever looks at a bounded prefix (SNIFF_SIZE bytes)
+and reads a standard fixed-width ISA header by offset, so it costs the same
+for a 1 KB file and a multi-GB one
+"""
+
+import mmap
+import os
+import re
+
+
+CHUNK_SIZE = 1024 * 1024
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# The ISA (or ST) segment must start within this many bytes of the file
+SNIFF_SIZE = 64 * 1024
+
+# ISA is fixed width: 106 bytes with its 16 element separators, ISA16
+# (component separator) and the segment terminator at fixed offsets
+ISA_LENGTH = 106
+ISA_SEPARATOR_OFFSETS = (3, 6, 17, 20, 31, 34, 50, 53, 69, 76, 81, 83, 89, 99, 101, 103)
+ISA_COMPONENT_OFFSET = 104
+ISA_TERMINATOR_OFFSET = 105
+
+# Block decoding, tried in order; latin-1 maps every byte, so it never fails
+ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+
+# "ISA" (any case) followed by its element separator (any non-alphanumeric character)
+_ISA_PATTERN = re.compile(rb'ISA([^A-Za-z0-9\s])', re.IGNORECASE)
+
+# Files without an ISA envelope start at ST; don't match "FIRST" or "BEST"
+_ST_PATTERN = re.compile(rb'(?<![A-Za-z0-9])ST([^A-Za-z0-9\s])', re.IGNORECASE)
+
+
+def parse_isa_header(prefix, start=0):
+    """
+    Fixed-width fast path: read the delimiters of the ISA at prefix[start]
+    straight from their offsets
+    Returns (element_sep, component_sep, segment_term), or None when there is
+    no complete fixed-width ISA there (trimmed padding, truncated header)
+    """
+    isa = prefix[start:start + ISA_LENGTH]
+    if len(isa) < ISA_LENGTH:
+        return None
+
+    ele_sep = isa[3:4]
+    if isa[:3].upper() != b'ISA' or ele_sep.isalnum() or ele_sep.isspace():
+        return None
+    for offset in ISA_SEPARATOR_OFFSETS:
+        if isa[offset:offset + 1] != ele_sep:
+            return None
+    # The separator can't appear inside an element value either
+    if isa.count(ele_sep) != len(ISA_SEPARATOR_OFFSETS):
+        return None
+
+    return (ele_sep, isa[ISA_COMPONENT_OFFSET:ISA_COMPONENT_OFFSET + 1],
+            isa[ISA_TERMINATOR_OFFSET:ISA_TERMINATOR_OFFSET + 1])
+
+
+def detect_delimiters(prefix):
+    """
+    Detect delimiters from the first bytes of an X12 file
+    Only the first SNIFF_SIZE bytes are looked at; a file starting with a
+    standard ISA header is answered from fixed offsets without any scan
+    Returns (start_offset, element_sep, component_sep, segment_term) as bytes
+    """
+    prefix = prefix[:SNIFF_SIZE]
+    start = len(prefix) - len(prefix.lstrip())
+    fixed = parse_isa_header(prefix, start)
+    if fixed is not None:
+        return (start,) + fixed
+
+    isa_match = _ISA_PATTERN.search(prefix)
+
+    if isa_match:
+        start = isa_match.start()
+        ele_sep = isa_match.group(1)
+
+        # ISA always has 16 elements; ISA16 (component separator) is the
+        # single character after the 16th separator, then the terminator
+        pos = start
+        for _ in range(16):
+            pos = prefix.find(ele_sep, pos + 1)
+            if pos < 0:
+                raise RuntimeError("ISA segment does not have 16 element separators.  "
+                                   "The file may be malformed.")
+
+        if len(prefix) < pos + 3:
+            raise RuntimeError("Cannot determine segment terminator from ISA16.  "
+                               "The file may be truncated.")
+
+        return start, ele_sep, prefix[pos + 1:pos + 2], prefix[pos + 2:pos + 3]
+
+    st_match = _ST_PATTERN.search(prefix)
+    if not st_match:
+        raise RuntimeError(
+            "Not a valid X12 file: no ISA or ST segment found.  "
+            "Make sure you are uploading an 837 claim file."
+        )
+
+    start = st_match.start()
+    ele_sep = st_match.group(1)
+
+    # No ISA16 to read from: the first character that can't be part of an
+    # element value is the segment terminator
+    terminator = re.compile(rb'[^A-Za-z0-9 \t:\-' + re.escape(ele_sep) + rb']').search(prefix, st_match.end())
+    seg_term = terminator.group() if terminator else b'~'
+
+    return start, ele_sep, b':', seg_term
+
+
+def sniff_delimiters(filepath, size=SNIFF_SIZE):
+    """
+    Delimiters of an X12 file, read from at most `size` bytes of it
+    Returns (start_offset, element_sep, component_sep, segment_term); the
+    offset is from the start of the file, past any UTF-8 BOM
+    """
+    with open(filepath, 'rb') as f:
+        prefix = f.read(size)
+    bom = len(UTF8_BOM) if prefix.startswith(UTF8_BOM) else 0
+    start, ele_sep, comp_sep, seg_term = detect_delimiters(prefix[bom:])
+    return bom + start, ele_sep, comp_sep, seg_term
+
+
+def _decode(block):
+    """Decode a block of whole segments (UTF-8, then Windows-1252, then latin-1)"""
+    for encoding in ENCODINGS[:-1]:
+        try:
+            return block.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    return block.decode(ENCODINGS[-1])
+
+
+def iter_segments(stream, chunk_size=CHUNK_SIZE, span=None, delimiters=None):
+    """
+    Tokenize a binary X12 stream into (seg_id, elements) tuples
+    elements[0] is the segment ID, same layout as str(segment).split('*')
+    The rules every parser gets:
+      - whole segments are decoded a block at a time (see _decode)
+      - surrounding whitespace (CR/LF line breaks) is stripped
+      - the segment ID is upper-cased
+      - component separators are normalized to ':'
+      - trailing empty elements are dropped, matching what pyx12 used to hand back
+    stream only needs read(size) (and seek with span): a file, or an mmap
+    span=(start, end) limits reading to that byte range; pass the file's
+    delimiters with it, since a slice has no ISA to detect them from
+    """
+    read = stream.read
+
+    if span is not None:
+        stream.seek(span[0])
+        remaining = span[1] - span[0]
+
+        def read(size):
+            nonlocal remaining
+            data = stream.read(min(size, remaining))
+            remaining -= len(data)
+            return data
+
+    prefix = read(chunk_size)
+
+    if delimiters is not None:
+        start = 0
+        ele_sep, comp_sep, seg_term = delimiters
+    else:
+        if prefix.startswith(UTF8_BOM):
+            prefix = prefix[len(UTF8_BOM):]
+        start, ele_sep, comp_sep, seg_term = detect_delimiters(prefix)
+
+    ele = ele_sep.decode('latin-1')
+    comp = comp_sep.decode('latin-1')
+    term = seg_term.decode('latin-1')
+    normalize_comp = comp != ':'
+
+    pending = prefix[start:]
+    eof = False
+
+    while not eof:
+        chunk = read(chunk_size)
+        if chunk:
+            pending += chunk
+        else:
+            eof = True
+
+        # Only hand complete segments to the decoder; keep the tail for later
+        cut = len(pending) if eof else pending.rfind(seg_term) + 1
+        if cut <= 0:
+            continue
+
+        block, pending = pending[:cut], pending[cut:]
+
+        for raw_seg in _decode(block).split(term):
+            raw_seg = raw_seg.strip()
+            if not raw_seg:
+                continue
+            if normalize_comp:
+                raw_seg = raw_seg.replace(comp, ':')
+            elements = raw_seg.split(ele)
+            while len(elements) > 1 and not elements[-1]:
+                elements.pop()
+            seg_id = elements[0] = elements[0].upper()
+            yield seg_id, elements
+
+
+def tokenize_file(filepath, chunk_size=CHUNK_SIZE):
+    """Open an X12 file and yield its (seg_id, elements) tuples"""
+    with open(filepath, 'rb') as f:
+        yield from iter_segments(f, chunk_size)
+
+
+def index_transaction_sets(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Split a file into byte ranges at ST...SE transaction set boundaries
+    Returns (delimiters, pieces) where delimiters is (element_sep,
+    component_sep, segment_term) and pieces is an ordered list of
+    ("transaction" | "envelope", start, end) covering the whole X12 data
+    """
+    data_start, ele_sep, comp_sep, seg_term = sniff_delimiters(filepath)
+
+    with open(filepath, 'rb') as f:
+        # A segment boundary followed by an ST or SE segment ID (any case)
+        boundary = re.compile(re.escape(seg_term) + rb'\s*([Ss][TEte])' + re.escape(ele_sep))
+
+        f.seek(data_start)
+
+        # Virtual terminator in front so the very first segment can match
+        buf = seg_term
+        buf_offset = data_start - len(seg_term)
+
+        pieces = []
+        covered = data_start
+        st_start = None
+        eof = False
+
+        while not eof:
+            chunk = f.read(chunk_size)
+            if chunk:
+                buf += chunk
+                # Only search complete segments; the tail waits for more data
+                cut = buf.rfind(seg_term)
+            else:
+                eof = True
+                cut = len(buf)
+
+            for match in boundary.finditer(buf, 0, cut):
+                seg_start = buf_offset + match.start(1)
+
+                if match.group(1).upper() == b'ST':
+                    st_start = seg_start
+                elif st_start is not None:
+                    term_pos = buf.find(seg_term, match.end())
+                    seg_end = buf_offset + (term_pos + 1 if term_pos >= 0 else len(buf))
+
+                    if st_start > covered:
+                        pieces.append(("envelope", covered, st_start))
+                    pieces.append(("transaction", st_start, seg_end))
+                    covered = seg_end
+                    st_start = None
+
+            if cut > 0 and not eof:
+                buf = buf[cut:]
+                buf_offset += cut
+
+        file_end = buf_offset + len(buf)
+
+        # A transaction set with no SE runs to the end of the file
+        if st_start is not None:
+            if st_start > covered:
+                pieces.append(("envelope", covered, st_start))
+            pieces.append(("transaction", st_start, file_end))
+            covered = file_end
+
+        if file_end > covered:
+            pieces.append(("envelope", covered, file_end))
+
+    return (ele_sep, comp_sep, seg_term), pieces
+
+
+# Memory-mapped reading (claim viewer uploads)
+
+def open_x12_bytes(filepath):
+    """
+    Memory-map an X12 file for reading (b'' for an empty file, which can't
+    be mapped) - the OS pages it in as it is walked, so it is never copied
+    into Python memory as a whole
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception as e:
+        raise RuntimeError(f"Cannot read file '{filepath}': {e}")
+
+
+class SegmentStream:
+    """
+    Lazy (seg_id, elements) iterator over a memory-mapped X12 file
+    The mapping is only a byte source: the segments come from iter_segments,
+    read from it one CHUNK_SIZE at a time
+    ele_sep and seg_term (str) are known once it is open; peek() looks at
+    the next segment without consuming it
+    Use it as a context manager (or call close()) to release the mapping
+    """
+
+    def __init__(self, filepath):
+        self._data = open_x12_bytes(filepath)
+        try:
+            data = self._data
+            bom = len(UTF8_BOM) if data[:len(UTF8_BOM)] == UTF8_BOM else 0
+            start, ele_sep, comp_sep, seg_term = detect_delimiters(data[bom:bom + SNIFF_SIZE])
+        except Exception:
+            self.close()
+            raise
+
+        self.ele_sep = ele_sep.decode('latin-1')
+        self.seg_term = seg_term.decode('latin-1')
+        self._segments = iter_segments(data, span=(bom + start, len(data)),
+                                       delimiters=(ele_sep, comp_sep, seg_term))
+        self._lookahead = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._lookahead:
+            return self._lookahead.pop()
+        return next(self._segments)
+
+    def peek(self, default=None):
+        """Next (seg_id, elements) pair without consuming it, or default at the end"""
+        if not self._lookahead:
+            try:
+                self._lookahead.append(next(self._segments))
+            except StopIteration:
+                return default
+        return self._lookahead[-1]
+
+    def close(self):
+        self._segments = iter(())
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,60 @@
+"""
+X12 Value Helpers
+Cleaning and conversion of element values, shared by the viewer parsers
+"""
+
+
+def el(elements, index, default=""):
+    """elements[index], or default when the segment is shorter"""
+    return elements[index] if len(elements) > index else default
+
+
+def parse_date(date_str):
+    """Convert YYYYMMDD to YYYY-MM-DD"""
+    if not date_str or len(date_str) != 8:
+        return date_str
+    return f"{date_str[0:4]}-{date_str[4:6]}-{date_str[6:8]}"
+
+
+def parse_time(time_str):
+    """Convert HHMM to HH:MM"""
+    if not time_str or len(time_str) < 4:
+        return time_str
+    return f"{time_str[0:2]}:{time_str[2:4]}"
+
+
+def clean_value(value):
+    """Remove tilde, whitespace, and segment terminators from X12 values"""
+    if not value:
+        return ""
+    return str(value).replace('~', '').strip()
+
+
+def clean_code(code):
+    """Remove qualifier prefix from codes (e.g., 'ABK:K0230' -> 'K0230')"""
+    if not code:
+        return ""
+    cleaned = clean_value(code)
+    return cleaned.split(":")[-1] if ":" in cleaned else cleaned
+
+
+def safe_int(value, default=0):
+    """Safely convert string to int, handling tildes and invalid values"""
+    if not value:
+        return default
+    try:
+        cleaned = clean_value(value)
+        return int(cleaned) if cleaned else default
+    except (ValueError, AttributeError):
+        return default
+
+
+def safe_float(value, default=0.0):
+    """Safely convert string to float, handling tildes and invalid values"""
+    if not value:
+        return default
+    try:
+        cleaned = clean_value(value)
+        return float(cleaned) if cleaned else default
+    except (ValueError, AttributeError):
+        return default